@@ -0,0 +1,228 @@
+import glob
+import gzip
+import hashlib
+import json
+import os
+import re
+from collections import Counter, defaultdict
+from datetime import datetime
+
+#--------------------Analyse de user_actions.log--------------------#
+# Lecture en flux, ligne par ligne : la mémoire dépend du nombre de routes, de
+# statuts, d'utilisateurs et de tranches horaires, pas de la taille des fichiers.
+# Trois formats sont reconnus dans un même fichier :
+#   - lignes d'accès werkzeug (anciens journaux, avec codes couleur ANSI) ;
+#   - lignes "User ID: ..., Action: ..." de l'ancien log_action ;
+#   - lignes JSON de journalisation.py (événements 'request' et 'action').
+# Les fichiers tournés (.1, .2.gz, .2026-10-18.gz, ...) sont lus comme les autres. En mode
+# incrémental, un fichier d'état garde les agrégats et, pour chaque fichier (repéré
+# par l'empreinte de sa première ligne, qui survit à la rotation et à la compression),
+# la position déjà lue : seule la suite est analysée. Un fichier compressé n'est plus
+# écrit : une fois lu en entier, il est marqué complet et n'est plus ouvert (reprendre à
+# une position dans un .gz décompresse tout ce qui la précède).
+
+ANSI = re.compile(rb'\x1b\[[0-9;]*m')
+WERKZEUG = re.compile(r'^[A-Z]+:werkzeug:\S+ - - \[(?P<ts>[^\]]+)\] "(?P<method>[A-Z]+) (?P<path>\S+) [^"]*" (?P<status>\d{3}) ')
+LEGACY_ACTION = re.compile(r'^[A-Z]+:root:User ID: (?P<user>.*?), Action: (?P<action>\S+)')
+NUMBER_SEGMENT = re.compile(r'/\d+(?=/|$)')
+# Suffixe des fichiers tournés : numéro (RotatingFileHandler, .1 le plus récent) ou date de début
+# de période (TimedRotatingFileHandler, LOG_ROTATE_WHEN : 2026-10-18, 2026-10-18_09-38-20, ...)
+ROTATED = re.compile(r'\.(?:(?P<number>\d+)|(?P<date>\d{4}-\d{2}-\d{2}(?:_\d{2}(?:-\d{2}){0,2})?))(?:\.gz)?')
+
+BUCKET_MINUTES = 60  # Largeur des tranches de trafic
+COMPLETE = 'complet'  # Position d'un fichier compressé déjà lu en entier, dans le fichier d'état
+
+
+def normalize_path(path):
+    # /update/12?x=1 -> /update/<int> : le nombre de routes distinctes reste borné
+    return NUMBER_SEGMENT.sub('/<int>', path.split('?', 1)[0])
+
+
+def _bucket(moment, minutes):
+    minute = (moment.hour * 60 + moment.minute) // minutes * minutes
+    return moment.replace(hour=minute // 60, minute=minute % 60, second=0, microsecond=0, tzinfo=None).isoformat(timespec='minutes')
+
+
+class LogStats:
+    def __init__(self, bucket_minutes=BUCKET_MINUTES):
+        self.bucket_minutes = bucket_minutes
+        self.lines = 0
+        self.ignored = 0
+        self.routes = Counter()  # "GET /list" -> requêtes
+        self.statuses = Counter()  # "200" -> requêtes
+        self.static = Counter()  # 'total', '304'
+        self.actions = defaultdict(Counter)  # utilisateur -> action -> nombre
+        self.traffic = Counter()  # début de tranche -> requêtes
+        self.durations = defaultdict(lambda: [0, 0.0])  # route -> [requêtes chronométrées, somme des ms]
+        self._last_minute = (None, None)  # (minute lue, tranche) : les lignes se suivent dans le temps
+
+    def bucket(self, minute, parse):
+        # Tranche de trafic d'un horodatage tronqué à la minute ; analysé une seule fois par minute
+        if minute != self._last_minute[0]:
+            try:
+                self._last_minute = (minute, _bucket(parse(minute), self.bucket_minutes))
+            except ValueError:
+                self._last_minute = (minute, None)
+        return self._last_minute[1]
+
+    def add_request(self, method, route, status, bucket, duration_ms=None):
+        key = f"{method} {route}"
+        self.routes[key] += 1
+        self.statuses[str(status)] += 1
+        if route.startswith('/static/'):
+            self.static['total'] += 1
+            self.static['304'] += status == 304
+        if bucket is not None:
+            self.traffic[bucket] += 1
+        if duration_ms is not None:
+            entry = self.durations[key]
+            entry[0] += 1
+            entry[1] += duration_ms
+
+    def add_action(self, user, action):
+        self.actions[str(user)][action] += 1
+
+    def parse_line(self, raw):
+        self.lines += 1
+        if b'\x1b' in raw:
+            raw = ANSI.sub(b'', raw)
+        line = raw.decode('utf-8', errors='replace').strip()
+        if line.startswith('{'):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                self.ignored += 1
+                return
+            if record.get('event') == 'request':
+                route = record.get('route') or normalize_path(record.get('path', ''))
+                bucket = self.bucket(record['ts'][:16], datetime.fromisoformat) if 'ts' in record else None
+                self.add_request(record.get('method', '?'), route, record.get('status', 0), bucket,
+                                 record.get('duration_ms'))
+            elif record.get('event') == 'action':
+                self.add_action(record.get('user_id'), record.get('action'))
+            else:
+                self.ignored += 1
+            return
+        match = WERKZEUG.match(line)
+        if match:
+            bucket = self.bucket(match['ts'][:17], lambda minute: datetime.strptime(minute, '%d/%b/%Y %H:%M'))
+            self.add_request(match['method'], normalize_path(match['path']), int(match['status']), bucket)
+            return
+        match = LEGACY_ACTION.match(line)
+        if match:
+            self.add_action(match['user'], match['action'])
+            return
+        self.ignored += 1  # Démarrage du serveur, avertissements, ...
+
+    def report(self, top=20):
+        requests = sum(self.routes.values())
+        return {
+            'lignes': self.lines,
+            'lignes_ignorees': self.ignored,
+            'requetes': requests,
+            'routes': dict(self.routes.most_common(top)),
+            'statuts': dict(sorted(self.statuses.items())),
+            'statiques': {
+                'requetes': self.static['total'],
+                'reponses_304': self.static['304'],
+                'ratio_304': round(self.static['304'] / self.static['total'], 3) if self.static['total'] else None,
+            },
+            'duree_moyenne_ms': {route: round(total / count, 3) for route, (count, total) in
+                                 sorted(self.durations.items(), key=lambda item: -item[1][0])[:top]},
+            'actions_par_utilisateur': {user: dict(actions.most_common(top)) for user, actions in
+                                        sorted(self.actions.items(), key=lambda item: -sum(item[1].values()))[:top]},
+            'trafic': dict(sorted(self.traffic.items())),
+        }
+
+    def to_dict(self):
+        return {
+            'bucket_minutes': self.bucket_minutes, 'lines': self.lines, 'ignored': self.ignored,
+            'routes': self.routes, 'statuses': self.statuses, 'static': self.static,
+            'actions': self.actions, 'traffic': self.traffic, 'durations': self.durations,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls(data['bucket_minutes'])
+        stats.lines, stats.ignored = data['lines'], data['ignored']
+        stats.routes.update(data['routes'])
+        stats.statuses.update(data['statuses'])
+        stats.static.update(data['static'])
+        for user, actions in data['actions'].items():
+            stats.actions[user].update(actions)
+        stats.traffic.update(data['traffic'])
+        for route, entry in data['durations'].items():
+            stats.durations[route] = entry
+        return stats
+
+
+#--------------------Lecture des fichiers--------------------#
+
+def _compressed(path):
+    with open(path, 'rb') as f:
+        return f.read(2) == b'\x1f\x8b'
+
+
+def _open(path):
+    return gzip.open(path, 'rb') if _compressed(path) else open(path, 'rb')
+
+
+def fingerprint(path):
+    # Empreinte de la première ligne complète (None si le fichier n'en a pas encore)
+    with _open(path) as f:
+        first = f.readline(4096)
+    if not first.endswith(b'\n'):
+        return None
+    return hashlib.sha1(first).hexdigest()
+
+
+def _rotation_order(suffix):
+    # Du plus ancien au plus récent : numéros décroissants, puis dates croissantes
+    match = ROTATED.fullmatch(suffix)
+    return (0, -int(match['number']), '') if match['number'] else (1, 0, match['date'])
+
+
+def expand_paths(paths):
+    # Un chemin désigne aussi ses fichiers tournés (chemin.1, chemin.2.gz, chemin.2026-10-18.gz, ...),
+    # les plus anciens d'abord
+    files = []
+    for path in paths:
+        rotated = sorted((p for p in glob.glob(glob.escape(path) + '.*') if ROTATED.fullmatch(p[len(path):])),
+                         key=lambda p: _rotation_order(p[len(path):]))
+        files += rotated + ([path] if os.path.exists(path) else [])
+    return files
+
+
+def analyze_file(path, stats, offset=0):
+    # Analyse un fichier à partir de `offset` (octets décompressés) ; retourne la nouvelle position.
+    # Une dernière ligne sans fin de ligne (en cours d'écriture) est laissée pour la prochaine fois.
+    with _open(path) as f:
+        f.seek(offset)  # Dans un .gz, la position est rejouée par décompression, sans tout garder en mémoire
+        for raw in f:
+            if not raw.endswith(b'\n'):
+                break
+            offset += len(raw)
+            stats.parse_line(raw)
+    return offset
+
+
+def analyze(paths, state_path=None, bucket_minutes=BUCKET_MINUTES):
+    # Analyse les fichiers ; avec state_path, reprend là où l'exécution précédente s'était arrêtée
+    state = {'offsets': {}, 'stats': None}
+    if state_path and os.path.exists(state_path):
+        with open(state_path, encoding='utf-8') as f:
+            state = json.load(f)
+    stats = LogStats.from_dict(state['stats']) if state['stats'] else LogStats(bucket_minutes)
+    offsets = state['offsets']
+    for path in expand_paths(paths):
+        key = fingerprint(path)
+        if key is None or offsets.get(key) == COMPLETE:
+            continue
+        offset = analyze_file(path, stats, offsets.get(key, 0))
+        offsets[key] = COMPLETE if _compressed(path) else offset
+    if state_path:
+        temporary = state_path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump({'offsets': offsets, 'stats': stats.to_dict()}, f)
+        os.replace(temporary, state_path)  # L'état n'est jamais à moitié écrit
+    return stats
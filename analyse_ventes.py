@@ -0,0 +1,273 @@
+import threading
+
+import database
+from database import get_connection
+from gestion_produit import MAX_IN_PARAMS
+
+#--------------------Analyse des ventes (NumPy)--------------------#
+# Chiffre d'affaires (quantité x prix actuel du produit), unités et lignes de commande par
+# client, par produit et par type de produit. Les commandes sont chargées par paquets dans
+# des tableaux NumPy en colonnes (id, client, produit, quantité) ; chaque regroupement est
+# une seule opération vectorisée (np.bincount), sans boucle Python par ligne.
+# Les colonnes restent en mémoire avec la version de la table `commandes` : après des
+# écritures, seules les nouvelles commandes (id au-delà du dernier chargé) et celles
+# modifiées ou supprimées depuis (commandes_journal, tenu par trigger) sont relues. Les prix
+# et types, petits, sont rechargés quand `produits` change. Les agrégats sont gardés pour
+# le couple de versions (commandes, produits).
+# numpy n'est importé qu'au premier calcul : le démarrage de l'application ne le charge pas.
+
+CHUNK_ROWS = 200000  # Commandes lues par requête au chargement
+FULL_RELOAD_RATIO = 0.2  # Au-delà de cette part de commandes modifiées, tout est relu
+DEFAULT_TOP = 10
+MAX_TOP = 100
+UNKNOWN_TYPE = "(produit supprimé)"  # Type des lignes dont le produit n'existe plus
+
+
+class _Orders:
+    # Colonnes des commandes chargées, triées par id ; une commande supprimée garde sa place
+    # avec une quantité nulle (elle ne compte plus dans aucun agrégat)
+    def __init__(self, database_path, version, last_seq, ids, clients, produits, quantites):
+        self.database_path = database_path
+        self.version = version
+        self.last_seq = last_seq
+        self.ids = ids
+        self.clients = clients
+        self.produits = produits
+        self.quantites = quantites
+
+
+def _read_orders(connection, after_id=0):
+    # Commandes d'id > after_id, par paquets de CHUNK_ROWS : chaque paquet arrive en quatre
+    # chaînes "1,2,3" (group_concat, en C) converties par numpy, sans tuple Python par ligne
+    import numpy as np
+    parts = []
+    while True:
+        row = connection.execute("""
+            SELECT group_concat(id), group_concat(client_id), group_concat(produit_id), group_concat(quantite)
+            FROM (SELECT id, client_id, produit_id, quantite FROM commandes WHERE id > ? ORDER BY id LIMIT ?)
+        """, (after_id, CHUNK_ROWS)).fetchone()
+        if row[0] is None:
+            break
+        ids = np.fromstring(row[0], dtype=np.int64, sep=',')
+        parts.append((ids, *(np.fromstring(column, dtype=np.int32, sep=',') for column in row[1:])))
+        after_id = int(ids[-1])
+        if len(ids) < CHUNK_ROWS:
+            break
+    if not parts:
+        return (np.empty(0, dtype=np.int64),) + tuple(np.empty(0, dtype=np.int32) for _ in range(3))
+    return tuple(np.concatenate(columns) for columns in zip(*parts))
+
+
+def _patch_orders(connection, orders, changed_ids):
+    # Relit les commandes modifiées ou supprimées déjà chargées et met leurs colonnes à jour
+    import numpy as np
+    changed_ids = np.unique(np.asarray(changed_ids, dtype=np.int64))
+    positions = np.searchsorted(orders.ids, changed_ids)
+    loaded = positions < len(orders.ids)
+    loaded[loaded] = orders.ids[positions[loaded]] == changed_ids[loaded]
+    changed_ids, positions = changed_ids[loaded], positions[loaded]
+    orders.quantites[positions] = 0  # Supprimée, sauf si elle est relue ci-dessous
+    rows = []
+    for start in range(0, len(changed_ids), MAX_IN_PARAMS):
+        chunk = changed_ids[start:start + MAX_IN_PARAMS].tolist()
+        rows += connection.execute(
+            f"SELECT id, client_id, produit_id, quantite FROM commandes WHERE id IN ({', '.join('?' * len(chunk))})",
+            chunk).fetchall()
+    if rows:
+        rows = np.array(rows, dtype=np.int64)
+        positions = np.searchsorted(orders.ids, rows[:, 0])
+        orders.clients[positions] = rows[:, 1]
+        orders.produits[positions] = rows[:, 2]
+        orders.quantites[positions] = rows[:, 3]
+
+
+def _read_products(connection):
+    # Prix et code de type indexés par id de produit, et noms des types
+    import numpy as np
+    rows = connection.execute("SELECT id, prix, type_produit FROM produits").fetchall()
+    size = max((row[0] for row in rows), default=0) + 1
+    prix = np.zeros(size)
+    type_codes = np.full(size, -1, dtype=np.int32)
+    types = {}
+    if rows:
+        ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+        prix[ids] = np.fromiter((row[1] for row in rows), dtype=np.float64, count=len(rows))
+        type_codes[ids] = np.fromiter((types.setdefault(row[2], len(types)) for row in rows),
+                                      dtype=np.int32, count=len(rows))
+    return prix, type_codes, list(types)
+
+
+def _group(keys, montants, quantites, actives, size):
+    # (chiffre d'affaires, unités, lignes) par valeur de clé, en trois passes vectorisées
+    import numpy as np
+    return (np.bincount(keys, weights=montants, minlength=size),
+            np.bincount(keys, weights=quantites, minlength=size),
+            np.bincount(keys, weights=actives, minlength=size))
+
+
+def _aggregate(orders, products):
+    import numpy as np
+    prix, type_codes, types = products
+    produits = orders.produits
+    size = max(len(prix), int(produits.max()) + 1 if len(produits) else 0)
+    if size > len(prix):
+        # Lignes dont le produit a été supprimé : prix nul, type à part
+        prix = np.concatenate([prix, np.zeros(size - len(prix))])
+        type_codes = np.concatenate([type_codes, np.full(size - len(type_codes), -1, dtype=np.int32)])
+    types = types + [UNKNOWN_TYPE]
+    line_types = type_codes[produits]
+    line_types[line_types < 0] = len(types) - 1
+    quantites = orders.quantites.astype(np.float64)
+    montants = quantites * prix[produits]
+    actives = (orders.quantites > 0).astype(np.float64)
+    return {
+        'total': (float(montants.sum()), int(orders.quantites.sum()), int(np.count_nonzero(actives))),
+        'clients': _group(orders.clients, montants, quantites, actives, 0),
+        'produits': _group(produits, montants, quantites, actives, 0),
+        'types': _group(line_types, montants, quantites, actives, len(types)),
+        'noms_types': types,
+    }
+
+
+class SalesAnalytics:
+    def __init__(self):
+        self._lock = threading.Lock()  # Un seul rafraîchissement à la fois ; les lectures suivantes en profitent
+        self._orders = None
+        self._products = None  # (chemin de la base, version, (prix, codes de type, types))
+        self._summary = None  # ((chemin, version commandes, version produits), agrégats)
+        self.full_loads = 0
+        self.incremental_loads = 0
+        self.hits = 0
+
+    def _refresh_orders(self, connection, version):
+        # Met les colonnes à la version `version` : relecture des changements, ou chargement complet
+        import numpy as np
+        orders = self._orders
+        first_seq, last_seq = connection.execute("SELECT MIN(seq), MAX(seq) FROM commandes_journal").fetchone()
+        last_seq = last_seq or 0
+        if (orders is not None and orders.database_path == database.DATABASE and orders.last_seq <= last_seq
+                and (first_seq is None or first_seq <= orders.last_seq + 1)):
+            changed = [row[0] for row in connection.execute(
+                "SELECT DISTINCT commande_id FROM commandes_journal WHERE seq > ?", (orders.last_seq,))]
+            if len(changed) <= FULL_RELOAD_RATIO * max(len(orders.ids), 1):
+                _patch_orders(connection, orders, changed)
+                last_id = int(orders.ids[-1]) if len(orders.ids) else 0
+                new = _read_orders(connection, last_id)
+                if len(new[0]):
+                    orders.ids, orders.clients, orders.produits, orders.quantites = (
+                        np.concatenate(columns) for columns in zip(
+                            (orders.ids, orders.clients, orders.produits, orders.quantites), new))
+                orders.version, orders.last_seq = version, last_seq
+                self.incremental_loads += 1
+                return orders
+        self.full_loads += 1
+        return _Orders(database.DATABASE, version, last_seq, *_read_orders(connection))
+
+    def summary(self, connection=None):
+        # Agrégats à jour (voir _aggregate), recalculés seulement si commandes ou produits ont changé
+        connection = connection or get_connection()
+        with self._lock:
+            # Lectures dans une même transaction : versions, journal et lignes forment un état cohérent
+            snapshot = not connection.in_transaction
+            if snapshot:
+                connection.execute("BEGIN")
+            try:
+                versions = dict(connection.execute(
+                    "SELECT name, version FROM table_versions WHERE name IN ('commandes', 'produits')").fetchall())
+                key = (database.DATABASE, versions.get('commandes', 0), versions.get('produits', 0))
+                if self._summary and self._summary[0] == key:
+                    self.hits += 1
+                    return self._summary[1]
+                if not (self._orders and self._orders.database_path == key[0] and self._orders.version == key[1]):
+                    self._orders = self._refresh_orders(connection, key[1])
+                if not (self._products and self._products[:2] == (key[0], key[2])):
+                    self._products = (key[0], key[2], _read_products(connection))
+                summary = _aggregate(self._orders, self._products[2])
+                self._summary = (key, summary)
+                return summary
+            except BaseException:
+                self._orders = None  # Colonnes peut-être à moitié mises à jour : rechargement complet au prochain appel
+                raise
+            finally:
+                if snapshot:
+                    connection.commit()
+
+    def clear(self):
+        with self._lock:
+            self._orders = self._products = self._summary = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'commandes_en_memoire': len(self._orders.ids) if self._orders else 0,
+                'chargements_complets': self.full_loads,
+                'chargements_incrementaux': self.incremental_loads,
+                'succes_cache': self.hits,
+            }
+
+
+sales = SalesAnalytics()
+
+
+#--------------------Lectures--------------------#
+
+def _top(values, limit):
+    # Indices des `limit` plus grandes valeurs non nulles, par valeur décroissante
+    import numpy as np
+    limit = min(limit, int(np.count_nonzero(values)))
+    if limit <= 0:
+        return []
+    indices = np.argpartition(-values, limit - 1)[:limit]
+    return indices[np.argsort(-values[indices], kind='stable')].tolist()
+
+
+def _names(connection, table, ids):
+    if not ids:
+        return {}
+    return dict(connection.execute(
+        f"SELECT id, nom FROM {table} WHERE id IN ({', '.join('?' * len(ids))})", ids).fetchall())
+
+
+def _ranking(connection, groups, table, key, limit):
+    revenue, units, lines = groups
+    ids = _top(revenue, limit)
+    names = _names(connection, table, ids)
+    return [{key: index, 'nom': names.get(index), 'chiffre_affaires': round(float(revenue[index]), 2),
+             'unites': int(units[index]), 'lignes': int(lines[index])} for index in ids]
+
+
+def _by_type(summary):
+    revenue, units, lines = summary['types']
+    names = summary['noms_types']
+    return [{'type_produit': names[index], 'chiffre_affaires': round(float(revenue[index]), 2),
+             'unites': int(units[index]), 'lignes': int(lines[index])} for index in _top(revenue, len(names))]
+
+
+def revenue_by_type(connection=None):
+    # [{type_produit, chiffre_affaires, unites, lignes}, ...] par chiffre d'affaires décroissant
+    return _by_type(sales.summary(connection))
+
+
+def top_clients(limit=DEFAULT_TOP, connection=None):
+    # Meilleurs clients par chiffre d'affaires : [{client_id, nom, chiffre_affaires, unites, lignes}, ...]
+    connection = connection or get_connection()
+    return _ranking(connection, sales.summary(connection)['clients'], 'clients', 'client_id', limit)
+
+
+def top_products(limit=DEFAULT_TOP, connection=None):
+    # Produits les plus vendus en chiffre d'affaires : [{produit_id, nom, chiffre_affaires, unites, lignes}, ...]
+    connection = connection or get_connection()
+    return _ranking(connection, sales.summary(connection)['produits'], 'produits', 'produit_id', limit)
+
+
+def sales_report(limit=DEFAULT_TOP, connection=None):
+    # Totaux, ventes par type et classements des clients et des produits (JSON)
+    connection = connection or get_connection()
+    summary = sales.summary(connection)
+    revenue, units, lines = summary['total']
+    return {
+        'total': {'chiffre_affaires': round(revenue, 2), 'unites': units, 'lignes': lines},
+        'par_type': _by_type(summary),
+        'meilleurs_clients': _ranking(connection, summary['clients'], 'clients', 'client_id', limit),
+        'meilleurs_produits': _ranking(connection, summary['produits'], 'produits', 'produit_id', limit),
+    }
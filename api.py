@@ -0,0 +1,333 @@
+import zlib
+
+from flask import Blueprint, Response, jsonify, request
+
+from cache import catalogue_cache
+from database import get_connection, table_version, transaction
+from garde_requetes import query_budget
+from gestion_produit import MAX_IN_PARAMS, NOW, ClientRow, CommandeRow, ProduitRow, name_suggestions, release_stock, reserve_stock
+from importation import RowValidator
+
+#--------------------API JSON v1--------------------#
+# Produits, clients et commandes sous /api/v1/<entité> :
+#   GET   /api/v1/produits?after=<id>&limit=<n>   liste paginée par curseur (id), champ "suivant"
+#   GET   /api/v1/produits?ids=1,2,3              lecture groupée par ids
+#   GET   /api/v1/produits/<id>                   un seul enregistrement
+#   GET   /api/v1/produits/suggestions?q=pom      les premiers noms commençant par q (clients, produits)
+#   POST  /api/v1/produits   [{...}, ...]         création groupée
+#   PATCH /api/v1/produits   [{"id": 1, ...}, ...] mise à jour groupée (champs donnés seulement)
+# ?fields=id,nom,stock limite les champs lus et renvoyés ; ?format=lignes donne les noms des
+# champs une seule fois puis une liste de valeurs par ligne (le plus compact).
+# Les écritures sont faites dans une seule transaction et sont tout ou rien : une ligne
+# invalide donne 422 avec les erreurs par position, rien n'est écrit. Les lectures portent
+# un ETag tiré du compteur de version de la table : avec If-None-Match, une table inchangée
+# répond 304 sans lire les lignes.
+
+DEFAULT_LIMIT = 100  # Lignes par page par défaut
+MAX_LIMIT = 1000  # Taille de page maximale acceptée
+MAX_BATCH = 1000  # Lignes au plus par lecture groupée ou écriture groupée
+SUGGESTIONS_LIMIT = 10  # Noms proposés par défaut à chaque frappe
+MAX_SUGGESTIONS = 50
+
+RECORDS = {
+    'produits': ProduitRow,
+    'clients': ClientRow,
+    'commandes': CommandeRow,
+}
+
+# Compteurs de table_versions (migrations 3 et 12) dont dépendent les lectures de l'entité
+VERSIONS = {
+    'produits': ('produits', 'produits_stock'),
+    'clients': ('clients',),
+    'commandes': ('commandes',),
+}
+
+# Compteurs qu'une écriture de l'entité fait avancer (les commandes réservent du stock)
+WRITES = {
+    'produits': ('produits', 'produits_stock'),
+    'clients': ('clients',),
+    'commandes': ('commandes', 'produits_stock'),
+}
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+class ApiError(Exception):
+    def __init__(self, status, message, errors=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.errors = errors
+
+
+@api.errorhandler(ApiError)
+def _api_error(error):
+    payload = {'erreur': error.message}
+    if error.errors:
+        payload['erreurs'] = error.errors
+    return jsonify(payload), error.status
+
+
+#--------------------Lecture--------------------#
+
+def _entity(entity):
+    if entity not in RECORDS:
+        raise ApiError(404, f"Entité inconnue : {entity}")
+    return RECORDS[entity]
+
+
+def _fields(record):
+    # Champs demandés par ?fields=, dans l'ordre de l'enregistrement ; l'id est toujours renvoyé
+    requested = request.args.get('fields')
+    if not requested:
+        return record._fields
+    names = {name.strip() for name in requested.split(',') if name.strip()}
+    unknown = names - set(record._fields)
+    if unknown:
+        raise ApiError(400, f"Champs inconnus : {', '.join(sorted(unknown))}")
+    return tuple(name for name in record._fields if name == 'id' or name in names)
+
+
+def _ids(values, limit=MAX_BATCH):
+    try:
+        ids = sorted({int(value) for value in values})
+    except (TypeError, ValueError):
+        raise ApiError(400, "Les ids doivent être des entiers.")
+    if len(ids) > limit:
+        raise ApiError(400, f"Au plus {limit} ids par requête.")
+    return ids
+
+
+def _select_by_ids(connection, entity, fields, ids):
+    # Une requête IN (...) par paquet de MAX_IN_PARAMS ids ; lignes triées par id
+    rows = []
+    for start in range(0, len(ids), MAX_IN_PARAMS):
+        chunk = ids[start:start + MAX_IN_PARAMS]
+        rows += connection.execute(
+            f"SELECT {', '.join(fields)} FROM {entity} WHERE id IN ({', '.join('?' * len(chunk))}) ORDER BY id",
+            chunk).fetchall()
+    return rows
+
+
+def _conditional(entity, versions=None):
+    # ETag de la représentation demandée : version de la table + paramètres de la requête.
+    # Retourne (etag, version lue, réponse 304 ou None)
+    query = request.query_string
+    version = table_version(*(versions or VERSIONS[entity]))
+    etag = f"{entity}-{version}-{zlib.crc32(request.path.encode() + b'?' + query):08x}"
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return etag, version, response
+    return etag, version, None
+
+
+def _rows_payload(fields, rows, **extra):
+    if request.args.get('format') == 'lignes':
+        return {'champs': fields, 'lignes': [list(row) for row in rows], **extra}
+    return {'donnees': [dict(zip(fields, row)) for row in rows], **extra}
+
+
+def _json(payload, etag=None, status=200):
+    response = jsonify(payload)
+    response.status_code = status
+    if etag:
+        response.set_etag(etag, weak=True)  # Faible : la même représentation compressée ou non
+        response.cache_control.no_cache = True  # Toujours revalider : l'ETag change avec les données
+    return response
+
+
+# Liste paginée par curseur, ou lecture groupée avec ?ids=
+@api.route('/<entity>')
+@query_budget(3)
+def list_records(entity):
+    record = _entity(entity)
+    fields = _fields(record)
+    etag, _, not_modified = _conditional(entity)
+    if not_modified:
+        return not_modified
+    connection = get_connection()
+    if 'ids' in request.args:
+        ids = _ids(request.args['ids'].split(',')) if request.args['ids'] else []
+        rows = _select_by_ids(connection, entity, fields, ids)
+        return _json(_rows_payload(fields, rows), etag)
+    limit = max(1, min(request.args.get('limit', DEFAULT_LIMIT, type=int), MAX_LIMIT))
+    after = request.args.get('after', type=int)
+    query, params = f"SELECT {', '.join(fields)} FROM {entity}", []
+    if after is not None:
+        query += " WHERE id > ?"
+        params.append(after)
+    rows = connection.execute(query + " ORDER BY id LIMIT ?", params + [limit + 1]).fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1][0]
+    return _json(_rows_payload(fields, rows, suivant=next_cursor), etag)
+
+
+@api.route('/<entity>/<int:record_id>')
+@query_budget(2)
+def get_record(entity, record_id):
+    record = _entity(entity)
+    fields = _fields(record)
+    etag, _, not_modified = _conditional(entity)
+    if not_modified:
+        return not_modified
+    row = get_connection().execute(f"SELECT {', '.join(fields)} FROM {entity} WHERE id = ?", (record_id,)).fetchone()
+    if row is None:
+        raise ApiError(404, f"{entity} {record_id} introuvable")
+    return _json(dict(zip(fields, row)), etag)
+
+
+# Saisie assistée des formulaires de commande : une requête par frappe et par utilisateur,
+# souvent sur les mêmes débuts de nom. Les résultats sont gardés dans le cache du catalogue,
+# sous la version déjà lue pour l'ETag (un succès ne coûte aucune requête de plus)
+@api.route('/<entity>/suggestions')
+@query_budget(2) # État de la table (304), puis la recherche si elle n'est pas en cache
+def suggestions(entity):
+    if entity not in ('clients', 'produits'):
+        raise ApiError(404, f"Pas de suggestions pour : {entity}")
+    etag, version, not_modified = _conditional(entity, (entity,))  # Noms seulement : le stock n'y figure pas
+    if not_modified:
+        return not_modified
+    prefix = request.args.get('q', '').strip()
+    limit = max(1, min(request.args.get('limit', SUGGESTIONS_LIMIT, type=int), MAX_SUGGESTIONS))
+    rows = catalogue_cache.get(('suggestions', entity, prefix, limit), (entity,),
+                               lambda: name_suggestions(entity, prefix, limit), versions=(version,))
+    return _json(_rows_payload(('id', 'nom'), rows), etag)
+
+
+#--------------------Écriture groupée--------------------#
+
+def _batch():
+    rows = request.get_json(silent=True)
+    if isinstance(rows, dict):
+        rows = [rows]
+    if not isinstance(rows, list) or not rows:
+        raise ApiError(400, "Corps attendu : un tableau JSON d'objets.")
+    if len(rows) > MAX_BATCH:
+        raise ApiError(400, f"Au plus {MAX_BATCH} lignes par requête.")
+    return rows
+
+
+def _validate(rows, validator):
+    # Valide toutes les lignes avec les formulaires de l'import ; lève ApiError(422) s'il y a des erreurs
+    values, errors = [], {}
+    for index, row in enumerate(rows):
+        fields = {key: value for key, value in row.items() if key != 'id'} if isinstance(row, dict) else row
+        row_values, row_errors = validator.validate(fields)
+        if row_errors:
+            errors[index] = row_errors
+        values.append(row_values)
+    if errors:
+        raise ApiError(422, f"{len(errors)} ligne(s) invalide(s), rien n'a été écrit", errors)
+    return values
+
+
+def _check_clients(connection, client_ids):
+    # Index des lignes dont le client n'existe pas, en une requête IN par paquet
+    known = {row[0] for row in _select_by_ids(connection, 'clients', ('id',), sorted(set(client_ids)))}
+    return [index for index, client_id in enumerate(client_ids) if client_id not in known]
+
+
+def _reserve(cursor, index, produit_id, quantite, errors):
+    try:
+        reserve_stock(cursor, produit_id, quantite)
+    except ValueError as e:
+        errors[index] = {'produit_id': [str(e)]}
+
+
+def _written(entity, connection, ids):
+    fields = _fields(RECORDS[entity])
+    return [dict(zip(fields, row)) for row in _select_by_ids(connection, entity, fields, ids)]
+
+
+# Création groupée : 201 avec les enregistrements créés (et leur id), dans l'ordre envoyé
+@api.route('/<entity>', methods=['POST'])
+@query_budget(max_repeats=None) # Une insertion (et une réservation de stock) par ligne : répétition voulue
+def create_records(entity):
+    record = _entity(entity)
+    rows = _batch()
+    values = _validate(rows, RowValidator(entity))
+    columns = [name for name in record._fields if name != 'id']
+    placeholders = ['?'] * len(columns)
+    if entity == 'commandes':
+        columns.append('created_at')  # Date de création, comme les commandes saisies dans l'application
+        placeholders.append(NOW)
+    insert = f"INSERT INTO {entity} ({', '.join(columns)}) VALUES ({', '.join(placeholders)})"
+    with transaction() as connection:
+        cursor = connection.cursor()
+        if entity == 'commandes':
+            missing = _check_clients(connection, [row[0] for row in values])
+            errors = {index: {'client_id': ["Le client sélectionné n'existe pas."]} for index in missing}
+            for index, (client_id, produit_id, quantite) in enumerate(values):
+                if index not in errors:
+                    _reserve(cursor, index, produit_id, quantite, errors)
+            if errors:
+                raise ApiError(422, f"{len(errors)} ligne(s) refusée(s), rien n'a été écrit", errors)
+        ids = []
+        for row_values in values:
+            cursor.execute(insert, row_values)
+            ids.append(cursor.lastrowid)
+        created = {row['id']: row for row in _written(entity, connection, ids)}
+    for table in WRITES[entity]:
+        catalogue_cache.invalidate(table)  # Invalide le cache du catalogue
+    return _json({'donnees': [created[record_id] for record_id in ids]}, status=201)
+
+
+# Mise à jour groupée : chaque objet donne son id et les seuls champs à changer
+@api.route('/<entity>', methods=['PATCH'])
+@query_budget(max_repeats=None) # Un UPDATE (et un ajustement de stock) par ligne : répétition voulue
+def update_records(entity):
+    record = _entity(entity)
+    rows = _batch()
+    errors = {}
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict) or not isinstance(row.get('id'), int):
+            errors[index] = {'id': ["Un id entier est requis."]}
+        elif set(row) - set(record._fields):
+            errors[index] = {'ligne': [f"Champs inconnus : {', '.join(sorted(set(row) - set(record._fields)))}"]}
+    if errors:
+        raise ApiError(422, f"{len(errors)} ligne(s) invalide(s), rien n'a été écrit", errors)
+    ids = [row['id'] for row in rows]
+    if len(set(ids)) != len(ids):
+        raise ApiError(422, "Un même id apparaît plusieurs fois.")
+
+    validator = RowValidator(entity)
+    columns = [name for name in record._fields if name != 'id']
+    update = f"UPDATE {entity} SET {', '.join(f'{name} = ?' for name in columns)} WHERE id = ?"
+    with transaction() as connection:
+        # Lecture des lignes actuelles dans la transaction : le stock à rendre est celui écrit en base
+        current = {row.id: row for row in
+                   (record._make(row) for row in _select_by_ids(connection, entity, record._fields, _ids(ids)))}
+        errors = {index: {'id': [f"{entity} {row['id']} introuvable"]}
+                  for index, row in enumerate(rows) if row['id'] not in current}
+        if errors:
+            raise ApiError(404, f"{len(errors)} ligne(s) introuvable(s), rien n'a été écrit", errors)
+        merged = [{**current[row['id']]._asdict(), **row} for row in rows]
+        values = _validate(merged, validator)
+        cursor = connection.cursor()
+        if entity == 'commandes':
+            missing = _check_clients(connection, [row[0] for row in values])
+            errors = {index: {'client_id': ["Le client sélectionné n'existe pas."]} for index in missing}
+            for index, (client_id, produit_id, quantite) in enumerate(values):
+                if index in errors:
+                    continue
+                old = current[ids[index]]
+                if old.produit_id == produit_id:
+                    _reserve(cursor, index, produit_id, quantite - old.quantite, errors)
+                else:
+                    # Changement de produit : on rend l'ancienne quantité puis on réserve la nouvelle
+                    release_stock(cursor, old.produit_id, old.quantite)
+                    _reserve(cursor, index, produit_id, quantite, errors)
+            if errors:
+                raise ApiError(422, f"{len(errors)} ligne(s) refusée(s), rien n'a été écrit", errors)
+        cursor.executemany(update, [(*row_values, record_id) for row_values, record_id in zip(values, ids)])
+        updated = {row['id']: row for row in _written(entity, connection, sorted(ids))}
+    for table in WRITES[entity]:
+        catalogue_cache.invalidate(table)  # Invalide le cache du catalogue
+    return _json({'donnees': [updated[record_id] for record_id in ids]})
+
+
+def init_app(app):
+    app.register_blueprint(api)
@@ -1,37 +1,119 @@
-from flask import Flask, render_template, redirect, url_for, flash,session, current_app, request
+from flask import Flask, render_template, redirect, url_for, flash,session, current_app, request, jsonify, Response
 import sqlite3
 from flask_sqlalchemy import SQLAlchemy
 from wtforms import StringField, PasswordField, SubmitField
 from wtforms.validators import DataRequired
 from flask_wtf import FlaskForm
 from decimal import Decimal
-import logging
+from datetime import date, datetime, time, timedelta
+import click
+from flask.cli import AppGroup
+import json
 from functools import wraps
-import matplotlib
-matplotlib.use('Agg')
-from gestion_produit import Produit, Client, Commande
-from forms import AddProductForm, AddClientForm, AddOrderForm, EditClientForm
-import matplotlib.pyplot as plt
-
-app = Flask(__name__)
-
-app.config['SECRET_KEY'] = 'mysecretkey' # Clef de cryptage
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///users.db' # Chemin vers ta base de données SQLite des utilisateurs
-db = SQLAlchemy(app) # Création de l'instance de SQLAlchemy
+from gestion_produit import Produit, Client, Commande, EnteteCommande
+import database
+import migrations
+import importation
+import exportation
+import graphiques
+import statistiques
+import analyse_ventes
+import archivage
+import journalisation
+import analyse_journal
+import api
+import cache_http
+from cache_http import conditional
+import metriques
+import garde_requetes
+from garde_requetes import query_budget
+from cache import catalogue_cache
+from forms import AddProductForm, AddClientForm, AddOrderForm, AddOrderLinesForm, EditClientForm, MAX_LIGNES
+
+db = SQLAlchemy() # Création de l'instance de SQLAlchemy, liée à l'application par create_app
+
+#--------------création de l'application-----------------
+# Les routes (@route) et les commandes CLI (@cli.command) sont déclarées au chargement du
+# module et enregistrées par create_app. Le démarrage n'ouvre aucune connexion et ne charge
+# pas matplotlib : le schéma se crée une fois avec `flask --app app init-db`.
+
+ROUTES = [] # (règle, vue, options) de chaque route déclarée avec @route
+cli = AppGroup('app') # Commandes ajoutées à `flask` par create_app
+
+def route(rule, **options): # Même usage que @app.route, sans instance d'application
+    def decorator(view):
+        ROUTES.append((rule, view, options))
+        return view
+    return decorator
+
+def create_app(config=None):
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'mysecretkey' # Clef de cryptage
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///users.db' # Chemin vers ta base de données SQLite des utilisateurs
+    app.config.update(config or {})
+    db.init_app(app)
+    cache_http.init_app(app) # En premier : compression gzip en dernier after_request, statiques avec empreinte
+    database.init_app(app) # Une connexion SQLite réutilisable par requête, rendue au pool au teardown
+    metriques.init_app(app) # Latences par route, compteurs SQL, /metrics et en-tête Server-Timing
+    garde_requetes.init_app(app) # Budget de requêtes SQL par route (@query_budget) et détection des N+1
+    journalisation.init_app(app) # Journal JSON lines écrit par un thread dédié (file non bloquante, rotation gzip)
+    api.init_app(app) # API JSON /api/v1 : lectures groupées, écritures en une transaction, ETag
+    for rule, view, options in ROUTES:
+        app.add_url_rule(rule, view_func=view, **options)
+    for command in cli.commands.values():
+        app.cli.add_command(command)
+    return app
 
 #--------------création des decorateurs-----------------
 
-logging.basicConfig(filename='user_actions.log', level=logging.INFO) # Configuration du logging
 def log_action(func): # Création du decorateur
     @wraps(func) # Utilisation du decorateur
     def wrapper(*args, **kwargs): 
-        user_id = request.cookies.get('user_id') 
+        user_id = journalisation.current_user_id()
         action = func.__name__ 
-        logging.info(f"User ID: {user_id}, Action: {action}") 
+        journalisation.log_event('action', f"User ID: {user_id}, Action: {action}", user_id=user_id, action=action)
         return func(*args, **kwargs) 
     return wrapper 
 
 
+#--------------pagination des listes-----------------
+
+DEFAULT_PAGE_SIZE = 50 # Nombre de lignes par page par défaut
+MAX_PAGE_SIZE = 500 # Taille de page maximale acceptée
+
+def get_page_args(): # Lit les paramètres ?after=<dernier id>&page_size=<n>
+    page_size = request.args.get('page_size', DEFAULT_PAGE_SIZE, type=int)
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    after = request.args.get('after', type=int)
+    return after, page_size
+
+def get_date_cursor_arg(): # Lit ?after=<created_at>:<id> (pages d'une période, voir /commandes) ; curseur invalide ignoré
+    created_at, _, record_id = request.args.get('after', '').partition(':')
+    try:
+        return int(created_at), int(record_id)
+    except ValueError:
+        return None, None
+
+def _day_start(day, days=0): # Début du jour `day` + `days` (heure locale) en secondes Unix ; None hors des dates représentables
+    try:
+        return int(datetime.combine(day + timedelta(days=days), time.min).timestamp())
+    except (OverflowError, ValueError, OSError): # au=9999-12-31 (pas de lendemain), du=0001-01-01 (avant l'époque)
+        return None
+
+def get_date_range_args(): # Lit ?du=AAAA-MM-JJ&au=AAAA-MM-JJ (jours inclus, heure locale) ; date invalide ignorée
+    du = request.args.get('du', type=date.fromisoformat)
+    au = request.args.get('au', type=date.fromisoformat)
+    start = _day_start(du) if du else None
+    end = _day_start(au, 1) if au else None
+    return du if start is not None else None, au if end is not None else None, start, end
+
+def paginate(rows, page_size, key): # Coupe la ligne en trop et retourne le curseur de la page suivante
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return rows, key(rows[-1])
+    return rows, None
+
+
 #------------------------Classe, Methodes et Routes pour accéder au site------------------------
 
 # Création de la classe User
@@ -72,7 +154,7 @@ def check_login(username, password):# Création de la fonction check_login
     return False
 
 # Création de la route '/' index
-@app.route('/')
+@route('/')
 def index():
     user = session.get('user')
     if user:
@@ -81,7 +163,7 @@ def index():
         return render_template('index.html', user=None)
 
 # Création de la route '/register'
-@app.route('/register', methods=['GET', 'POST']) # Création de la route '/register'
+@route('/register', methods=['GET', 'POST']) # Création de la route '/register'
 def register():
     form = RegisterForm()
     if form.validate_on_submit():
@@ -92,7 +174,7 @@ def register():
     return render_template('register.html', form=form)
 
 # Création de la route '/login'
-@app.route('/login', methods=['GET', 'POST'])
+@route('/login', methods=['GET', 'POST'])
 def login():
     form = LoginForm()
     if form.validate_on_submit():
@@ -106,16 +188,16 @@ def login():
             return render_template('login.html', form=form, error='Nom d\'utilisateur ou mot de passe incorrect')
     return render_template('login.html', form=form)
 
-@app.route('/dashboard')
+@route('/dashboard')
+@query_budget(2) # État des tables (304), puis les 5 premiers produits
+@conditional('produits')
 def dashboard():
     user = session.get('user')
     if user:
-        with sqlite3.connect("app_database.db") as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT nom, description FROM produits ORDER BY id ASC LIMIT 5")  # Limite à 5 produits
-            products_data = cursor.fetchall()
-
-            static_images = ["pomme.jpg", "banane.webp", "tomate.webp", "salade.webp", "brocoli.webp"]
+        # Les 5 premiers produits, lus directement : avec le cache du catalogue, un succès coûterait
+        # déjà une requête (lecture des versions), autant que ce parcours borné de la clé primaire
+        products_data = Produit().get_first_products(5)
+        static_images = ["pomme.jpg", "banane.webp", "tomate.webp", "salade.webp", "brocoli.webp"]
         
         # Crée une liste de dictionnaires pour les produits avec des images
         products = [
@@ -130,7 +212,7 @@ def dashboard():
     else:
         return redirect(url_for('login'))
 
-@app.route('/logout')
+@route('/logout')
 def logout():
     session.pop('user', None)
     return redirect(url_for('login'))
@@ -139,7 +221,7 @@ def logout():
 
 
 # Route pour ajouter un nouveau produit
-@app.route('/add', methods=['GET', 'POST'])
+@route('/add', methods=['GET', 'POST'])
 def add_product():
     form = AddProductForm()
     if form.validate_on_submit():
@@ -159,10 +241,10 @@ def add_product():
 
 
 # Route pour modifier un produit
-@app.route('/update/<int:id>', methods=['GET', 'POST'])
+@route('/update/<int:id>', methods=['GET', 'POST'])
 def edit_product(id):
     produit = Produit()  # Créer une instance de la classe Produit
-    produit_to_update = next((p for p in produit.get_products() if p.id == id), None)  # Trouver le produit à modifier
+    produit_to_update = produit.get_product_by_id(id)  # Trouver le produit à modifier (clé primaire)
     
     if produit_to_update is None:
         flash('Produit non trouvé', 'danger')
@@ -181,7 +263,7 @@ def edit_product(id):
 
 
 # Route pour supprimer un produit
-@app.route('/delete/<int:id>', methods=['GET', 'POST'])
+@route('/delete/<int:id>', methods=['GET', 'POST'])
 def delete_product(id):
     produit = Produit()  # Créer une instance de la classe Produit
     produit.delete_product(id)  # Appeler la méthode pour supprimer le produit de la base de données
@@ -190,15 +272,23 @@ def delete_product(id):
 
 
 # Route pour afficher la liste des produits
-@app.route('/list', methods=['GET'])
+@route('/list', methods=['GET'])
+@query_budget(2) # État de la table (304), puis la page (liste ou recherche classée)
+@conditional('produits', 'produits_stock')
 def list_produits():
     type_produit = request.args.get('type_produit')  # Récupère le type sélectionné depuis l'URL
+    search_query = request.args.get('q', '').strip()  # Recherche plein texte (nom, description)
+    after, page_size = get_page_args()
     produit = Produit()  # Crée une instance de la classe Produit
     
-    if type_produit and type_produit != "":
-        produits = produit.filter_products_by_type(type_produit)  # Filtre par type
+    if search_query:
+        # Résultats classés par pertinence : le curseur est le nombre de résultats déjà affichés
+        results = produit.search_products(search_query, type_produit or None, offset=after or 0, limit=page_size + 1)
+        produits, next_cursor = paginate([p for p, _ in results], page_size, lambda _: (after or 0) + page_size)
     else:
-        produits = produit.get_products()  # Affiche tous les produits
+        # Filtre par type si demandé ; une ligne de plus que la page indique s'il reste une page suivante
+        produits = produit.get_products(after_id=after, limit=page_size + 1, type_produit=type_produit or None)
+        produits, next_cursor = paginate(produits, page_size, lambda p: p.id)
     
     types_produits = [
         'Fruits et légumes', 'Produits laitiers', 'Viandes et protéines', 
@@ -207,13 +297,31 @@ def list_produits():
         'Snacks et confiseries', 'Produits non alimentaires'
     ]
     
-    return render_template('list_produits.html', produits=produits, types_produits=types_produits, selected_type=type_produit)
+    return render_template('list_produits.html', produits=produits, types_produits=types_produits, selected_type=type_produit,
+                           search_query=search_query, after=after, next_cursor=next_cursor, page_size=page_size)
+
+
+# Recherche plein texte des produits (JSON) : /search?q=pom&type_produit=...&after=<nb déjà reçus>
+@route('/search')
+@query_budget(1)
+def search_products():
+    search_query = request.args.get('q', '').strip()
+    type_produit = request.args.get('type_produit') or None
+    after, page_size = get_page_args()
+    offset = after or 0
+    results = Produit().search_products(search_query, type_produit, offset=offset, limit=page_size + 1)
+    results, next_cursor = paginate(results, page_size, lambda _: offset + page_size)
+    return jsonify({
+        'resultats': [{'id': p.id, 'nom': p.nom, 'prix': p.prix, 'description': p.description, 'stock': p.stock,
+                       'type_produit': p.type_produit, 'score': round(-score, 4)} for p, score in results],
+        'suivant': next_cursor,
+    })
 
 
 
 # ----------------------- Routes pour les Clients -----------------------
 # Ajouter un client
-@app.route('/add_client', methods=['GET', 'POST'])
+@route('/add_client', methods=['GET', 'POST'])
 def add_client():
     form = AddClientForm()
     if form.validate_on_submit():
@@ -232,7 +340,7 @@ def add_client():
 
 
 # Route d'édition du client
-@app.route('/edit_client/<int:client_id>', methods=['GET', 'POST'])
+@route('/edit_client/<int:client_id>', methods=['GET', 'POST'])
 def edit_client(client_id):
     client_instance = Client("", "", "")  # Crée une instance de Client
     client_data = client_instance.get_client_by_id(client_id)  # Appelle la méthode pour récupérer un client par ID
@@ -240,16 +348,8 @@ def edit_client(client_id):
     if not client_data:
         return "Client non trouvé", 404  # Si le client n'existe pas dans la base de données
 
-    # Convertir les données du client en un dictionnaire
-    client_dict = {
-        'id': client_id,
-        'nom': client_data[1],
-        'email': client_data[2],
-        'adresse': client_data[3]
-    }
-
     # Initialiser le formulaire avec les données actuelles du client
-    form = EditClientForm(data=client_dict)
+    form = EditClientForm(data=client_data._asdict())
 
     if form.validate_on_submit():
         # Créer une instance de Client avec les nouvelles données
@@ -270,7 +370,7 @@ def edit_client(client_id):
 
 
 # Supprimer un client
-@app.route('/delete_client/<int:client_id>', methods=['POST'])
+@route('/delete_client/<int:client_id>', methods=['POST'])
 def delete_client(client_id):
     try:
         # Créez une instance de la classe Client avec l'ID du client à supprimer
@@ -284,89 +384,107 @@ def delete_client(client_id):
 
 
 # Afficher la liste des clients
-@app.route('/list_clients')
+@route('/list_clients')
+@query_budget(2)
+@conditional('clients')
 def list_clients():
+    after, page_size = get_page_args()
     client_instance = Client()  # Créer une instance de Client
-    clients = client_instance.get_clients()  # Appeler la méthode d'instance
-    return render_template('list_clients.html', clients=clients)
+    clients = client_instance.get_clients(after_id=after, limit=page_size + 1)  # Appeler la méthode d'instance
+    clients, next_cursor = paginate(clients, page_size, lambda c: c.id)
+    return render_template('list_clients.html', clients=clients,
+                           after=after, next_cursor=next_cursor, page_size=page_size)
 
 
 
 
 # ----------------------- Routes pour les Commandes -----------------------
 
-@app.route('/commandes')
+@route('/commandes')
+@query_budget(4)
+@conditional('commandes', 'clients', 'produits')
 def list_commandes():
+    after, page_size = get_page_args()
+    du, au, start, end = get_date_range_args()
+    after_date = None
+    period = start is not None or end is not None
+    if period:
+        after_date, after = get_date_cursor_arg()  # Ordre (date de création, id) de la période
     commande = Commande(client_id=None, produit_id=None, quantite=None)
-    orders = commande.get_commandes_with_details()
-    clients = Client("", "", "")
-    clients = clients.get_clients()
-    produits = Produit()
-    produits = produits.get_products()
+    orders = commande.get_commandes_with_details(after_id=after, limit=page_size + 1, start=start, end=end,
+                                                 after_date=after_date)
+    orders, next_cursor = paginate(orders, page_size, lambda o: f"{o.created_at}:{o.id}" if period else o.id)
+    # Le lien "Ajouter une commande" n'a besoin que de savoir s'il existe des clients et des produits
+    clients = Client().has_clients()
+    produits = Produit().has_products()
     
     return render_template('list_commandes.html', 
                          orders=orders,
                          clients=clients, 
-                         produits=produits)
+                         produits=produits,
+                         after=after, next_cursor=next_cursor, page_size=page_size, du=du, au=au)
+
+
+# Client et produit déjà choisis, affichés dans les champs de saisie assistée (une lecture par
+# clé primaire) : les formulaires n'embarquent plus les listes, les noms sont proposés par
+# /api/v1/<entité>/suggestions au fil de la frappe
+def selected_records(form):
+    client = Client().get_client_by_id(form.client_id.data) if form.client_id.data else None
+    produit = Produit().get_product_by_id(form.produit_id.data) if form.produit_id.data else None
+    return {'client': client, 'produit': produit}
+
+
+# Produits déjà choisis sur les lignes d'une commande réaffichée, lus en une requête IN (...)
+def selected_products(form):
+    produit_ids = [ligne.produit_id.data for ligne in form.lignes if ligne.produit_id.data]
+    return {produit.id: produit for produit in Produit().get_products_by_ids(produit_ids)} if produit_ids else {}
 
 
-@app.route('/add_order', methods=['GET', 'POST'])
+# Commande de plusieurs lignes (lignes-<n>-produit_id / lignes-<n>-quantite) en un seul envoi :
+# une transaction pour toutes les lignes, voir EnteteCommande.add_commande
+@route('/add_order', methods=['GET', 'POST'])
+@query_budget(8) # 2 tests d'existence, puis BEGIN et 5 requêtes quel que soit le nombre de lignes (ou 2 pour réafficher)
 def add_order():
-    form = AddOrderForm()
-    client = Client()
-    produit = Produit()
-    
-    clients = client.get_clients()
-    produits = produit.get_products()
+    form = AddOrderLinesForm()
     
     # Vérifiez si des clients ou produits sont disponibles
-    if not clients:
+    if not Client().has_clients():
         flash("Aucun client disponible pour passer une commande.", 'danger')
         return redirect(url_for('list_commandes'))
-    if not produits:
+    if not Produit().has_products():
         flash("Aucun produit disponible pour passer une commande.", 'danger')
         return redirect(url_for('list_commandes'))
-    
-    # Générer les choix pour le formulaire
-    form.client_id.choices = [(c[0], c[1]) for c in clients]
-    form.produit_id.choices = [(p.id, p.nom) for p in produits]
 
     if form.validate_on_submit():
-        commande = Commande(
+        commande = EnteteCommande(
             client_id=form.client_id.data,
-            produit_id=form.produit_id.data,
-            quantite=form.quantite.data
+            lignes=[(ligne.produit_id.data, ligne.quantite.data) for ligne in form.lignes]
         )
         try:
             commande.add_commande()
-            flash('Commande ajoutée avec succès.', 'success')
+            flash(f'Commande ajoutée avec succès ({len(form.lignes)} ligne(s)).', 'success')
             return redirect(url_for('list_commandes'))
         except ValueError as e:
             flash(str(e), 'danger')
 
-    return render_template('add_order.html', form=form)
+    client = Client().get_client_by_id(form.client_id.data) if form.client_id.data else None
+    return render_template('add_order.html', form=form, client=client, produits=selected_products(form),
+                           max_lignes=MAX_LIGNES)
 
 # Création de la route '/edit_order/<int:order_id>'
-@app.route('/edit_order/<int:order_id>', methods=['GET', 'POST'])
+@route('/edit_order/<int:order_id>', methods=['GET', 'POST'])
+@query_budget(8) # Commande, transaction (5, 6 si le client d'une commande de plusieurs lignes change), 2 noms si le formulaire est réaffiché
 def edit_order(order_id):
     form = AddOrderForm()
     
-    clients = Client("", "", "")
-    clients_list = clients.get_clients()
-    form.client_id.choices = [(c[0], c[1]) for c in clients_list]
-    
-    produits = Produit()
-    produits_list = produits.get_products()
-    form.produit_id.choices = [(p.id, p.nom) for p in produits_list]
-    
     commande = Commande()
     current_order = commande.get_order_by_id(order_id)
     
     if request.method == 'GET':
         # Pre-fill the form with current values
-        form.client_id.data = current_order[1]  
-        form.produit_id.data = current_order[2] 
-        form.quantite.data = current_order[3] 
+        form.client_id.data = current_order.client_id
+        form.produit_id.data = current_order.produit_id
+        form.quantite.data = current_order.quantite
     
     if form.validate_on_submit():
         try:
@@ -375,38 +493,24 @@ def edit_order(order_id):
                 produit_id=form.produit_id.data,
                 quantite=form.quantite.data
             )
-            updated_order.update_commande(order_id)
-            flash('Commande mise à jour avec succès.', 'success')
+            moved = updated_order.update_commande(order_id)
+            if moved:
+                flash(f"Commande mise à jour avec succès : le client des {moved} autre(s) ligne(s) de la "
+                      f"commande n°{updated_order.entete_id} a aussi changé.", 'success')
+            else:
+                flash('Commande mise à jour avec succès.', 'success')
             return redirect(url_for('list_commandes'))
         except ValueError as e:
             flash(str(e), 'error')
     
-    return render_template('edit_order.html', form=form, order_id=order_id)
+    return render_template('edit_order.html', form=form, order_id=order_id, **selected_records(form))
 
 # Création de la route '/delete_order/<int:order_id>'
-@app.route('/delete_order/<int:order_id>', methods=['POST'])
+@route('/delete_order/<int:order_id>', methods=['POST'])
 def delete_order(order_id):
     try:
         commande = Commande()
-        order = commande.get_order_by_id(order_id)
-        if not order:
-            flash('Commande non trouvée.', 'error')
-            return redirect(url_for('list_commandes'))
-
-        produit = Produit()
-        product = next((p for p in produit.get_products() if p.id == order[2]), None)  
-        if product:
-            product.stock += order[3]  
-            produit.update_product(
-                produit_id=product.id,
-                nom=product.nom,
-                prix=product.prix,
-                description=product.description,
-                stock=product.stock,
-                type_produit=product.type_produit
-            )
-
-        commande.delete_commande(order_id)
+        commande.delete_commande(order_id)  # Remet la quantité en stock et supprime, dans une seule transaction
 
         flash('Commande supprimée avec succès.', 'success')
     except Exception as e:
@@ -416,100 +520,191 @@ def delete_order(order_id):
  
 
 
-#-----------------------Methodes et Routes pour les Graphiques -----------------------
+#-----------------------Import en masse-----------------------
 
-# Création de la fonction pour générer le graphique circulaire
-def generate_pie_chart(app):
-    # Connexion à la base de données
-    with app.open_resource('app_database.db') as db_file:
-        conn = sqlite3.connect(db_file.name)
-        cursor = conn.cursor()
-
-        # Requête pour récupérer les données des types de produits
-        cursor.execute('SELECT type_produit, COUNT(*) FROM produits GROUP BY type_produit')
-        rows = cursor.fetchall()
-
-        # Extraire les types de produits et leurs comptes
-        types = [row[0] for row in rows]
-        counts = [row[1] for row in rows]
-
-        # Créer le graphique circulaire
-        plt.figure(figsize=(8, 6))  # Taille du graphique
-        plt.pie(counts, labels=types, autopct='%1.1f%%', startangle=90)
-        plt.axis('equal')  # Assurer que le graphique est un cercle
-        plt.title('Répartition des Produits par Type')
-
-        # Sauvegarder le graphique dans un fichier
-        plt.savefig('static/product_share.png', transparent=True)
-        plt.close()
-
-# Création de la fonction pour générer le graphique en barres
-def generate_category_bar_chart(app):
-    # Connexion à la base de données
-    with app.open_resource('app_database.db') as db_file:
-        conn = sqlite3.connect(db_file.name)
-        cursor = conn.cursor()
-
-        # Requête pour récupérer les données des catégories
-        cursor.execute('SELECT stock, COUNT(*) FROM produits GROUP BY stock ORDER BY COUNT(*) DESC LIMIT 3')
-        rows = cursor.fetchall()
-
-        # Extraire les noms de catégories et les comptes
-        categories = [row[0] for row in rows]
-        counts = [row[1] for row in rows]
-
-        # Créer le graphique en barres
-        plt.bar(categories, counts)
-        plt.xlabel('Catégorie')
-        plt.ylabel('Nombre de Produits')
-        plt.title('Top 5 des Catégories par Nombre de Produits')
-
-        # Sauvegarder le graphique dans un fichier
-        plt.savefig('static/category_bar_chart.png', transparent=True)
-        plt.close()
-
-# Création de la fonction pour générer l'histogramme
-def generate_price_histogram(app):
-    # Connexion à la base de données
-    with app.open_resource('app_database.db') as db_file:
-        conn = sqlite3.connect(db_file.name)
-        cursor = conn.cursor()
-
-        # Requête pour récupérer les données de prix
-        cursor.execute('SELECT prix FROM produits')
-        rows = cursor.fetchall()
-
-        # Extraire les valeurs des prix
-        prices = [row[0] for row in rows]
-
-        # Créer l'histogramme
-        plt.hist(prices, bins=50)
-        plt.xlabel('Prix')
-        plt.ylabel('Fréquence')
-        plt.title('Répartition des Prix des Produits')
-
-        # Sauvegarder le graphique dans un fichier
-        plt.savefig('static/price_histogram.png', transparent=True)
-        plt.close()
+# Import d'un fichier CSV / NDJSON / JSON (champ 'fichier') : produits, clients ou commandes
+@route('/import/<entity>', methods=['POST'])
+@query_budget(max_repeats=None) # Une réservation de stock par ligne importée : répétition voulue
+def import_data(entity):
+    if entity not in importation.ENTITIES:
+        return jsonify({'erreur': f"Entité inconnue : {entity}"}), 404
+    upload = request.files.get('fichier')
+    if upload is None:
+        return jsonify({'erreur': "Aucun fichier envoyé (champ 'fichier')."}), 400
+    fmt = request.form.get('format') or importation.detect_format(upload.filename)
+    report = importation.import_stream(entity, importation.open_upload(upload), fmt)
+    return jsonify(report), 200 if 'erreur' not in report else 400
+
+
+#-----------------------Export en flux-----------------------
+
+# Export complet d'une table (commandes avec noms client/produit) : /export/commandes.csv?gzip=1
+@route('/export/<entity>.<fmt>')
+def export_data(entity, fmt):
+    if entity not in exportation.EXPORTS or fmt not in exportation.FORMATS:
+        return jsonify({'erreur': f"Export inconnu : {entity}.{fmt}"}), 404
+    compress = request.args.get('gzip', '0') not in ('', '0', 'false')
+    filename = f"{entity}.{fmt}" + (".gz" if compress else "")
+    return Response(
+        exportation.iter_export(entity, fmt, compress),  # Générateur : la mémoire reste constante
+        mimetype='application/gzip' if compress else exportation.FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+
+#-----------------------Methodes et Routes pour les Graphiques -----------------------
 
 # Création de la route pour afficher les graphiques
-@app.route('/graph')
+@route('/graph')
 def graph():
-    # Générer les graphiques à chaque chargement de la page
-    generate_pie_chart(current_app)
-    generate_category_bar_chart(current_app)
-    generate_price_histogram(current_app)
-
-    # Rendre la page avec les graphiques
-    return render_template('graph.html', 
-        product_share='static/product_share.png', 
-        category_bar_chart='static/category_bar_chart.png', 
-        price_histogram='static/price_histogram.png')
+    # Les images sont servies par la route 'chart', depuis le cache en mémoire
+    return render_template('graph.html')
+
+# Image PNG d'un graphique, régénérée seulement quand une des tables qu'il lit a changé
+@route('/graph/<name>.png')
+@query_budget(max_repeats=None) # 304 ou image en cache : une requête ; graphiques de ventes : lecture par lots
+def chart(name):
+    if name not in graphiques.CHARTS:
+        return "Graphique inconnu", 404
+    current_version = graphiques.chart_version(name)
+    etag = f"{name}-{current_version}"
+    if etag in request.if_none_match:
+        # Le navigateur a déjà la version courante : ni rendu ni envoi
+        response = Response(status=304)
+    else:
+        version, png = graphiques.chart_cache.get(name, current_version)
+        etag = f"{name}-{version}"
+        response = Response(png, mimetype='image/png')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True  # Toujours revalider : l'ETag change avec les données
+    return response
+
+# Agrégats lus dans les tables de synthèse (JSON)
+@route('/stats')
+def stats():
+    limit = request.args.get('limit', 10, type=int)
+    return jsonify({
+        'produits_par_type': dict(statistiques.products_by_type()),
+        'niveaux_de_stock': [{'stock': stock, 'nb': nb} for stock, nb in statistiques.top_stock_levels(limit)],
+        'tranches_de_prix': dict(statistiques.price_buckets()),
+        'commandes_par_client': [dict(zip(('client_id', 'nom', 'nb_commandes', 'quantite'), row))
+                                 for row in statistiques.order_totals_by_client(limit)],
+        'commandes_par_produit': [dict(zip(('produit_id', 'nom', 'nb_commandes', 'quantite'), row))
+                                  for row in statistiques.order_totals_by_product(limit)],
+    })
+
+# Chiffre d'affaires, unités et classements calculés en mémoire (analyse_ventes), JSON
+@route('/stats/ventes')
+@query_budget(max_repeats=None) # Chargement des commandes par lots : répétition voulue
+@conditional('commandes', 'produits', 'clients')
+def sales_stats():
+    limit = min(max(request.args.get('limit', analyse_ventes.DEFAULT_TOP, type=int), 1), analyse_ventes.MAX_TOP)
+    report = analyse_ventes.sales_report(limit)
+    report['cache'] = analyse_ventes.sales.stats()
+    return jsonify(report)
+
+# Compteurs du cache du catalogue (succès, échecs, évictions, invalidations)
+@route('/cache/stats')
+def cache_stats():
+    return jsonify(catalogue_cache.stats())
+
+#----------------------- Commandes CLI (flask --app app ...) -----------------------
+
+# Crée ou met à jour le schéma : migrations de app_database.db et table des utilisateurs
+def init_db():
+    applied = migrations.migrate()
+    db.create_all()
+    return applied
+
+# À lancer une fois à l'installation puis après chaque mise à jour : flask --app app init-db
+@cli.command('init-db')
+def init_db_command():
+    applied = init_db()
+    print(f"Migrations appliquées : {applied or 'aucune'} (version {migrations.schema_version()}), utilisateurs prêts")
+
+# Applique les migrations du schéma en attente
+@cli.command('migrate-db')
+def migrate_db_command():
+    applied = migrations.migrate()
+    print(f"Migrations appliquées : {applied or 'aucune'} (version {migrations.schema_version()})")
+
+# Affiche le plan d'exécution des requêtes des routes et échoue si l'une d'elles balaye une table
+@cli.command('check-query-plans')
+def check_query_plans_command():
+    failures = 0
+    for route, sql, plan, ok in migrations.check_query_plans():
+        print(f"[{'OK' if ok else 'SCAN'}] {route} : {sql}")
+        for line in plan:
+            print(f"        {line}")
+        failures += not ok
+    if failures:
+        raise SystemExit(f"{failures} requête(s) sans index")
+
+# Importe un fichier en masse : flask import-data produits catalogue.csv
+@cli.command('import-data')
+@click.argument('entity', type=click.Choice(importation.ENTITIES))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(sorted(importation.READERS)), default=None)
+@click.option('--chunk-size', default=importation.CHUNK_SIZE, show_default=True)
+def import_data_command(entity, path, fmt, chunk_size):
+    report = importation.import_file(entity, path, fmt, chunk_size)
+    print(f"{report['lues']} ligne(s) lue(s), {report['inserees']} insérée(s), "
+          f"{len(report['rejetees'])} rejetée(s) en {report['duree_s']} s ({report['lignes_par_seconde']} lignes/s)")
+    for rejected in report['rejetees']:
+        print(f"  ligne {rejected['ligne']} : {rejected['erreurs']}")
+    if 'erreur' in report:
+        raise SystemExit(report['erreur'])
+
+# Compare les tables de synthèse à un recalcul complet, puis les reconstruit (sauf --check)
+@cli.command('rebuild-stats')
+@click.option('--check', is_flag=True, help="Vérifie seulement, échoue en cas d'écart")
+def rebuild_stats_command(check):
+    differences = statistiques.check_summaries()
+    for table, diff in differences.items():
+        print(f"{table} : {len(diff)} écart(s)")
+        for key, stored, expected in diff[:20]:
+            print(f"    {key} : stocké {stored}, attendu {expected}")
+    if not differences:
+        print("Tables de synthèse cohérentes.")
+    if check:
+        if differences:
+            raise SystemExit(1)
+        return
+    statistiques.rebuild_summaries()
+    print("Tables de synthèse reconstruites.")
+
+# Déplace les commandes anciennes vers commandes_archive (ou un fichier d'archive), par paquets
+@cli.command('archive-orders')
+@click.option('--days', default=archivage.ARCHIVE_AFTER_DAYS, show_default=True, help="Archive les commandes plus anciennes")
+@click.option('--before', type=click.DateTime(formats=['%Y-%m-%d']), help="Date limite (AAAA-MM-JJ), au lieu de --days")
+@click.option('--batch-size', default=archivage.BATCH_SIZE, show_default=True, help="Commandes déplacées par transaction")
+@click.option('--archive-db', type=click.Path(dir_okay=False), help="Fichier SQLite d'archive (défaut : même base)")
+@click.option('--max-batches', type=int, help="S'arrête après ce nombre de paquets")
+@click.option('--pause', default=archivage.PAUSE, show_default=True, help="Secondes entre deux paquets")
+def archive_orders_command(days, before, batch_size, archive_db, max_batches, pause):
+    cutoff = int(before.timestamp()) if before else archivage.cutoff_from_days(days)
+    report = archivage.archive_orders(cutoff, batch_size, archive_db, max_batches, pause)
+    print(f"{report['deplacees']} commande(s) antérieure(s) au {report['date_limite']} archivée(s) dans "
+          f"{report['archive']} en {report['paquets']} paquet(s), {report['duree_s']} s "
+          f"(paquet le plus long : {report['paquet_max_ms']} ms)")
+
+# Analyse user_actions.log (et ses fichiers tournés, même gzip) : routes, statuts, 304 des
+# fichiers statiques, actions par utilisateur, trafic par tranche. --state : reprise incrémentale
+@cli.command('analyze-log')
+@click.argument('paths', nargs=-1, type=click.Path())
+@click.option('--state', type=click.Path(dir_okay=False), help="Fichier d'état pour ne lire que les nouvelles lignes")
+@click.option('--bucket', default=analyse_journal.BUCKET_MINUTES, show_default=True, help="Tranche de trafic, en minutes")
+@click.option('--top', default=20, show_default=True)
+def analyze_log_command(paths, state, bucket, top):
+    stats = analyse_journal.analyze(paths or [journalisation.LOG_FILE], state, bucket)
+    print(json.dumps(stats.report(top), indent=2, ensure_ascii=False))
+
+# Instance utilisée par `flask --app app` et les serveurs WSGI (app:app)
+app = create_app()
 
 if __name__ == '__main__':
 
     # Initialize the database by pushing the app context
     app.app_context().push()
-    db.create_all()
+    init_db()
     app.run(debug=True)
 
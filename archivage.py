@@ -0,0 +1,105 @@
+import time
+from datetime import datetime, timedelta
+
+from database import get_connection, transaction
+
+#--------------------Archivage des commandes anciennes--------------------#
+# Les commandes créées avant une date limite passent de `commandes` à `commandes_archive`,
+# dans la même base ou dans un fichier séparé (attaché le temps de l'archivage). Le
+# déplacement se fait par paquets de `batch_size` lignes, une transaction par paquet :
+# le verrou d'écriture n'est tenu que le temps d'un paquet, et une courte pause après chaque
+# paquet laisse passer les écritures de l'application qui attendaient (le gestionnaire
+# d'attente de SQLite réessaie par intervalles : sans pause, l'archivage reprendrait le
+# verrou avant elles). Les paquets sont lus dans l'ordre de idx_commandes_created_at.
+# Les en-têtes des commandes de plusieurs lignes (entetes_commande) sont copiés dans
+# entetes_commande_archive avec leurs lignes, dans la même transaction : le trigger de la
+# migration 8 supprime l'en-tête quand sa dernière ligne quitte `commandes`.
+# Le stock n'est pas rendu (la commande a été passée) ; les tables de synthèse des
+# commandes et l'analyse des ventes ne portent ensuite que sur les commandes non archivées.
+# Avec une archive dans un autre fichier en mode WAL, le commit des deux fichiers n'est pas
+# atomique : après une interruption, une commande peut se trouver dans les deux tables ;
+# l'archivage suivant la réécrit dans l'archive (INSERT OR REPLACE) puis la supprime.
+
+ARCHIVE_AFTER_DAYS = 365  # Âge des commandes archivées par défaut
+BATCH_SIZE = 5000  # Commandes déplacées par transaction
+PAUSE = 0.05  # Secondes entre deux paquets
+ARCHIVE_SCHEMA = 'archive'  # Nom de la base attachée quand l'archive est un fichier séparé
+
+# Colonnes de `commandes` copiées ; l'archive ajoute archived_at
+COLUMNS = "id, client_id, produit_id, quantite, entete_id, created_at"
+
+# Paquet suivant de commandes à archiver (aussi vérifié par flask check-query-plans)
+BATCH = "SELECT id FROM commandes WHERE created_at < ? ORDER BY created_at, id LIMIT ?"
+
+
+def cutoff_from_days(days):
+    # Date limite (secondes Unix) : maintenant moins `days` jours
+    return int((datetime.now() - timedelta(days=days)).timestamp())
+
+
+def _create_archive(connection, schema):
+    connection.execute(f"""
+        CREATE TABLE IF NOT EXISTS {schema}.commandes_archive (
+            id INTEGER PRIMARY KEY,
+            client_id INTEGER NOT NULL,
+            produit_id INTEGER NOT NULL,
+            quantite INTEGER NOT NULL,
+            entete_id INTEGER,
+            created_at INTEGER NOT NULL,
+            archived_at INTEGER NOT NULL
+        )
+    """)
+    connection.execute(
+        f"CREATE INDEX IF NOT EXISTS {schema}.idx_commandes_archive_created_at ON commandes_archive (created_at, id)")
+    connection.execute(f"""
+        CREATE TABLE IF NOT EXISTS {schema}.entetes_commande_archive (
+            id INTEGER PRIMARY KEY,
+            client_id INTEGER NOT NULL
+        )
+    """)
+
+
+def archive_orders(cutoff, batch_size=BATCH_SIZE, archive_path=None, max_batches=None, pause=PAUSE, connection=None):
+    # Déplace les commandes créées avant `cutoff` (secondes Unix) ; retourne un rapport
+    # (commandes déplacées, paquets, durée du plus long paquet, débit)
+    connection = connection or get_connection()
+    schema = 'main'
+    if archive_path:
+        connection.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (archive_path,))
+        schema = ARCHIVE_SCHEMA
+    report = {'date_limite': datetime.fromtimestamp(cutoff).isoformat(timespec='seconds'),
+              'archive': archive_path or 'commandes_archive', 'deplacees': 0, 'paquets': 0, 'paquet_max_ms': 0.0}
+    start = time.perf_counter()
+    try:
+        with transaction(connection):
+            _create_archive(connection, schema)
+        while max_batches is None or report['paquets'] < max_batches:
+            batch_start = time.perf_counter()
+            with transaction(connection):
+                # Même sous-requête pour les copies et la suppression : sous le verrou d'écriture,
+                # elle désigne les mêmes lignes. Les en-têtes sont copiés avant que la suppression
+                # des lignes ne les efface
+                connection.execute(
+                    f"INSERT OR REPLACE INTO {schema}.entetes_commande_archive (id, client_id) "
+                    f"SELECT id, client_id FROM entetes_commande WHERE id IN "
+                    f"(SELECT entete_id FROM commandes WHERE id IN ({BATCH}) AND entete_id IS NOT NULL)",
+                    (cutoff, batch_size))
+                connection.execute(
+                    f"INSERT OR REPLACE INTO {schema}.commandes_archive ({COLUMNS}, archived_at) "
+                    f"SELECT {COLUMNS}, CAST(strftime('%s', 'now') AS INTEGER) FROM commandes WHERE id IN ({BATCH})",
+                    (cutoff, batch_size))
+                moved = connection.execute(f"DELETE FROM commandes WHERE id IN ({BATCH})", (cutoff, batch_size)).rowcount
+            if not moved:
+                break
+            report['deplacees'] += moved
+            report['paquets'] += 1
+            report['paquet_max_ms'] = max(report['paquet_max_ms'], round((time.perf_counter() - batch_start) * 1000, 2))
+            if moved < batch_size:
+                break
+            time.sleep(pause)
+    finally:
+        if archive_path:
+            connection.execute(f"DETACH DATABASE {ARCHIVE_SCHEMA}")  # La connexion retourne au pool
+    report['duree_s'] = round(time.perf_counter() - start, 3)
+    report['lignes_par_seconde'] = round(report['deplacees'] / report['duree_s']) if report['duree_s'] else 0
+    return report
@@ -0,0 +1,161 @@
+# Benchmark de l'archivage des commandes (archivage.py) sur une base de N commandes étalées
+# sur HISTORY_DAYS jours : pour chaque taille de paquet, sur une copie neuve de la base,
+#   - archivage des commandes de plus de --jours jours (dans la base, ou dans un fichier
+#     séparé avec --fichier), durée totale, débit et durée du plus long paquet ;
+#   - pendant l'archivage, un thread passe des commandes (Commande.add_commande) : la
+#     latence de ces écritures (médiane, p95, max) montre le temps d'attente du verrou ;
+#   - avant et après : taille de `commandes`, première page de /commandes et d'une période
+#     d'un mois (get_commandes_with_details).
+#
+# Usage (depuis la racine du dépôt) :
+#   python -m benchmarks.bench_archivage --commandes 1000000 --paquets 1000,5000,50000
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import archivage
+import database
+import migrations
+from benchmarks.generer_donnees import generate
+from gestion_produit import Commande
+
+PAGE_SIZE = 50
+
+
+def _percentile(values, ratio):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * ratio))] if values else 0.0
+
+
+def _pages(connection):
+    # Durées (ms) de la première page de /commandes et de celle d'une période d'un mois
+    now = int(time.time())
+    timings = {}
+    for name, bounds in (('page_ms', {}), ('page_periode_ms', {'start': now - 60 * 86400, 'end': now - 30 * 86400})):
+        start = time.perf_counter()
+        Commande().get_commandes_with_details(limit=PAGE_SIZE + 1, **bounds)
+        timings[name] = round((time.perf_counter() - start) * 1000, 2)
+    timings['commandes'] = connection.execute("SELECT COUNT(*) FROM commandes").fetchone()[0]
+    return timings
+
+
+def _writer(stop, client_id, produit_id, latencies):
+    # Une commande toutes les 5 ms environ, dans une connexion propre au thread
+    while not stop.is_set():
+        start = time.perf_counter()
+        Commande(client_id, produit_id, 1).add_commande()
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.005)
+    database.close_connection()
+
+
+def measure(template, workdir, batch_size, args):
+    path = os.path.join(workdir, f'archivage_{batch_size}.db')
+    archive_path = os.path.join(workdir, f'archive_{batch_size}.db') if args.fichier else None
+    shutil.copy(template, path)
+    database.configure(path)
+    connection = database.get_connection()
+    client_id = connection.execute("SELECT MIN(id) FROM clients").fetchone()[0]
+    produit_id = connection.execute("SELECT MIN(id) FROM produits").fetchone()[0]
+    before = _pages(connection)
+
+    latencies, stop = [], threading.Event()
+    writer = threading.Thread(target=_writer, args=(stop, client_id, produit_id, latencies))
+    writer.start()
+    try:
+        report = archivage.archive_orders(archivage.cutoff_from_days(args.jours), batch_size, archive_path,
+                                          pause=args.pause, connection=connection)
+    finally:
+        stop.set()
+        writer.join()
+    after = _pages(connection)
+    database.close_connection()
+    for filename in (path, archive_path):
+        if filename:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(filename + suffix):
+                    os.remove(filename + suffix)
+    return {
+        'deplacees': report['deplacees'],
+        'paquets': report['paquets'],
+        'duree_s': report['duree_s'],
+        'lignes_par_seconde': report['lignes_par_seconde'],
+        'paquet_max_ms': report['paquet_max_ms'],
+        'ecritures_concurrentes': {
+            'nombre': len(latencies),
+            'mediane_ms': round(statistics.median(latencies) * 1000, 2) if latencies else 0.0,
+            'p95_ms': round(_percentile(latencies, 0.95) * 1000, 2),
+            'max_ms': round(max(latencies, default=0.0) * 1000, 2),
+        },
+        'avant': before,
+        'apres': after,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archivage des commandes anciennes par paquets")
+    parser.add_argument('--commandes', type=int, default=1000000)
+    parser.add_argument('--produits', type=int, default=10000)
+    parser.add_argument('--clients', type=int, default=5000)
+    parser.add_argument('--jours', type=int, default=archivage.ARCHIVE_AFTER_DAYS, help="âge des commandes archivées")
+    parser.add_argument('--paquets', default='1000,5000,50000', help="tailles de paquet, séparées par des virgules")
+    parser.add_argument('--pause', type=float, default=archivage.PAUSE, help="secondes entre deux paquets")
+    parser.add_argument('--fichier', action='store_true', help="archive dans un fichier séparé (base attachée)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="fichier du rapport JSON (défaut : sortie standard)")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.paquets.split(',')]
+    output = os.path.abspath(args.output) if args.output else None
+
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)  # Journal et fichiers de l'application hors du dépôt
+    template = os.path.join(workdir, 'modele.db')
+    database.configure(template)
+    migrations.migrate()
+    connection = database.get_connection()
+    generate(connection, args.produits, args.clients, args.commandes, args.seed)
+    with database.transaction(connection):
+        connection.execute("UPDATE produits SET stock = 1000000")  # Aucun refus pour stock insuffisant
+    connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")  # Copie complète dans le seul fichier principal
+    database.close_connection()
+
+    results = {}
+    for batch_size in sizes:
+        results[str(batch_size)] = result = measure(template, workdir, batch_size, args)
+        writes = result['ecritures_concurrentes']
+        print(f"paquets de {batch_size} : {result['deplacees']} commandes en {result['duree_s']} s, "
+              f"paquet max {result['paquet_max_ms']} ms ; écritures concurrentes p95 {writes['p95_ms']} ms, "
+              f"max {writes['max_ms']} ms", file=sys.stderr)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'commandes': args.commandes,
+            'jours': args.jours,
+            'pause_s': args.pause,
+            'fichier_separe': args.fichier,
+            'seed': args.seed,
+        },
+        'resultats': results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
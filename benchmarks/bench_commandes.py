@@ -0,0 +1,176 @@
+# Benchmark des commandes de plusieurs lignes : un panier de N produits passé
+#   - une ligne par requête : N envois de /add_order d'une ligne chacun (le seul moyen
+#     avant les en-têtes de commande), chacun avec ses contrôles et sa transaction ;
+#   - en une requête : un seul envoi de /add_order avec N lignes (EnteteCommande), produits
+#     vérifiés en une requête IN (...), stock réservé et lignes insérées en une transaction.
+# Les deux chemins sont aussi mesurés sans HTTP, au niveau du modèle (Commande.add_commande
+# N fois contre EnteteCommande.add_commande). Le rapport JSON donne, par taille de panier et
+# par chemin, la durée par panier (médiane, p95), les requêtes SQL et les transactions.
+#
+# Usage (depuis la racine du dépôt) :
+#   python -m benchmarks.bench_commandes --lignes 1,10,30,100 --paniers 20
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import jinja2
+
+import database
+import migrations
+from benchmarks.generer_donnees import generate
+from gestion_produit import Commande, EnteteCommande
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries')
+
+
+def _order_form(client_id, lignes):
+    data = {'client_id': client_id}
+    for index, produit_id in enumerate(lignes):
+        data[f'lignes-{index}-produit_id'] = produit_id
+        data[f'lignes-{index}-quantite'] = 1
+    return data
+
+
+def _post(client, data):
+    # Retourne (requêtes SQL de l'envoi, d'après l'en-tête Server-Timing ; durée) ; échoue si refusé
+    start = time.perf_counter()
+    response = client.post('/add_order', data=data)
+    duration = time.perf_counter() - start
+    if response.status_code != 302:
+        raise RuntimeError(f"/add_order a répondu {response.status_code}")
+    with client.session_transaction() as session:
+        session.pop('_flashes', None)  # Redirection non suivie : le message ne doit pas s'accumuler dans le cookie
+    return int(SERVER_TIMING_QUERIES.search(response.headers['Server-Timing']).group(1)), duration
+
+
+def http_ligne_par_requete(client, client_id, lignes):
+    envois = [_post(client, _order_form(client_id, [produit_id])) for produit_id in lignes]
+    return sum(queries for queries, _ in envois), len(lignes), sum(duration for _, duration in envois)
+
+
+def http_une_requete(client, client_id, lignes):
+    queries, duration = _post(client, _order_form(client_id, lignes))
+    return queries, 1, duration
+
+
+def _counted(call):
+    # Retourne (requêtes SQL, durée) de l'appel
+    stats = database.start_query_stats()
+    start = time.perf_counter()
+    try:
+        call()
+    finally:
+        duration = time.perf_counter() - start
+        database.stop_query_stats()
+    return stats.queries, duration
+
+
+def modele_ligne_par_commande(client, client_id, lignes):
+    appels = [_counted(Commande(client_id, produit_id, 1).add_commande) for produit_id in lignes]
+    return sum(queries for queries, _ in appels), len(lignes), sum(duration for _, duration in appels)
+
+
+def modele_entete(client, client_id, lignes):
+    queries, duration = _counted(EnteteCommande(client_id, [(produit_id, 1) for produit_id in lignes]).add_commande)
+    return queries, 1, duration
+
+
+PATHS = {
+    'http_une_ligne_par_requete': http_ligne_par_requete,
+    'http_une_requete': http_une_requete,
+    'modele_une_ligne_par_commande': modele_ligne_par_commande,
+    'modele_entete_commande': modele_entete,
+}
+
+
+def measure(path, client, client_ids, produit_ids, size, baskets, rng):
+    durations, queries, transactions = [], [], 0
+    for _ in range(baskets):
+        count, commits, duration = path(client, rng.choice(client_ids), rng.sample(produit_ids, size))
+        durations.append(duration)
+        queries.append(count)
+        transactions = commits
+    durations.sort()
+    return {
+        'paniers': baskets,
+        'mediane_ms': round(statistics.median(durations) * 1000, 2),
+        'p95_ms': round(durations[min(len(durations) - 1, int(len(durations) * 0.95))] * 1000, 2),
+        'par_ligne_ms': round(statistics.median(durations) * 1000 / size, 3),
+        'requetes_sql': round(statistics.median(queries)),
+        'transactions': transactions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Commandes de plusieurs lignes : une requête contre une par ligne")
+    parser.add_argument('--lignes', default='1,10,30,100', help="tailles de panier, séparées par des virgules")
+    parser.add_argument('--paniers', type=int, default=20, help="paniers passés par taille et par chemin")
+    parser.add_argument('--produits', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="fichier du rapport JSON (défaut : sortie standard)")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.lignes.split(',')]
+    output = os.path.abspath(args.output) if args.output else None
+
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)  # Journal et fichiers de l'application hors du dépôt
+    database.configure(os.path.join(workdir, 'bench_commandes.db'))
+    migrations.migrate()
+    connection = database.get_connection()
+    generate(connection, args.produits, max(1, args.produits // 10), 0, args.seed)
+    with database.transaction(connection):
+        connection.execute("UPDATE produits SET stock = 1000000")  # Aucun refus pour stock insuffisant
+    produit_ids = [row[0] for row in connection.execute("SELECT id FROM produits")]
+    client_ids = [row[0] for row in connection.execute("SELECT id FROM clients")]
+    database.close_connection()
+
+    from app import create_app
+    app = create_app({'WTF_CSRF_ENABLED': False, 'QUERY_BUDGET': None, 'SERVER_TIMING': True})
+    if not os.path.isdir(os.path.join(app.root_path, app.template_folder)):
+        app.jinja_loader = jinja2.FileSystemLoader(app.root_path)  # Gabarits à la racine du dépôt
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user'] = {'username': 'bench'}
+
+    rng = random.Random(args.seed)
+    results = {}
+    with contextlib.redirect_stdout(sys.stderr), app.app_context():
+        for path in PATHS.values():
+            measure(path, client, client_ids, produit_ids, 1, 3, rng)  # Échauffement : gabarits, connexion
+        for size in sizes:
+            results[str(size)] = {name: measure(path, client, client_ids, produit_ids, size, args.paniers, rng)
+                                  for name, path in PATHS.items()}
+            http = results[str(size)]
+            print(f"{size} ligne(s) : {http['http_une_ligne_par_requete']['mediane_ms']} ms en {size} requête(s), "
+                  f"{http['http_une_requete']['mediane_ms']} ms en une", file=sys.stderr)
+
+    report = {
+        'meta': {
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'produits': args.produits,
+            'paniers': args.paniers,
+            'seed': args.seed,
+        },
+        'resultats': results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
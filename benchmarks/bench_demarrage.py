@@ -0,0 +1,142 @@
+# Benchmark du démarrage : temps entre le lancement d'un interpréteur neuf et la réponse à
+# la première requête, comme pour un nouveau worker ou une collecte de tests.
+#
+# Chaque mesure (--runs) lance un processus Python qui importe l'application, puis sert
+# /login (gabarit seul) et /list (première requête en base) via le client de test. Le rapport
+# JSON donne la médiane et le maximum de chaque étape, et les modules lourds chargés
+# (matplotlib ne doit l'être qu'au premier graphique).
+#
+# Usage (depuis la racine du dépôt) :
+#   python -m benchmarks.bench_demarrage --runs 10 --output demarrage.json
+#   python -m benchmarks.bench_demarrage --baseline demarrage.json  # échoue si le démarrage régresse
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import database
+import migrations
+from benchmarks.generer_donnees import generate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('matplotlib', 'numpy', 'PIL')  # Ne doivent pas être chargés au démarrage
+
+# Exécuté dans le processus mesuré ; le répertoire courant contient app_database.db
+CHILD = r"""
+import json, os, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+from app import app
+imported = time.perf_counter()
+import jinja2
+if not os.path.isdir(os.path.join(app.root_path, app.template_folder)):
+    app.jinja_loader = jinja2.FileSystemLoader(app.root_path)  # Gabarits à la racine du dépôt
+app.config.update(WTF_CSRF_ENABLED=False, QUERY_BUDGET=None)
+client = app.test_client()
+with client.session_transaction() as session:
+    session['user'] = {{'username': 'bench'}}
+ready = time.perf_counter()
+statuses = [client.get('/login').status_code]
+first = time.perf_counter()
+statuses.append(client.get('/list').status_code)
+done = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (imported - start) * 1000,
+    'premiere_requete_ms': (first - ready) * 1000,
+    'premiere_requete_base_ms': (done - first) * 1000,
+    'import_a_premiere_requete_ms': (done - start) * 1000 - (ready - imported) * 1000,
+    'statuts': statuses,
+    'modules': len(sys.modules),
+    'modules_lourds': sorted(name for name in {heavy!r} if name in sys.modules),
+}}))
+"""
+
+
+def measure(workdir):
+    # Une mesure dans un processus neuf ; ajoute la durée totale vue de l'extérieur
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', CHILD.format(root=ROOT, heavy=HEAVY_MODULES)],
+                            cwd=workdir, capture_output=True, text=True, check=True)
+    sample = json.loads(result.stdout.strip().splitlines()[-1])
+    sample['processus_ms'] = (time.perf_counter() - start) * 1000
+    return sample
+
+
+def summarize(samples):
+    keys = ('import_ms', 'premiere_requete_ms', 'premiere_requete_base_ms', 'import_a_premiere_requete_ms',
+            'processus_ms')
+    summary = {key: {'mediane': round(statistics.median(s[key] for s in samples), 1),
+                     'max': round(max(s[key] for s in samples), 1)} for key in keys}
+    summary['modules'] = samples[-1]['modules']
+    summary['modules_lourds'] = sorted({name for s in samples for name in s['modules_lourds']})
+    summary['erreurs'] = sum(status >= 400 for s in samples for status in s['statuts'])
+    return summary
+
+
+def compare(report, baseline, tolerance):
+    # Régressions de la médiane par étape par rapport à un rapport précédent
+    regressions = []
+    for key, stats in report['resultats'].items():
+        before = baseline['resultats'].get(key)
+        if isinstance(stats, dict) and isinstance(before, dict) and stats['mediane'] > before['mediane'] * (1 + tolerance):
+            regressions.append(f"{key} : médiane {before['mediane']} ms -> {stats['mediane']} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du démarrage de l'application")
+    parser.add_argument('--runs', type=int, default=5, help="processus mesurés, après un lancement d'échauffement")
+    parser.add_argument('--produits', type=int, default=1000, help="volume de la base utilisée")
+    parser.add_argument('--output', help="fichier du rapport JSON (défaut : sortie standard)")
+    parser.add_argument('--baseline', help="rapport précédent : échoue si une médiane régresse de plus de --tolerance")
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    # Base déjà migrée : le démarrage mesuré ne doit pas comprendre la création du schéma
+    workdir = tempfile.mkdtemp()
+    database.configure(os.path.join(workdir, database.DATABASE))
+    migrations.migrate()
+    generate(database.get_connection(), args.produits, max(1, args.produits // 10), args.produits * 2)
+    database.close_pool()
+
+    measure(workdir)  # Échauffement : cache disque et fichiers .pyc
+    samples = [measure(workdir) for _ in range(args.runs)]
+    report = {
+        'meta': {
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'runs': args.runs,
+            'produits': args.produits,
+        },
+        'resultats': summarize(samples),
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    total = report['resultats']['import_a_premiere_requete_ms']
+    print(f"import -> première requête : médiane {total['mediane']} ms, max {total['max']} ms ; "
+          f"modules lourds chargés : {report['resultats']['modules_lourds'] or 'aucun'}", file=sys.stderr)
+    failed = report['resultats']['erreurs']
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"RÉGRESSION : {regression}", file=sys.stderr)
+        failed += len(regressions)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# Mesure le débit de l'import en masse (importation.import_stream) sur une base temporaire
+# et le compare à l'objectif importation.TARGET_ROWS_PER_SECOND.
+#
+# Usage (depuis la racine du dépôt) :
+#   python -m benchmarks.bench_import --rows 50000
+
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+
+from flask import Flask
+
+import database
+import importation
+import migrations
+from benchmarks.generer_donnees import TYPES_PRODUITS
+
+
+def make_products(rows, rng):
+    for i in range(rows):
+        yield {
+            'nom': f"Produit {i}",
+            'prix': f"{rng.uniform(0.5, 100):.2f}",
+            'description': f"Description du produit {i}",
+            'stock': rng.randint(1, 500),
+            'type_produit': rng.choice(TYPES_PRODUITS),
+        }
+
+
+def to_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=['nom', 'prix', 'description', 'stock', 'type_produit'])
+    writer.writeheader()
+    writer.writerows(rows)
+    buffer.seek(0)
+    return buffer
+
+
+def to_ndjson(rows):
+    return io.StringIO("".join(json.dumps(row) + "\n" for row in rows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'import en masse")
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+    parser.add_argument('--chunk-size', type=int, default=None)
+    args = parser.parse_args()
+
+    database.configure(os.path.join(tempfile.mkdtemp(), 'bench_import.db'))
+    migrations.migrate()
+
+    rng = random.Random(0)
+    rows = list(make_products(args.rows, rng))
+    stream = to_csv(rows) if args.format == 'csv' else to_ndjson(rows)
+
+    with Flask(__name__).app_context():  # Les formulaires Flask-WTF ont besoin d'un contexte d'application
+        report = importation.import_stream('produits', stream, args.format,
+                                           args.chunk_size or importation.CHUNK_SIZE)
+        database.close_connection()
+
+    rate = report['lignes_par_seconde']
+    target = importation.TARGET_ROWS_PER_SECOND
+    print(json.dumps({
+        'format': args.format,
+        'lignes': report['lues'],
+        'inserees': report['inserees'],
+        'rejetees': len(report['rejetees']),
+        'duree_s': report['duree_s'],
+        'lignes_par_seconde': rate,
+        'objectif_lignes_par_seconde': target,
+    }, indent=2))
+    if rate < target:
+        print(f"ÉCHEC : {rate} lignes/s < objectif {target}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# Benchmark des représentations de lignes en lecture : temps et mémoire pour lire tout le
+# catalogue (--rows produits, 100 000 par défaut) sous chacune des formes utilisées
+# jusqu'ici par les lectures et sous la forme actuelle :
+#   - Produit : une instance du modèle modifiable par ligne (ancien get_products) ;
+#   - dict : un dictionnaire par ligne (ancien filter_products_by_type) ;
+#   - tuple : tuple brut de sqlite3 (ancien get_clients), la référence ;
+#   - ProduitRow : enregistrement namedtuple via row_factory (Produit.get_products).
+# La mémoire est celle retenue par la liste résultat (tracemalloc), rapportée à la ligne.
+#
+# Usage (depuis la racine du dépôt) :
+#   python -m benchmarks.bench_lignes --rows 100000
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import database
+import migrations
+from benchmarks.generer_donnees import generate
+from gestion_produit import PRODUIT_COLUMNS, Produit
+
+COLUMNS = PRODUIT_COLUMNS.split(", ")
+
+
+def read_models(connection):
+    rows = connection.execute(f"SELECT {PRODUIT_COLUMNS} FROM produits ORDER BY id").fetchall()
+    return [Produit(nom=row[1], prix=row[2], description=row[3], stock=row[4], type_produit=row[5], id=row[0])
+            for row in rows]
+
+
+def read_dicts(connection):
+    rows = connection.execute(f"SELECT {PRODUIT_COLUMNS} FROM produits ORDER BY id").fetchall()
+    return [dict(zip(COLUMNS, row)) for row in rows]
+
+
+def read_tuples(connection):
+    return connection.execute(f"SELECT {PRODUIT_COLUMNS} FROM produits ORDER BY id").fetchall()
+
+
+def read_records(connection):
+    return Produit().get_products()
+
+
+READERS = {'Produit': read_models, 'dict': read_dicts, 'tuple': read_tuples, 'ProduitRow': read_records}
+
+
+def measure(reader, connection, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = reader(connection)
+        durations.append(time.perf_counter() - start)
+        del rows
+    tracemalloc.start()
+    rows = reader(connection)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = len(rows)
+    return {
+        'lignes': count,
+        'duree_ms': round(min(durations) * 1000, 1),
+        'memoire_mio': round(retained / 2 ** 20, 2),
+        'pic_mio': round(peak / 2 ** 20, 2),
+        'octets_par_ligne': round(retained / count) if count else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temps et mémoire des représentations de lignes")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5, help="lectures chronométrées (la meilleure est gardée)")
+    args = parser.parse_args()
+
+    database.configure(os.path.join(tempfile.mkdtemp(), 'bench_lignes.db'))
+    migrations.migrate()
+    generate(database.get_connection(), args.rows, 0, 0)
+    connection = database.get_connection()  # Même connexion pour toutes les lectures (get_connection la réutilise)
+    report = {name: measure(reader, connection, args.repeat) for name, reader in READERS.items()}
+    database.close_connection()
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,308 @@
+# Benchmark de charge des routes de l'application via le client de test Flask.
+#
+# Pour chaque volume de données (--sizes, en nombre de produits ; clients = produits / 10,
+# commandes = 2 x produits), une base temporaire est générée (benchmarks.generer_donnees)
+# puis chaque niveau de concurrence (--concurrency, en threads) exécute --iterations fois
+# le parcours SCENARIOS : tableau de bord, listes, filtre par type, recherche, ajout / modification /
+# suppression de produits, clients et commandes, suggestions des formulaires de commande,
+# graphiques, API JSON. Le rapport JSON donne, par exécution et par route, le débit et les
+# percentiles de latence.
+#
+# Usage (depuis la racine du dépôt) :
+#   python -m benchmarks.bench_routes --sizes 1000,10000 --concurrency 1,4 --output rapport.json
+#   python -m benchmarks.bench_routes --baseline rapport.json  # échoue si un p95 régresse
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import jinja2
+
+import database
+from benchmarks.generer_donnees import TYPES_PRODUITS, generate
+
+CHARTS = ('product_share', 'category_bar_chart', 'price_histogram',
+          'sales_by_type', 'top_clients_revenue', 'top_products_revenue')
+
+
+#--------------------Parcours exécuté à chaque itération--------------------#
+# Chaque étape reçoit (client de test, contexte du thread) et retourne la réponse.
+# Les lignes supprimées sont créées juste avant, hors mesure, par le thread lui-même.
+
+def _product_form(produit_id, rng):
+    return {'nom': f"Produit {produit_id}", 'prix': f"{rng.uniform(0.5, 100):.2f}", 'description': "Modifié",
+            'stock': rng.randint(1, 500), 'type_produit': rng.choice(TYPES_PRODUITS)}
+
+
+def _order_form(ctx, lignes):
+    # Commande de `lignes` produits, envoyée en une seule fois
+    data = {'client_id': ctx.client_id()}
+    for index in range(lignes):
+        data[f'lignes-{index}-produit_id'] = ctx.produit_id()
+        data[f'lignes-{index}-quantite'] = 1
+    return data
+
+
+SCENARIOS = [
+    ('GET /dashboard', lambda c, ctx: c.get('/dashboard')),
+    ('GET /list', lambda c, ctx: c.get('/list')),
+    ('GET /list?type_produit', lambda c, ctx: c.get('/list', query_string={'type_produit': ctx.rng.choice(TYPES_PRODUITS)})),
+    ('GET /list?q', lambda c, ctx: c.get('/list', query_string={'q': f"produit {ctx.rng.randint(1, 999)}"})),
+    ('GET /search', lambda c, ctx: c.get('/search', query_string={'q': str(ctx.rng.randint(1, 999))})),
+    ('GET /list_clients', lambda c, ctx: c.get('/list_clients')),
+    ('GET /commandes', lambda c, ctx: c.get('/commandes')),
+    ('GET /add_order', lambda c, ctx: c.get('/add_order')),
+    ('GET /api/v1/clients/suggestions', lambda c, ctx: c.get('/api/v1/clients/suggestions', query_string={
+        'q': f"client {ctx.rng.randint(1, 99)}"})),
+    ('GET /api/v1/produits/suggestions', lambda c, ctx: c.get('/api/v1/produits/suggestions', query_string={
+        'q': f"produit {ctx.rng.randint(1, 999)}"})),
+    ('POST /add_order', lambda c, ctx: c.post('/add_order', data=_order_form(ctx, 1))),
+    ('POST /add_order (10 lignes)', lambda c, ctx: c.post('/add_order', data=_order_form(ctx, 10))),
+    ('GET /graph', lambda c, ctx: c.get('/graph')),
+    ('GET /graph/<name>.png', lambda c, ctx: c.get(f"/graph/{ctx.rng.choice(CHARTS)}.png")),
+    ('GET /stats/ventes', lambda c, ctx: c.get('/stats/ventes')),
+    ('GET /update/<id>', lambda c, ctx: c.get(f"/update/{ctx.produit_id()}")),
+    ('POST /update/<id>', lambda c, ctx: c.post(f"/update/{ctx.own_produit}", data=_product_form(ctx.own_produit, ctx.rng))),
+    ('GET /edit_client/<id>', lambda c, ctx: c.get(f"/edit_client/{ctx.client_id()}")),
+    ('POST /edit_client/<id>', lambda c, ctx: c.post(f"/edit_client/{ctx.own_client}", data={
+        'nom': f"Client {ctx.own_client}", 'email': f"client{ctx.own_client}@example.com", 'adresse': "Modifiée"})),
+    ('GET /edit_order/<id>', lambda c, ctx: c.get(f"/edit_order/{ctx.own_commande}")),
+    ('POST /edit_order/<id>', lambda c, ctx: c.post(f"/edit_order/{ctx.own_commande}", data={
+        'client_id': ctx.own_client, 'produit_id': ctx.own_produit, 'quantite': 2})),
+    ('GET /api/v1/produits?ids', lambda c, ctx: c.get('/api/v1/produits', query_string={
+        'ids': ",".join(str(ctx.produit_id()) for _ in range(50)), 'fields': 'stock'})),
+    ('PATCH /api/v1/produits', lambda c, ctx: c.patch('/api/v1/produits', json=[
+        {'id': ctx.own_produit, 'stock': ctx.rng.randint(100, 1000)}])),
+    ('POST /delete_order/<id>', lambda c, ctx: c.post(f"/delete_order/{ctx.own_commande}")),
+    ('POST /delete/<id>', lambda c, ctx: c.post(f"/delete/{ctx.own_produit}")),
+    ('POST /delete_client/<id>', lambda c, ctx: c.post(f"/delete_client/{ctx.own_client}")),
+]
+
+
+class WorkerContext:
+    def __init__(self, seed, produit_ids, client_ids):
+        self.rng = random.Random(seed)
+        self.produit_ids = produit_ids
+        self.client_ids = client_ids
+        self.connection = database.connect()  # Préparation hors mesure, sur une connexion à part
+        self.own_produit = self.own_client = self.own_commande = None
+
+    def produit_id(self):
+        return self.rng.choice(self.produit_ids)
+
+    def client_id(self):
+        return self.rng.choice(self.client_ids)
+
+    def prepare(self):
+        # Produit, client et commande propres au thread : modifiés puis supprimés pendant l'itération
+        with database.transaction(self.connection) as connection:
+            cursor = connection.cursor()
+            cursor.execute("INSERT INTO produits (nom, prix, description, stock, type_produit) "
+                           "VALUES ('Produit bench', 10.0, '', 1000, 'Boissons')")
+            self.own_produit = cursor.lastrowid
+            cursor.execute("INSERT INTO clients (nom, email, adresse) VALUES ('Client bench', 'bench@example.com', '')")
+            self.own_client = cursor.lastrowid
+            cursor.execute("UPDATE produits SET stock = stock - 1 WHERE id = ?", (self.own_produit,))
+            cursor.execute("INSERT INTO commandes (client_id, produit_id, quantite) VALUES (?, ?, 1)",
+                           (self.own_client, self.own_produit))
+            self.own_commande = cursor.lastrowid
+
+    def close(self):
+        self.connection.close()
+
+
+#--------------------Mesures--------------------#
+
+def percentile(sorted_values, q):
+    # Percentile par interpolation linéaire entre les rangs voisins
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (position - low)
+
+
+def summarize(latencies, errors, duration):
+    values = sorted(latencies)
+    return {
+        'requetes': len(values),
+        'erreurs': errors,
+        'requetes_par_seconde': round(len(values) / duration, 1) if duration else None,
+        'moyenne_ms': round(sum(values) / len(values) * 1000, 3) if values else None,
+        'p50_ms': round(percentile(values, 0.50) * 1000, 3) if values else None,
+        'p95_ms': round(percentile(values, 0.95) * 1000, 3) if values else None,
+        'p99_ms': round(percentile(values, 0.99) * 1000, 3) if values else None,
+        'max_ms': round(values[-1] * 1000, 3) if values else None,
+    }
+
+
+def run_level(app, concurrency, iterations, produit_ids, client_ids, seed):
+    # Lance `concurrency` threads qui exécutent chacun `iterations` fois le parcours
+    latencies = {name: [] for name, _ in SCENARIOS}
+    errors = {name: 0 for name, _ in SCENARIOS}
+    failures = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(concurrency + 1)
+
+    def worker(index):
+        ctx = WorkerContext(seed * 1000 + index, produit_ids, client_ids)
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user'] = {'username': 'bench'}
+        local = {name: [] for name, _ in SCENARIOS}
+        local_errors = {name: 0 for name, _ in SCENARIOS}
+        barrier.wait()
+        try:
+            for _ in range(iterations):
+                ctx.prepare()
+                for name, step in SCENARIOS:
+                    start = time.perf_counter()
+                    response = step(client, ctx)
+                    local[name].append(time.perf_counter() - start)
+                    local_errors[name] += response.status_code >= 400
+                    response.close()
+        except Exception as e:
+            failures.append(e)
+        finally:
+            ctx.close()
+            with lock:
+                for name in local:
+                    latencies[name].extend(local[name])
+                    errors[name] += local_errors[name]
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - start
+    if failures:
+        raise failures[0]
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        'concurrence': concurrency,
+        'duree_s': round(duration, 3),
+        'total': summarize(all_latencies, sum(errors.values()), duration),
+        'routes': {name: summarize(latencies[name], errors[name], duration) for name, _ in SCENARIOS},
+    }
+
+
+def compare(report, baseline, tolerance):
+    # Régressions du p95 par (volume, concurrence, route) par rapport à un rapport précédent
+    previous = {(run['produits'], run['concurrence'], route): stats['p95_ms']
+                for run in baseline['executions'] for route, stats in run['routes'].items()}
+    regressions = []
+    for run in report['executions']:
+        for route, stats in run['routes'].items():
+            before = previous.get((run['produits'], run['concurrence'], route))
+            if before and stats['p95_ms'] is not None and stats['p95_ms'] > before * (1 + tolerance):
+                regressions.append(f"{run['produits']} produits x{run['concurrence']} {route} : "
+                                   f"p95 {before} ms -> {stats['p95_ms']} ms")
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de charge des routes")
+    parser.add_argument('--sizes', default='1000,10000', help="volumes en nombre de produits, séparés par des virgules")
+    parser.add_argument('--concurrency', default='1,4', help="nombres de threads, séparés par des virgules")
+    parser.add_argument('--iterations', type=int, default=20, help="parcours complets par thread")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="fichier du rapport JSON (défaut : sortie standard)")
+    parser.add_argument('--baseline', help="rapport précédent : échoue si un p95 régresse de plus de --tolerance")
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+    levels = [int(level) for level in args.concurrency.split(',')]
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = json.load(open(args.baseline, encoding='utf-8')) if args.baseline else None
+    commit = _git_commit()
+
+    # Base, journal et fichiers de l'application dans un répertoire temporaire
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)
+    database.configure(os.path.join(workdir, 'bench_routes.db'))
+    from app import create_app
+    import graphiques
+    import migrations
+    from cache import catalogue_cache
+    app = create_app({'WTF_CSRF_ENABLED': False, 'QUERY_BUDGET': None})
+    if not os.path.isdir(os.path.join(app.root_path, app.template_folder)):
+        # Dans ce dépôt, les gabarits sont à la racine, à côté de app.py
+        app.jinja_loader = jinja2.FileSystemLoader(app.root_path)
+
+    report = {
+        'meta': {
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': commit,
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'iterations': args.iterations,
+            'seed': args.seed,
+        },
+        'executions': [],
+    }
+    try:
+        with contextlib.redirect_stdout(sys.stderr):  # Les print() de l'application restent hors du rapport
+            for size in sizes:
+                database.configure(os.path.join(workdir, f"bench_routes_{size}.db"))
+                migrations.migrate()
+                connection = database.get_connection()
+                counts = generate(connection, size, max(1, size // 10), size * 2, args.seed)
+                produit_ids = [row[0] for row in connection.execute("SELECT id FROM produits")]
+                client_ids = [row[0] for row in connection.execute("SELECT id FROM clients")]
+                database.close_connection()
+                catalogue_cache.invalidate()
+                graphiques.chart_cache.clear()
+                # Échauffement hors mesure : premiers rendus des graphiques, cache du catalogue
+                run_level(app, 1, 1, produit_ids, client_ids, args.seed)
+                for level in levels:
+                    result = run_level(app, level, args.iterations, produit_ids, client_ids, args.seed)
+                    report['executions'].append({**counts, **result})
+                    total = result['total']
+                    print(f"{size} produits x{level} : {total['requetes_par_seconde']} req/s, "
+                          f"p50 {total['p50_ms']} ms, p95 {total['p95_ms']} ms, p99 {total['p99_ms']} ms, "
+                          f"{total['erreurs']} erreur(s)", file=sys.stderr)
+    finally:
+        graphiques.chart_cache.shutdown()
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    failed = sum(run['total']['erreurs'] for run in report['executions'])
+    if baseline:
+        regressions = compare(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"RÉGRESSION : {regression}", file=sys.stderr)
+        failed += len(regressions)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+# Benchmark de l'analyse des ventes (analyse_ventes) sur une base de N commandes :
+#   - chargement complet : premier rapport, colonnes NumPy lues par paquets puis agrégées ;
+#   - cache : même rapport sans écriture entre-temps (agrégats gardés par version) ;
+#   - nouvelles commandes : rapport après l'insertion de --ecritures commandes (seules
+#     les nouvelles lignes sont relues) ;
+#   - modifications : rapport après la modification et la suppression de --ecritures
+#     commandes (relues d'après commandes_journal) ;
+#   - SQL : les mêmes agrégats par GROUP BY dans SQLite, pour comparaison.
+# Les totaux et classements sont vérifiés contre ceux du GROUP BY. Le rapport JSON
+# donne, par taille de base, la durée de chaque étape (médiane, p95).
+#
+# Usage (depuis la racine du dépôt) :
+#   python -m benchmarks.bench_ventes --commandes 100000,1000000,3000000 --repetitions 5
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import analyse_ventes
+import database
+import migrations
+from benchmarks.generer_donnees import generate
+
+TOP = 10
+
+SQL_BY_TYPE = """
+    SELECT COALESCE(p.type_produit, ?), SUM(c.quantite * COALESCE(p.prix, 0)), SUM(c.quantite), COUNT(*)
+    FROM commandes c LEFT JOIN produits p ON p.id = c.produit_id
+    GROUP BY 1
+"""
+SQL_TOP_CLIENTS = """
+    SELECT c.client_id, SUM(c.quantite * COALESCE(p.prix, 0)) AS ca
+    FROM commandes c LEFT JOIN produits p ON p.id = c.produit_id
+    GROUP BY c.client_id ORDER BY ca DESC, c.client_id LIMIT ?
+"""
+SQL_TOP_PRODUCTS = """
+    SELECT c.produit_id, SUM(c.quantite * COALESCE(p.prix, 0)) AS ca
+    FROM commandes c LEFT JOIN produits p ON p.id = c.produit_id
+    GROUP BY c.produit_id ORDER BY ca DESC, c.produit_id LIMIT ?
+"""
+
+
+def sql_report(connection):
+    by_type = connection.execute(SQL_BY_TYPE, (analyse_ventes.UNKNOWN_TYPE,)).fetchall()
+    return {
+        'par_type': {row[0]: (row[1], row[2], row[3]) for row in by_type},
+        'meilleurs_clients': connection.execute(SQL_TOP_CLIENTS, (TOP,)).fetchall(),
+        'meilleurs_produits': connection.execute(SQL_TOP_PRODUCTS, (TOP,)).fetchall(),
+    }
+
+
+def _close(a, b):
+    return abs(a - b) <= 1e-6 * max(1.0, abs(a), abs(b))
+
+
+def verify(report, expected):
+    # Compare le rapport NumPy au GROUP BY SQLite ; lève AssertionError sinon
+    types = {row['type_produit']: row for row in report['par_type']}
+    for name, (revenue, units, lines) in expected['par_type'].items():
+        row = types.pop(name)
+        assert _close(row['chiffre_affaires'], round(revenue, 2)), (name, row, revenue)
+        assert (row['unites'], row['lignes']) == (units, lines), (name, row, units, lines)
+    assert not types, types
+    for key, ranking in (('client_id', 'meilleurs_clients'), ('produit_id', 'meilleurs_produits')):
+        # Ex aequo : l'ordre peut différer, les montants du classement non
+        got = [round(row['chiffre_affaires'], 2) for row in report[ranking]]
+        want = [round(revenue, 2) for _, revenue in expected[ranking]]
+        assert all(_close(a, b) for a, b in zip(got, want)) and len(got) == len(want), (ranking, got, want)
+
+
+def _timed(call):
+    start = time.perf_counter()
+    result = call()
+    return result, time.perf_counter() - start
+
+
+def _summary(durations):
+    durations = sorted(durations)
+    return {
+        'mediane_ms': round(statistics.median(durations) * 1000, 2),
+        'p95_ms': round(durations[min(len(durations) - 1, int(len(durations) * 0.95))] * 1000, 2),
+    }
+
+
+def _insert(connection, rng, client_ids, produit_ids, count):
+    with database.transaction(connection):
+        connection.executemany(
+            "INSERT INTO commandes (client_id, produit_id, quantite) VALUES (?, ?, ?)",
+            [(rng.choice(client_ids), rng.choice(produit_ids), rng.randint(1, 10)) for _ in range(count)])
+
+
+def _update_delete(connection, rng, count):
+    last_id = connection.execute("SELECT MAX(id) FROM commandes").fetchone()[0]
+    ids = rng.sample(range(1, last_id + 1), count)
+    with database.transaction(connection):
+        connection.executemany("UPDATE commandes SET quantite = quantite + 1 WHERE id = ?",
+                               [(commande_id,) for commande_id in ids[:count // 2]])
+        connection.executemany("DELETE FROM commandes WHERE id = ?", [(commande_id,) for commande_id in ids[count // 2:]])
+
+
+def measure(size, args, workdir):
+    database.configure(os.path.join(workdir, f'bench_ventes_{size}.db'))
+    migrations.migrate()
+    connection = database.get_connection()
+    generate(connection, args.produits, args.clients, size, args.seed)
+    produit_ids = [row[0] for row in connection.execute("SELECT id FROM produits")]
+    client_ids = [row[0] for row in connection.execute("SELECT id FROM clients")]
+    rng = random.Random(args.seed)
+
+    steps = {'chargement_complet': [], 'cache': [], 'nouvelles_commandes': [], 'modifications': [], 'sql_group_by': []}
+    for _ in range(args.repetitions):
+        analyse_ventes.sales.clear()
+        report, duration = _timed(lambda: analyse_ventes.sales_report(TOP, connection))
+        steps['chargement_complet'].append(duration)
+        steps['cache'].append(_timed(lambda: analyse_ventes.sales_report(TOP, connection))[1])
+        _insert(connection, rng, client_ids, produit_ids, args.ecritures)
+        steps['nouvelles_commandes'].append(_timed(lambda: analyse_ventes.sales_report(TOP, connection))[1])
+        _update_delete(connection, rng, args.ecritures)
+        report, duration = _timed(lambda: analyse_ventes.sales_report(TOP, connection))
+        steps['modifications'].append(duration)
+        expected, duration = _timed(lambda: sql_report(connection))
+        steps['sql_group_by'].append(duration)
+        verify(report, expected)  # Après rafraîchissement incrémental : mêmes résultats que SQLite
+    stats = analyse_ventes.sales.stats()
+    database.close_connection()
+    analyse_ventes.sales.clear()
+    return {
+        'commandes': stats['commandes_en_memoire'],
+        **{name: _summary(durations) for name, durations in steps.items()},
+        'chargements': {key: stats[key] for key in ('chargements_complets', 'chargements_incrementaux')},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyse des ventes en mémoire (NumPy) contre GROUP BY SQLite")
+    parser.add_argument('--commandes', default='100000,1000000', help="tailles de base, séparées par des virgules")
+    parser.add_argument('--produits', type=int, default=10000)
+    parser.add_argument('--clients', type=int, default=5000)
+    parser.add_argument('--ecritures', type=int, default=1000, help="commandes ajoutées, puis modifiées ou supprimées")
+    parser.add_argument('--repetitions', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="fichier du rapport JSON (défaut : sortie standard)")
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.commandes.split(',')]
+    output = os.path.abspath(args.output) if args.output else None
+
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)  # Journal et fichiers de l'application hors du dépôt
+    results = {}
+    for size in sizes:
+        results[str(size)] = result = measure(size, args, workdir)
+        print(f"{size} commandes : chargement {result['chargement_complet']['mediane_ms']} ms, "
+              f"cache {result['cache']['mediane_ms']} ms, nouvelles {result['nouvelles_commandes']['mediane_ms']} ms, "
+              f"modifications {result['modifications']['mediane_ms']} ms, "
+              f"SQL {result['sql_group_by']['mediane_ms']} ms", file=sys.stderr)
+
+    report = {
+        'meta': {
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'produits': args.produits,
+            'clients': args.clients,
+            'ecritures': args.ecritures,
+            'repetitions': args.repetitions,
+            'seed': args.seed,
+        },
+        'resultats': results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# Générateur de données synthétiques reproductibles (même --seed, mêmes données) :
+# produits répartis sur les 11 types, clients et commandes. Le stock généré est
+# le stock restant, les commandes sont insérées sans le réserver à nouveau. Les dates
+# de création des commandes s'étalent sur les HISTORY_DAYS derniers jours, croissantes
+# avec l'id comme en production.
+#
+# Usage (depuis la racine du dépôt) :
+#   python -m benchmarks.generer_donnees --produits 10000 --clients 1000 --commandes 20000
+#   python -m benchmarks.generer_donnees --db /tmp/charge.db --reset --produits 100000
+
+import argparse
+import random
+import time
+
+import database
+
+TYPES_PRODUITS = [
+    'Fruits et légumes', 'Produits laitiers', 'Viandes et protéines',
+    'Produits de boulangerie', 'Céréales et grains', 'Conserves et produits secs',
+    'Condiments et épices', 'Boissons', 'Produits surgelés',
+    'Snacks et confiseries', 'Produits non alimentaires'
+]
+
+BATCH_SIZE = 5000  # Lignes par executemany
+HISTORY_DAYS = 730  # Période couverte par les dates de création des commandes
+
+
+def _batches(rows, size=BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def generate(connection, produits, clients, commandes, seed=0, reset=False):
+    # Remplit la base ; retourne le nombre de lignes insérées par table
+    rng = random.Random(seed)
+    with database.transaction(connection):
+        if reset:
+            for table in ('commandes', 'produits', 'clients'):
+                connection.execute(f"DELETE FROM {table}")
+        next_produit = connection.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM produits").fetchone()[0]
+        next_client = connection.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM clients").fetchone()[0]
+
+        produit_ids = range(next_produit, next_produit + produits)
+        client_ids = range(next_client, next_client + clients)
+        for batch in _batches(
+                (produit_id, f"Produit {produit_id}", f"{rng.uniform(0.5, 100):.2f}",
+                 f"Description du produit {produit_id}", rng.randint(0, 500), rng.choice(TYPES_PRODUITS))
+                for produit_id in produit_ids):
+            connection.executemany(
+                "INSERT INTO produits (id, nom, prix, description, stock, type_produit) VALUES (?, ?, ?, ?, ?, ?)", batch)
+        for batch in _batches(
+                (client_id, f"Client {client_id}", f"client{client_id}@example.com", f"{client_id} rue Principale")
+                for client_id in client_ids):
+            connection.executemany("INSERT INTO clients (id, nom, email, adresse) VALUES (?, ?, ?, ?)", batch)
+        commandes = commandes if produits and clients else 0
+        now = int(time.time())
+        step = HISTORY_DAYS * 86400 / max(commandes, 1)
+        for batch in _batches((rng.choice(client_ids), rng.choice(produit_ids), rng.randint(1, 10),
+                               now - HISTORY_DAYS * 86400 + int(index * step))
+                              for index in range(commandes)):
+            connection.executemany(
+                "INSERT INTO commandes (client_id, produit_id, quantite, created_at) VALUES (?, ?, ?, ?)", batch)
+    connection.execute("ANALYZE")
+    return {'produits': produits, 'clients': clients, 'commandes': commandes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère des données synthétiques")
+    parser.add_argument('--db', default=database.DATABASE, help="base à remplir (défaut : %(default)s)")
+    parser.add_argument('--produits', type=int, default=10000)
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--commandes', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--reset', action='store_true', help="vide d'abord produits, clients et commandes")
+    args = parser.parse_args()
+
+    database.configure(args.db)
+    import migrations
+    migrations.migrate()
+    counts = generate(database.get_connection(), args.produits, args.clients, args.commandes, args.seed, args.reset)
+    database.close_connection()
+    print(f"{args.db} : {counts['produits']} produit(s), {counts['clients']} client(s), {counts['commandes']} commande(s)")
+
+
+if __name__ == '__main__':
+    main()
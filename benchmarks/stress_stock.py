@@ -0,0 +1,116 @@
+# Test de charge concurrent sur la réservation de stock des commandes.
+#
+# Plusieurs threads créent, modifient et suppriment des commandes en parallèle
+# sur une base temporaire. À la fin, pour chaque produit :
+#   - le stock n'est jamais négatif ;
+#   - stock actuel + quantités en commande == stock initial (aucune dérive).
+#
+# Usage (depuis la racine du dépôt) :
+#   python -m benchmarks.stress_stock --threads 8 --operations 500
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import database
+import migrations
+from gestion_produit import Commande
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress test concurrent du stock des commandes")
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--operations', type=int, default=500, help="opérations par thread")
+    parser.add_argument('--produits', type=int, default=5)
+    parser.add_argument('--stock', type=int, default=200, help="stock initial de chaque produit")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    database.configure(os.path.join(tmpdir, 'stress.db'))
+    migrations.migrate()
+
+    connection = database.get_connection()
+    with database.transaction(connection):
+        connection.executemany(
+            "INSERT INTO produits (nom, prix, description, stock, type_produit) VALUES (?, 1.0, '', ?, 'Boissons')",
+            [(f"Produit {i}", args.stock) for i in range(args.produits)])
+        connection.executemany("INSERT INTO clients (nom, email, adresse) VALUES (?, '', '')",
+                               [(f"Client {i}",) for i in range(4)])
+    produit_ids = [row[0] for row in connection.execute("SELECT id FROM produits")]
+    client_ids = [row[0] for row in connection.execute("SELECT id FROM clients")]
+
+    counters = {'ok': 0, 'rejected': 0, 'errors': 0}
+    lock = threading.Lock()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        my_orders = []
+        local = {'ok': 0, 'rejected': 0, 'errors': 0}
+        try:
+            for _ in range(args.operations):
+                action = rng.random()
+                try:
+                    if action < 0.5 or not my_orders:
+                        commande = Commande(rng.choice(client_ids), rng.choice(produit_ids), rng.randint(1, 20))
+                        commande.add_commande()
+                        my_orders.append(commande.id)
+                    elif action < 0.8:
+                        commande = Commande(rng.choice(client_ids), rng.choice(produit_ids), rng.randint(1, 20))
+                        commande.update_commande(rng.choice(my_orders))
+                    else:
+                        order_id = my_orders.pop(rng.randrange(len(my_orders)))
+                        Commande().delete_commande(order_id)
+                    local['ok'] += 1
+                except ValueError:
+                    local['rejected'] += 1  # Stock insuffisant : refus attendu
+                except Exception as e:
+                    local['errors'] += 1
+                    print(f"Erreur inattendue : {e}", file=sys.stderr)
+        finally:
+            database.close_connection()
+            with lock:
+                for key, value in local.items():
+                    counters[key] += value
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(args.seed + i,)) for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    failures = []
+    rows = connection.execute("""
+        SELECT p.id, p.stock, COALESCE(SUM(c.quantite), 0)
+        FROM produits p LEFT JOIN commandes c ON c.produit_id = p.id
+        GROUP BY p.id
+    """).fetchall()
+    for produit_id, stock, reserved in rows:
+        if stock < 0:
+            failures.append(f"produit {produit_id} : stock négatif ({stock})")
+        if stock + reserved != args.stock:
+            failures.append(f"produit {produit_id} : dérive ({stock} + {reserved} != {args.stock})")
+
+    total = args.threads * args.operations
+    print(f"{total} opérations en {elapsed:.2f} s ({total / elapsed:.0f} op/s) : "
+          f"{counters['ok']} appliquées, {counters['rejected']} refusées, {counters['errors']} erreurs")
+    for produit_id, stock, reserved in rows:
+        print(f"  produit {produit_id} : stock {stock}, en commande {reserved}")
+    database.close_connection()
+    database.close_pool()
+
+    if failures or counters['errors']:
+        for failure in failures:
+            print("ÉCHEC", failure)
+        sys.exit(1)
+    print("OK : stock jamais négatif, aucune dérive")
+
+
+if __name__ == '__main__':
+    main()
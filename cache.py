@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import OrderedDict
+
+from database import get_connection
+
+#--------------------Cache du catalogue (produits, clients)--------------------#
+# Cache en mémoire du processus, en lecture directe : une entrée est rechargée si
+# elle a expiré (TTL), si elle a été invalidée par une écriture de ce processus, ou
+# si la version d'une de ses tables (table_versions, mise à jour par trigger) a
+# changé — ce qui couvre les écritures faites par les autres workers.
+# Lire les versions coûte une requête : le cache ne vaut que pour des chargements plus
+# chers, ou quand l'appelant a déjà lu les versions (ETag) et les passe à get().
+
+DEFAULT_TTL = 300  # Durée de vie d'une entrée, en secondes
+DEFAULT_MAX_ENTRIES = 1024  # Au-delà, l'entrée la moins récemment utilisée est évincée
+
+
+def _table_versions(tables, connection=None):
+    # Versions des tables en une seule requête
+    connection = connection or get_connection()
+    placeholders = ", ".join("?" * len(tables))
+    versions = dict(connection.execute(
+        f"SELECT name, version FROM table_versions WHERE name IN ({placeholders})", tables).fetchall())
+    return tuple(versions.get(table, 0) for table in tables)
+
+
+class CatalogueCache:
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # clé -> (valeur, tables, versions, expiration)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, tables, loader, versions=None):
+        # Retourne la valeur en cache pour `key`, ou l'obtient via loader() et la met en cache.
+        # `tables` : tables dont dépend la valeur (invalidation par version) ; `versions` : leurs
+        # versions si l'appelant vient de les lire (sinon une requête les lit).
+        tables = tuple(tables)
+        versions = tuple(versions) if versions is not None else _table_versions(tables)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[2] == versions and entry[3] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        value = loader()  # Hors verrou : un chargement lent ne bloque pas les autres clés
+        with self._lock:
+            self._entries[key] = (value, tables, versions, now + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def invalidate(self, table=None):
+        # Supprime les entrées qui dépendent de `table` (toutes si table est None)
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if table is None or table in entry[1]]
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += len(keys)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 3) if total else None,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+catalogue_cache = CatalogueCache()
@@ -0,0 +1,176 @@
+import gzip
+import hashlib
+import os
+import re
+import zlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, make_response, request, send_from_directory, session
+from werkzeug.http import is_resource_modified
+from werkzeug.security import safe_join
+
+from database import get_connection
+
+#--------------------Cache HTTP, compression et fichiers statiques--------------------#
+# - Pages conditionnelles (@conditional) : ETag et Last-Modified tirés de table_versions
+#   (version et date de modification, mises à jour par trigger à chaque écriture) ; une
+#   page inchangée répond 304 après une seule requête SQL, sans lire les lignes ni rendre
+#   le gabarit. L'ETag dépend aussi de l'URL, de l'utilisateur et des gabarits.
+# - Compression gzip des réponses texte (HTML, CSS, JSON, ...) quand le client l'accepte.
+# - Fichiers statiques avec empreinte : url_for('static', filename='style_x.css') donne
+#   /static/style_x.<empreinte>.css, servi avec un cache d'un an (immutable) ; l'empreinte
+#   change avec le contenu du fichier.
+
+COMPRESSIBLE = {'text/html', 'text/css', 'text/plain', 'text/csv', 'application/json',
+                'application/javascript', 'text/javascript', 'image/svg+xml'}
+COMPRESS_MIN_SIZE = 500  # En dessous, l'en-tête gzip coûte plus qu'il ne rapporte
+COMPRESS_MAX_SIZE = 8 * 1024 * 1024  # Au-delà (fichiers statiques), envoi tel quel
+COMPRESS_LEVEL = 6
+
+FINGERPRINTED = {'.css', '.js', '.png', '.jpg', '.jpeg', '.webp', '.gif', '.svg', '.ico'}
+FINGERPRINT = re.compile(r'^(?P<stem>.+)\.(?P<digest>[0-9a-f]{8})(?P<ext>\.[A-Za-z0-9]+)$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600  # Un an : une nouvelle version change d'URL
+
+_digests = {}  # chemin -> (mtime, taille, empreinte)
+
+
+#--------------------Pages conditionnelles--------------------#
+
+def _table_state(tables):
+    # (versions, date de dernière modification) des tables, en une seule requête
+    placeholders = ", ".join("?" * len(tables))
+    rows = get_connection().execute(
+        f"SELECT name, version, modified_at FROM table_versions WHERE name IN ({placeholders})", tables).fetchall()
+    state = {name: (version, modified_at) for name, version, modified_at in rows}
+    versions = tuple(state.get(table, (0, 0))[0] for table in tables)
+    return versions, max((modified_at for _, modified_at in state.values()), default=0)
+
+
+def _templates_state():
+    # (empreinte, date) des gabarits : une nouvelle version déployée invalide les pages en cache
+    state = current_app.extensions.get('cache_http_templates')
+    if state is None or current_app.jinja_env.auto_reload:  # En debug, les gabarits changent à chaud
+        loader = current_app.jinja_env.loader
+        mtimes = []
+        for name in loader.list_templates():
+            if not name.endswith('.html'):
+                continue
+            filename = loader.get_source(current_app.jinja_env, name)[1]
+            mtimes.append((name, int(os.path.getmtime(filename)) if filename else 0))
+        state = (zlib.crc32(repr(sorted(mtimes)).encode()), max((mtime for _, mtime in mtimes), default=0))
+        current_app.extensions['cache_http_templates'] = state
+    return state
+
+
+def conditional(*tables):
+    # Décorateur de vue GET (sous @route) : 304 si ni les tables ni les gabarits n'ont changé
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)  # Messages flash à afficher : la page doit être rendue
+            versions, modified_at = _table_state(tables)
+            templates, templates_mtime = _templates_state()
+            user = session.get('user') or {}
+            key = f"{request.full_path}|{user.get('username', '') if isinstance(user, dict) else user}|{versions}|{templates}"
+            etag = f"{request.endpoint}-{zlib.crc32(key.encode()):08x}"
+            last_modified = datetime.fromtimestamp(max(modified_at, templates_mtime), timezone.utc)
+            if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)  # Faible : la même page compressée ou non
+            response.last_modified = last_modified
+            response.cache_control.private = True  # Page propre à l'utilisateur connecté
+            response.cache_control.no_cache = True  # Toujours revalider
+            response.vary.add('Cookie')
+            return response
+        return wrapper
+    return decorator
+
+
+#--------------------Compression--------------------#
+
+def _compress(response):
+    if (response.status_code != 200 or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE):
+        return response
+    if response.direct_passthrough:
+        # Fichier statique : lu en mémoire seulement s'il est raisonnable
+        if not response.content_length or response.content_length > COMPRESS_MAX_SIZE:
+            return response
+    elif response.is_streamed:
+        return response  # Générateur (exports) : la mémoire doit rester constante
+    response.vary.add('Accept-Encoding')
+    if 'gzip' not in request.accept_encodings:
+        return response
+    response.direct_passthrough = False
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+    response.set_data(gzip.compress(data, COMPRESS_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)  # Les octets envoyés diffèrent : l'ETag fort devient faible
+    return response
+
+
+#--------------------Fichiers statiques avec empreinte--------------------#
+
+def _digest(path):
+    # Empreinte (8 caractères) du contenu, recalculée seulement si le fichier a changé
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    cached = _digests.get(path)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:8]
+    _digests[path] = (stat.st_mtime_ns, stat.st_size, digest)
+    return digest
+
+
+def fingerprinted(filename):
+    # style_x.css -> style_x.<empreinte>.css (nom inchangé si le fichier n'existe pas)
+    stem, ext = os.path.splitext(filename)
+    if ext.lower() not in FINGERPRINTED or current_app.static_folder is None:
+        return filename
+    path = safe_join(current_app.static_folder, filename)
+    digest = _digest(path) if path else None
+    return f"{stem}.{digest}{ext}" if digest else filename
+
+
+def _static_url_defaults(endpoint, values):
+    if endpoint == 'static' and 'filename' in values:
+        values['filename'] = fingerprinted(values['filename'])
+
+
+def send_static(filename):
+    # Remplace la vue 'static' : un nom avec l'empreinte à jour est servi avec un cache d'un an
+    match = FINGERPRINT.match(filename)
+    if match:
+        original = match['stem'] + match['ext']
+        path = safe_join(current_app.static_folder, original)
+        if path and _digest(path) == match['digest']:
+            response = send_from_directory(current_app.static_folder, original, max_age=IMMUTABLE_MAX_AGE)
+            response.cache_control.public = True
+            response.cache_control.immutable = True
+            return response
+        if path and os.path.isfile(path):
+            filename = original  # Empreinte périmée (page ancienne) : version actuelle, sans cache long
+    return current_app.send_static_file(filename)
+
+
+def init_app(app):
+    # À appeler avant les autres init_app : les after_request s'exécutent en ordre inverse,
+    # la compression passe donc en dernier, sur la réponse définitive
+    app.after_request(_compress)
+    app.url_defaults(_static_url_defaults)
+    if 'static' in app.view_functions:
+        app.view_functions['static'] = send_static
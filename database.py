@@ -0,0 +1,261 @@
+import sqlite3
+import threading
+import time
+import queue
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g, has_app_context
+
+#--------------------Gestion des connexions SQLite--------------------#
+
+DATABASE = "app_database.db"  # Chemin de la base de données de l'application
+POOL_SIZE = 8  # Nombre maximal de connexions inactives conservées dans le pool
+
+# PRAGMAs appliqués une seule fois à chaque nouvelle connexion
+PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",  # Suffisant en mode WAL, évite un fsync par commit
+    "PRAGMA busy_timeout = 5000",  # Attend jusqu'à 5 s au lieu d'échouer sur un verrou
+    "PRAGMA cache_size = -16000",  # Cache de pages d'environ 16 Mo
+)
+
+_pool = queue.LifoQueue(maxsize=POOL_SIZE)  # Connexions prêtes à être réutilisées
+_local = threading.local()  # Connexion par thread hors d'un contexte Flask
+_wal_lock = threading.Lock()
+_wal_ready = False
+_stats = threading.local()  # Compteurs SQL de la requête en cours (voir start_query_stats)
+
+
+#--------------------Instrumentation des requêtes SQL--------------------#
+# Toutes les connexions utilisent ces classes : quand des compteurs sont actifs
+# dans le thread (pendant une requête HTTP), chaque requête SQL y ajoute son
+# nombre, sa durée d'exécution et le nombre de lignes lues, et le texte de la
+# requête est compté (détection des requêtes répétées, voir garde_requetes.py).
+
+class QueryStats:
+    def __init__(self, trace=False):
+        self.queries = 0
+        self.rows = 0
+        self.duration = 0.0  # Secondes passées dans execute / fetch*
+        self.statements = Counter()  # texte SQL -> nombre d'exécutions
+        self.identical = Counter()  # (texte SQL, paramètres) -> nombre d'exécutions
+        self.executed = [] if trace else None  # [(texte SQL, paramètres), ...] dans l'ordre, si trace=True
+
+
+def start_query_stats(trace=False):
+    # Active des compteurs neufs pour le thread courant et les retourne ; trace=True garde
+    # aussi chaque requête exécutée avec ses paramètres (vérification des plans, migrations.py)
+    _stats.current = QueryStats(trace)
+    return _stats.current
+
+
+def current_query_stats():
+    # Compteurs actifs du thread courant, ou None
+    return getattr(_stats, 'current', None)
+
+
+def stop_query_stats():
+    # Désactive les compteurs du thread courant et les retourne (None s'il n'y en avait pas)
+    stats = getattr(_stats, 'current', None)
+    _stats.current = None
+    return stats
+
+
+def _record(start, rows=0, sql=None, parameters=None):
+    stats = getattr(_stats, 'current', None)
+    if stats is not None:
+        stats.duration += time.perf_counter() - start
+        stats.rows += rows
+        if sql is not None:
+            stats.queries += 1
+            stats.statements[sql] += 1
+            if parameters is not None:
+                stats.identical[(sql, repr(parameters))] += 1
+                if stats.executed is not None:
+                    stats.executed.append((sql, parameters))
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record(start, sql=sql, parameters=parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record(start, sql=sql)
+
+    def executescript(self, sql_script):
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            _record(start, sql=sql_script)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        _record(start, rows=row is not None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        _record(start, rows=len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        _record(start, rows=len(rows))
+        return rows
+
+    def __next__(self):
+        # Parcours ligne à ligne : on compte les lignes sans chronométrer chaque pas
+        row = super().__next__()
+        stats = getattr(_stats, 'current', None)
+        if stats is not None:
+            stats.rows += 1
+        return row
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    # Connection.execute* de sqlite3 n'appelle pas cursor() : on les redirige
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+def configure(path):
+    # Change la base utilisée (tests, scripts) et vide le pool existant
+    global DATABASE, _wal_ready
+    close_pool()
+    if getattr(_local, 'connection', None) is not None:
+        _local.connection.close()  # La connexion du thread appelant visait l'ancienne base
+        _local.connection = None
+    DATABASE = path
+    _wal_ready = False
+
+
+def connect():
+    # Ouvre et règle une nouvelle connexion (hors pool : à fermer par l'appelant)
+    global _wal_ready
+    connection = sqlite3.connect(DATABASE, check_same_thread=False, factory=InstrumentedConnection)
+    stats, _stats.current = getattr(_stats, 'current', None), None  # Le réglage de la connexion n'est pas compté
+    try:
+        if not _wal_ready:
+            # Le mode WAL est persistant dans le fichier : un seul réglage par processus
+            with _wal_lock:
+                connection.execute("PRAGMA journal_mode = WAL")
+                _wal_ready = True
+        for pragma in PRAGMAS:
+            connection.execute(pragma)
+    finally:
+        _stats.current = stats
+    return connection
+
+
+def _acquire():
+    # Récupère une connexion du pool ou en ouvre une nouvelle
+    try:
+        return _pool.get_nowait()
+    except queue.Empty:
+        return connect()
+
+
+def _release(connection):
+    # Remet une connexion dans le pool (ou la ferme si le pool est plein)
+    try:
+        if connection.in_transaction:
+            connection.rollback()  # Une transaction oubliée ne doit pas fuir vers la requête suivante
+        _pool.put_nowait(connection)
+    except (queue.Full, sqlite3.Error):
+        connection.close()
+
+
+def get_connection():
+    # Retourne la connexion de la requête courante (ou du thread courant hors requête)
+    if has_app_context():
+        if 'db_connection' not in g:
+            g.db_connection = _acquire()
+        return g.db_connection
+    connection = getattr(_local, 'connection', None)
+    if connection is None:
+        connection = _local.connection = _acquire()
+    return connection
+
+
+@contextmanager
+def transaction(connection=None):
+    # Transaction d'écriture : BEGIN IMMEDIATE prend le verrou dès le début,
+    # les lectures faites dans le bloc ne peuvent donc pas être périmées au moment d'écrire
+    connection = connection or get_connection()
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield connection
+        if getattr(_local, 'rollback_only', False):
+            connection.rollback()
+        else:
+            connection.commit()
+    except BaseException:
+        connection.rollback()
+        raise
+
+
+@contextmanager
+def rollback_only():
+    # Les transactions ouvertes dans le bloc par transaction() sont annulées au lieu d'être
+    # validées : un chemin d'écriture s'exécute réellement sans rien modifier
+    _local.rollback_only = True
+    try:
+        yield
+    finally:
+        _local.rollback_only = False
+
+
+def table_version(*names, connection=None):
+    # Compteur de modifications d'une table (migration 3), partagé entre processus ; pour
+    # plusieurs compteurs, leur somme (elle croît à chaque écriture comptée par l'un d'eux)
+    connection = connection or get_connection()
+    row = connection.execute(
+        f"SELECT COALESCE(SUM(version), 0) FROM table_versions WHERE name IN ({', '.join('?' * len(names))})",
+        names).fetchone()
+    return row[0]
+
+
+def close_connection(exception=None):
+    # Rend la connexion de la requête au pool (appelée au teardown de Flask)
+    if has_app_context():
+        connection = g.pop('db_connection', None)
+    else:
+        connection = getattr(_local, 'connection', None)
+        _local.connection = None
+    if connection is not None:
+        _release(connection)
+
+
+def close_pool():
+    # Ferme toutes les connexions inactives du pool
+    while True:
+        try:
+            _pool.get_nowait().close()
+        except queue.Empty:
+            break
+
+
+def init_app(app):
+    # Branche la gestion des connexions sur le cycle de vie de l'application
+    app.teardown_appcontext(close_connection)
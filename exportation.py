@@ -0,0 +1,88 @@
+import csv
+import io
+import json
+import zlib
+
+from database import connect
+
+#--------------------Export en flux (CSV / NDJSON)--------------------#
+
+BATCH_SIZE = 1000  # Lignes lues par fetchmany et écrites par morceau de réponse
+
+# Requête et colonnes exportées par entité
+EXPORTS = {
+    'commandes': ("""
+        SELECT c.id, c.client_id, cl.nom, c.produit_id, p.nom, c.quantite
+        FROM commandes c
+        JOIN clients cl ON c.client_id = cl.id
+        JOIN produits p ON c.produit_id = p.id
+        ORDER BY c.id
+    """, ('id', 'client_id', 'client', 'produit_id', 'produit', 'quantite')),
+    'produits': ("""
+        SELECT id, nom, prix, description, stock, type_produit
+        FROM produits
+        ORDER BY id
+    """, ('id', 'nom', 'prix', 'description', 'stock', 'type_produit')),
+    'clients': ("""
+        SELECT id, nom, email, adresse
+        FROM clients
+        ORDER BY id
+    """, ('id', 'nom', 'email', 'adresse')),
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def iter_batches(entity, batch_size=BATCH_SIZE):
+    # Parcourt la requête par paquets avec une connexion dédiée : le flux peut
+    # durer plus longtemps que la requête HTTP qui l'a lancé
+    sql, _ = EXPORTS[entity]
+    connection = connect()
+    try:
+        cursor = connection.execute(sql)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        connection.close()
+
+
+def iter_csv(entity, batch_size=BATCH_SIZE):
+    # En-tête puis un morceau de texte CSV par paquet
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORTS[entity][1])
+    for rows in iter_batches(entity, batch_size):
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_ndjson(entity, batch_size=BATCH_SIZE):
+    # Un objet JSON par ligne
+    columns = EXPORTS[entity][1]
+    for rows in iter_batches(entity, batch_size):
+        yield "".join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows)
+
+
+def iter_export(entity, fmt, compress=False, batch_size=BATCH_SIZE):
+    # Morceaux d'octets prêts à envoyer, compressés en gzip à la volée si demandé
+    chunks = (iter_csv if fmt == 'csv' else iter_ndjson)(entity, batch_size)
+    if not compress:
+        for chunk in chunks:
+            yield chunk.encode('utf-8')
+        return
+    compressor = zlib.compressobj(wbits=31)  # wbits=31 : en-tête et pied gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
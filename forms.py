@@ -1,18 +1,18 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, DecimalField, TextAreaField, IntegerField, SubmitField, SelectField, EmailField
-from wtforms.validators import DataRequired, Length, NumberRange, Email, ValidationError
-from gestion_produit import Client, Produit
+from wtforms import Form, StringField, DecimalField, TextAreaField, IntegerField, SubmitField, SelectField, EmailField, FieldList, FormField
+from wtforms.widgets import HiddenInput
+from wtforms.validators import DataRequired, InputRequired, Length, NumberRange, Email, ValidationError
 
 
 #-------------class add form produit------------
 class AddProductForm(FlaskForm):
     nom = StringField('Nom du produit', validators=[DataRequired(), Length(max=50)])  
     # Champ pour saisir le prix avec validation numérique et précision de 2 décimales
-    prix = DecimalField('Prix', validators=[DataRequired(), NumberRange(min=0)], places=2)  
+    prix = DecimalField('Prix', validators=[InputRequired(), NumberRange(min=0)], places=2)  
     # Champ pour une description avec validation de longueur maximale
     description = TextAreaField('Description', validators=[Length(max=200)])  
     # Champ pour le stock avec une validation pour garantir un nombre entier positif
-    stock = IntegerField('Stock', validators=[DataRequired(), NumberRange(min=0)])  
+    stock = IntegerField('Stock', validators=[InputRequired(), NumberRange(min=0)])  
     # Liste déroulante pour sélectionner un type de produit, avec des choix prédéfinis
     type_produit = SelectField('Type de produit', choices=[
         ('Fruits et légumes', 'Fruits et légumes'),
@@ -53,24 +53,39 @@ class EditClientForm(FlaskForm):
     submit = SubmitField('Modifier')
 
 #-------------class add form commande------------
+# L'existence du client et du produit n'est pas vérifiée ici : la transaction de la commande
+# la contrôle déjà par clé primaire (ValueError affichée en message)
 class AddOrderForm(FlaskForm):
-    # Liste déroulante pour sélectionner un client par ID (converti en entier)
-    client_id = SelectField('Client', coerce=int, validators=[DataRequired()])  
-    # Liste déroulante pour sélectionner un produit par ID (converti en entier)
-    produit_id = SelectField('Produit', coerce=int, validators=[DataRequired()])  
+    # ID du client choisi dans les suggestions (champ caché, rempli par la saisie assistée)
+    client_id = IntegerField('Client', widget=HiddenInput(),
+                             validators=[DataRequired(message="Sélectionnez un client existant.")])
+    # ID du produit choisi dans les suggestions (champ caché, rempli par la saisie assistée)
+    produit_id = IntegerField('Produit', widget=HiddenInput(),
+                              validators=[DataRequired(message="Sélectionnez un produit existant.")])
     # Champ pour indiquer la quantité de produit commandée, avec validation pour être un entier >= 1
     quantite = IntegerField('Quantité', validators=[DataRequired(), NumberRange(min=1)])  
     # Bouton de soumission pour valider la commande
     submit = SubmitField('Effectuer')
 
-    def validate_client_id(self, field):
-        # Méthode pour valider que l'ID du client existe dans la base de données
-        client = Client()  # Instanciation de la classe `Client`
-        if not client.exists(field.data):  # Vérifie si le client avec l'ID donné n'existe pas
-            raise ValidationError("Le client sélectionné n'existe pas.")  # Lève une erreur si le client est introuvable
+#-------------class add form commande de plusieurs lignes------------
+MAX_LIGNES = 100  # Lignes au plus par commande envoyée
 
-    def validate_produit_id(self, field):
-        # Méthode pour valider que l'ID du produit existe dans la base de données
-        produit = Produit()  # Instanciation de la classe `Produit`
-        if not produit.exists(field.data):  # Vérifie si le produit avec l'ID donné n'existe pas
-            raise ValidationError('Le produit sélectionné n\'existe pas.')  # Lève une erreur si le produit est introuvable
\ No newline at end of file
+class LigneCommandeForm(Form):
+    # Une ligne : produit choisi dans les suggestions et quantité (sous-formulaire, sans CSRF propre)
+    produit_id = IntegerField('Produit', widget=HiddenInput(),
+                              validators=[DataRequired(message="Sélectionnez un produit existant.")])
+    quantite = IntegerField('Quantité', validators=[DataRequired(), NumberRange(min=1)])
+
+class AddOrderLinesForm(FlaskForm):
+    # ID du client choisi dans les suggestions, commun à toutes les lignes
+    client_id = IntegerField('Client', widget=HiddenInput(),
+                             validators=[DataRequired(message="Sélectionnez un client existant.")])
+    # Lignes lignes-0-produit_id, lignes-0-quantite, lignes-1-... ajoutées dans la page
+    lignes = FieldList(FormField(LigneCommandeForm), min_entries=1)
+    # Bouton de soumission pour valider la commande
+    submit = SubmitField('Effectuer')
+
+    def validate_lignes(self, field):
+        # Refus explicite plutôt que max_entries, qui ignorerait les lignes en trop sans erreur
+        if len(field.entries) > MAX_LIGNES:
+            raise ValidationError(f"Au plus {MAX_LIGNES} lignes par commande.")
@@ -0,0 +1,70 @@
+from flask import current_app, request
+
+import database
+import journalisation
+
+#--------------------Budget de requêtes SQL par route--------------------#
+# Après chaque requête HTTP, compare les requêtes SQL exécutées (compteurs de
+# database.py) au budget déclaré par la route avec @query_budget, et signale :
+#   - un dépassement du nombre maximal de requêtes ;
+#   - une même requête exécutée plusieurs fois avec les mêmes paramètres ;
+#   - une même requête exécutée en boucle avec des paramètres différents (N+1).
+# QUERY_BUDGET = 'raise' (par défaut en TESTING) : lève QueryBudgetExceeded, le test échoue ;
+# QUERY_BUDGET = 'warn' : écrit un événement 'query_budget' dans le journal ; None : désactivé.
+
+N_PLUS_ONE_THRESHOLD = 5  # Exécutions d'une même requête SQL à partir desquelles on soupçonne un N+1
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(max_queries=None, max_repeats=N_PLUS_ONE_THRESHOLD):
+    # Décorateur de vue (à placer sous @app.route) : max_queries requêtes SQL au plus par appel,
+    # une même requête au plus max_repeats - 1 fois (None : répétitions attendues, par exemple un import)
+    def decorator(view):
+        view.query_budget = (max_queries, max_repeats)
+        return view
+    return decorator
+
+
+def _short(sql):
+    return " ".join(sql.split())[:200]
+
+
+def check(stats, max_queries=None, max_repeats=N_PLUS_ONE_THRESHOLD):
+    # Retourne la liste des problèmes trouvés dans les compteurs d'une requête
+    problems = []
+    if max_queries is not None and stats.queries > max_queries:
+        problems.append(f"{stats.queries} requêtes SQL pour un budget de {max_queries}")
+    if max_repeats is None:
+        return problems
+    for (sql, parameters), count in stats.identical.items():
+        if count > 1:
+            problems.append(f"requête identique exécutée {count} fois : {_short(sql)} {parameters}")
+    for sql, count in stats.statements.items():
+        if count >= max_repeats:
+            problems.append(f"N+1 probable, requête exécutée {count} fois : {_short(sql)}")
+    return problems
+
+
+def _after_request(response):
+    mode = current_app.config.get('QUERY_BUDGET', 'raise' if current_app.testing else None)
+    stats = database.current_query_stats()
+    if not mode or stats is None:
+        return response
+    view = current_app.view_functions.get(request.endpoint)
+    problems = check(stats, *getattr(view, 'query_budget', (None, N_PLUS_ONE_THRESHOLD)))
+    if not problems:
+        return response
+    if mode == 'raise':
+        raise QueryBudgetExceeded(f"{request.method} {request.path} : " + " ; ".join(problems))
+    journalisation.log_event('query_budget', f"{request.method} {request.path} : {len(problems)} problème(s)",
+                             endpoint=request.endpoint, queries=stats.queries, problems=problems)
+    return response
+
+
+def init_app(app):
+    # Utilise les compteurs démarrés par metriques : à appeler après metriques.init_app
+    # (les after_request s'exécutent en ordre inverse, ce contrôle passe donc avant leur arrêt)
+    app.after_request(_after_request)
@@ -1,4 +1,33 @@
+import re
 import sqlite3
+from collections import namedtuple
+
+from database import get_connection, transaction
+from cache import catalogue_cache
+
+MAX_IN_PARAMS = 500  # Nombre maximal d'ids par requête IN (...), sous la limite de variables de SQLite
+
+#--------------------Enregistrements en lecture--------------------#
+# Les lectures retournent des enregistrements immuables (namedtuple, sans __dict__ par
+# ligne) : accès par nom (produit.nom) comme par position (produit[1]). Les classes
+# Produit, Client et Commande restent les objets modifiables utilisés pour les écritures.
+# Les colonnes sont nommées dans les requêtes : l'ajout d'une colonne à une table ne
+# décale pas les enregistrements.
+
+PRODUIT_COLUMNS = "id, nom, prix, description, stock, type_produit"
+ProduitRow = namedtuple('ProduitRow', PRODUIT_COLUMNS)
+ClientRow = namedtuple('ClientRow', "id, nom, email, adresse")
+CommandeRow = namedtuple('CommandeRow', "id, client_id, produit_id, quantite")
+CommandeDetailRow = namedtuple('CommandeDetailRow', "id, client, produit, quantite, date, entete, created_at")  # Noms du client et du produit, date locale, n° de commande (en-tête) ou None, date en secondes Unix
+
+NOW = "CAST(strftime('%s', 'now') AS INTEGER)"  # Date de création des commandes (created_at), en secondes Unix
+
+
+def row_factory(record):
+    # row_factory sqlite3 : chaque ligne lue devient directement un enregistrement `record`
+    new = tuple.__new__
+    return lambda cursor, row: new(record, row)
+
 
 #--------------------Class Produit--------------------#
 
@@ -12,29 +41,10 @@ class Produit:
         self.type_produit = type_produit  
         self.id = id 
 
-#methode pour créer la table des produits
-    def create_table_product(self):
-        try:
-            with sqlite3.connect("app_database.db") as connection:  
-                cursor = connection.cursor() 
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS produits (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        nom TEXT NOT NULL,  
-                        prix REAL NOT NULL,  
-                        description TEXT NOT NULL,  
-                        stock INTEGER NOT NULL,  
-                        type_produit TEXT NOT NULL  
-                    )
-                """)
-        except sqlite3.Error as e:
-            # Gestion des erreurs SQL
-            print(f"Erreur lors de la création de la table : {e}")
-
     #methode pour verifier l'existence d'un produit
     def exists(self, produit_id):
         # Vérifie si un produit avec l'ID donné existe dans la base
-        with sqlite3.connect("app_database.db") as connection:  # Connexion à la base de données
+        with get_connection() as connection:  # Connexion à la base de données
             cursor = connection.cursor()  # Création d'un curseur
             cursor.execute("SELECT 1 FROM produits WHERE id = ?", (produit_id,))  # Requête pour vérifier l'existence
             result = cursor.fetchone()  # Récupère le premier résultat (s'il existe)
@@ -43,7 +53,7 @@ class Produit:
     def add_product(self):
         # Ajoute un produit dans la base de données
         try:
-            with sqlite3.connect("app_database.db") as connection:  # Connexion à la base de données
+            with get_connection() as connection:  # Connexion à la base de données
                 cursor = connection.cursor()  # Création d'un curseur
                 cursor.execute("""
                     INSERT INTO produits (nom, prix, description, stock, type_produit)
@@ -51,43 +61,118 @@ class Produit:
                 """, (self.nom, format(self.prix, ".2f"), self.description, self.stock, self.type_produit))  # Insertion des valeurs
                 self.id = cursor.lastrowid  # Récupération de l'ID généré
                 connection.commit()  # Sauvegarde des modifications
+                catalogue_cache.invalidate('produits')  # Invalide le cache du catalogue
         except sqlite3.Error as e:
             # Gestion des erreurs SQL
             print(f"Erreur lors de l'ajout du produit : {e}")
 
-    def get_products(self):
-        # Récupère tous les produits de la base de données
+    def get_products(self, after_id=None, limit=None, type_produit=None):
+        # Récupère les produits, page par page (pagination par curseur sur l'id)
+        conditions, params = [], []
+        if type_produit:
+            conditions.append("type_produit = ?")  # Filtre par type (index idx_produits_type)
+            params.append(type_produit)
+        if after_id is not None:
+            conditions.append("id > ?")  # Reprend après le dernier id de la page précédente
+            params.append(after_id)
+        query = f"SELECT {PRODUIT_COLUMNS} FROM produits"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        try:
+            with get_connection() as connection:  # Connexion à la base de données
+                cursor = connection.cursor()  # Création d'un curseur
+                cursor.row_factory = row_factory(ProduitRow)
+                cursor.execute(query, params)  # Requête pour récupérer la page de produits
+                return cursor.fetchall()  # Liste de ProduitRow
+        except sqlite3.Error as e:
+            # Gestion des erreurs SQL
+            print(f"Erreur lors de la récupération des produits : {e}")
+            return []
+
+    def get_product_by_id(self, produit_id):
+        # Récupère un seul produit par sa clé primaire (None s'il n'existe pas)
+        try:
+            with get_connection() as connection:  # Connexion à la base de données
+                cursor = connection.cursor()  # Création d'un curseur
+                cursor.row_factory = row_factory(ProduitRow)
+                cursor.execute(f"SELECT {PRODUIT_COLUMNS} FROM produits WHERE id = ?", (produit_id,))  # Recherche par clé primaire
+                return cursor.fetchone()  # ProduitRow ou None
+        except sqlite3.Error as e:
+            # Gestion des erreurs SQL
+            print(f"Erreur lors de la récupération du produit : {e}")
+            return None
+
+    def get_products_by_ids(self, produit_ids):
+        # Récupère plusieurs produits par clé primaire, en une requête IN (...) par lot
+        produit_ids = sorted(set(produit_ids))
+        produits = []
         try:
-            with sqlite3.connect("app_database.db") as connection:  # Connexion à la base de données
+            with get_connection() as connection:  # Connexion à la base de données
                 cursor = connection.cursor()  # Création d'un curseur
-                cursor.execute("SELECT * FROM produits")  # Requête pour récupérer tous les produits
-                produits = cursor.fetchall()  # Récupère toutes les lignes de la table
-                # Retourne une liste d'instances `Produit` créée à partir des données récupérées
-                return [Produit(nom=row[1], prix=row[2], description=row[3], stock=row[4], type_produit=row[5], id=row[0]) for row in produits]
+                cursor.row_factory = row_factory(ProduitRow)
+                for start in range(0, len(produit_ids), MAX_IN_PARAMS):
+                    chunk = produit_ids[start:start + MAX_IN_PARAMS]
+                    placeholders = ", ".join("?" * len(chunk))
+                    cursor.execute(f"SELECT {PRODUIT_COLUMNS} FROM produits WHERE id IN ({placeholders}) ORDER BY id", chunk)
+                    produits.extend(cursor.fetchall())
+            return produits
         except sqlite3.Error as e:
             # Gestion des erreurs SQL
             print(f"Erreur lors de la récupération des produits : {e}")
             return []
 
+    def has_products(self):
+        # Vérifie qu'au moins un produit existe, sans charger la table
+        with get_connection() as connection:
+            return connection.execute("SELECT 1 FROM produits LIMIT 1").fetchone() is not None
+
+    def get_first_products(self, limit=5):
+        # Nom et description des premiers produits (tableau de bord), dans l'ordre de la clé primaire
+        with get_connection() as connection:
+            return connection.execute("SELECT nom, description FROM produits ORDER BY id ASC LIMIT ?", (limit,)).fetchall()
+
     def filter_products_by_type(self, type_produit):
         # Filtre les produits par type
-        with sqlite3.connect("app_database.db") as connection:  # Connexion à la base de données
+        with get_connection() as connection:  # Connexion à la base de données
             cursor = connection.cursor()  # Création d'un curseur
-            cursor.execute("""
-                SELECT id, nom, prix, type_produit, description, stock
+            cursor.row_factory = row_factory(ProduitRow)
+            cursor.execute(f"""
+                SELECT {PRODUIT_COLUMNS}
                 FROM produits
                 WHERE type_produit = ?
             """, (type_produit,))  # Requête pour sélectionner les produits par type
-            rows = cursor.fetchall()  # Récupère les résultats
-            # Transforme les résultats en une liste de dictionnaires
-            columns = ['id', 'nom', 'prix', 'type_produit', 'description', 'stock']
-            produits = [dict(zip(columns, row)) for row in rows]
-            return produits
+            return cursor.fetchall()  # Liste de ProduitRow
+
+    def search_products(self, texte, type_produit=None, offset=0, limit=None):
+        # Recherche plein texte (FTS5) dans le nom et la description, classée par BM25 ;
+        # chaque mot est cherché comme préfixe. Retourne une liste de (ProduitRow, score)
+        match = fts_query(texte)
+        if match is None:
+            return []
+        # Tous les produits trouvés (filtre de type compris) sont classés : aucun résultat n'est écarté
+        query = f"""
+            SELECT {", ".join("p." + column for column in ProduitRow._fields)}, produits_fts.rank
+            FROM produits_fts JOIN produits p ON p.id = produits_fts.rowid
+            WHERE produits_fts MATCH ?
+        """
+        params = [match]
+        if type_produit:
+            query += " AND p.type_produit = ?"
+            params.append(type_produit)
+        query += " ORDER BY produits_fts.rank LIMIT ? OFFSET ?"
+        params += [-1 if limit is None else limit, offset]
+        with get_connection() as connection:
+            rows = connection.execute(query, params).fetchall()
+        return [(ProduitRow._make(row[:6]), row[6]) for row in rows]
 
     def update_product(self, produit_id, nom, prix, description, stock, type_produit):
         # Met à jour un produit dans la base de données
         try:
-            with sqlite3.connect("app_database.db") as connection:  # Connexion à la base de données
+            with get_connection() as connection:  # Connexion à la base de données
                 cursor = connection.cursor()  # Création d'un curseur
                 cursor.execute("""
                     UPDATE produits
@@ -95,6 +180,7 @@ class Produit:
                     WHERE id = ?
                 """, (nom, prix, description, stock, type_produit, produit_id))  # Requête de mise à jour
                 connection.commit()  # Sauvegarde des modifications
+                catalogue_cache.invalidate('produits')  # Invalide le cache du catalogue
                 print(f"Produit avec ID {produit_id} mis à jour.")
         except sqlite3.Error as e:
             # Gestion des erreurs SQL
@@ -103,19 +189,15 @@ class Produit:
     def delete_product(self, product_id):
         # Supprime un produit de la base de données
         try:
-            with sqlite3.connect("app_database.db") as connection:  # Connexion à la base de données
+            with get_connection() as connection:  # Connexion à la base de données
                 cursor = connection.cursor()  # Création d'un curseur
                 cursor.execute("DELETE FROM produits WHERE id = ?", (product_id,))  # Requête de suppression
                 connection.commit()  # Sauvegarde des modifications
+                catalogue_cache.invalidate('produits')  # Invalide le cache du catalogue
         except sqlite3.Error as e:
             # Gestion des erreurs SQL
             print(f"Erreur lors de la suppression du produit : {e}")
 
-# Exemple d'utilisation : Création de la table des produits
-produit = Produit()
-produit.create_table_product()
-
-
 #--------------------Class Client--------------------#
 
 class Client:
@@ -126,22 +208,9 @@ class Client:
         self.email = email  # Email du client
         self.adresse = adresse  # Adresse du client
 
-    def create_table_client(self):
-        with sqlite3.connect("app_database.db") as connection:  
-            cursor = connection.cursor()  # Création d'un curseur pour exécuter les requêtes
-            cursor.execute(""" 
-                CREATE TABLE IF NOT EXISTS clients (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,  
-                    nom TEXT NOT NULL,  
-                    email TEXT NOT NULL, 
-                    adresse TEXT NOT NULL 
-                )
-            """)  # Requête SQL pour créer la table si elle n'existe pas
-            connection.commit()  # Validation des changements
-
     def exists(self, client_id):
         # Méthode pour vérifier si un client avec un ID donné existe
-        with sqlite3.connect("app_database.db") as connection:  # Connexion à la base de données
+        with get_connection() as connection:  # Connexion à la base de données
             cursor = connection.cursor()  # Création du curseur
             cursor.execute("SELECT 1 FROM clients WHERE id = ?", (client_id,))  # Vérification de l'existence
             result = cursor.fetchone()  # Récupération du résultat
@@ -150,33 +219,50 @@ class Client:
     def add_client(self):
         # Méthode pour ajouter un nouveau client dans la base de données
         try:
-            with sqlite3.connect("app_database.db") as connection:  # Connexion à la base
+            with get_connection() as connection:  # Connexion à la base
                 cursor = connection.cursor()  # Création du curseur
                 cursor.execute("""
                     INSERT INTO clients (nom, email, adresse) 
                     VALUES (?, ?, ?)
                 """, (self.nom, self.email, self.adresse))  # Insertion des données du client
                 connection.commit()  # Validation de l'opération
+                catalogue_cache.invalidate('clients')  # Invalide le cache du catalogue
         except sqlite3.Error as e:
-            connection.close()  # Fermeture de la connexion en cas d'erreur
-
-    def get_clients(self):
-        # Méthode pour récupérer tous les clients depuis la base de données
-        with sqlite3.connect("app_database.db") as connection:  # Connexion à la base
+            print(f"Erreur lors de l'ajout du client : {e}")
+
+    def get_clients(self, after_id=None, limit=None):
+        # Méthode pour récupérer les clients, page par page (pagination par curseur sur l'id)
+        query = "SELECT id, nom, email, adresse FROM clients"
+        params = []
+        if after_id is not None:
+            query += " WHERE id > ?"  # Reprend après le dernier id de la page précédente
+            params.append(after_id)
+        query += " ORDER BY id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with get_connection() as connection:  # Connexion à la base
             cursor = connection.cursor()  # Création du curseur
-            cursor.execute("SELECT id, nom, email FROM clients")  # Requête pour récupérer les clients
-            return cursor.fetchall()  # Retourne une liste de tuples avec les clients
+            cursor.row_factory = row_factory(ClientRow)
+            cursor.execute(query, params)  # Requête pour récupérer les clients
+            return cursor.fetchall()  # Retourne une liste de ClientRow
+
+    def has_clients(self):
+        # Vérifie qu'au moins un client existe, sans charger la table
+        with get_connection() as connection:
+            return connection.execute("SELECT 1 FROM clients LIMIT 1").fetchone() is not None
 
     def get_client_by_id(self, client_id):
         # Méthode pour récupérer un client spécifique par son ID
-        with sqlite3.connect("app_database.db") as connection:  # Connexion à la base
+        with get_connection() as connection:  # Connexion à la base
             cursor = connection.cursor()  # Création du curseur
+            cursor.row_factory = row_factory(ClientRow)
             cursor.execute("SELECT id, nom, email, adresse FROM clients WHERE id = ?", (client_id,))  # Requête SQL
-            return cursor.fetchone()  # Retourne les informations du client ou None s'il n'existe pas
+            return cursor.fetchone()  # Retourne le ClientRow ou None s'il n'existe pas
 
     def update_client(self, client_id):
         # Méthode pour mettre à jour les informations d'un client existant
-        with sqlite3.connect("app_database.db") as connection:  # Connexion à la base
+        with get_connection() as connection:  # Connexion à la base
             cursor = connection.cursor()  # Création du curseur
             cursor.execute("""
                 UPDATE clients
@@ -184,23 +270,19 @@ class Client:
                 WHERE id = ?
             """, (self.nom, self.email, self.adresse, client_id))  # Mise à jour des données du client
             connection.commit()  # Validation des changements
+            catalogue_cache.invalidate('clients')  # Invalide le cache du catalogue
 
     def delete_client(self, client_id):
         # Méthode pour supprimer un client par son ID
         try:
-            with sqlite3.connect("app_database.db") as connection:  # Connexion à la base
+            with get_connection() as connection:  # Connexion à la base
                 cursor = connection.cursor()  # Création du curseur
                 cursor.execute("DELETE FROM clients WHERE id = ?", (client_id,))  # Suppression du client
                 connection.commit()  # Validation de l'opération
+                catalogue_cache.invalidate('clients')  # Invalide le cache du catalogue
         except sqlite3.Error as e:
             print(f"Erreur lors de la suppression du client : {str(e)}")  # Affichage d'une erreur si elle se produit
 
-# Création d'une instance de la classe Client
-client = Client()
-# Appel de la méthode pour créer la table clients (si elle n'existe pas)
-client.create_table_client()
-
-
 #--------------------Class Commande--------------------#
 
 class Commande:
@@ -208,54 +290,68 @@ class Commande:
         self.client_id = client_id
         self.produit_id = produit_id
         self.quantite = quantite
-
-    def create_table_commande(self):
-        with sqlite3.connect("app_database.db") as connection:
-            cursor = connection.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS commandes (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    client_id INTEGER NOT NULL,
-                    produit_id INTEGER NOT NULL,
-                    quantite INTEGER NOT NULL,
-                    FOREIGN KEY (client_id) REFERENCES clients (id),
-                    FOREIGN KEY (produit_id) REFERENCES produits (id)
-                )
-            """)
-            connection.commit()
+        self.entete_id = None  # En-tête de la commande de plusieurs lignes, lu par update_commande
 
     def add_commande(self):
-        produit = Produit()
-        if not produit.exists(self.produit_id):
-            raise ValueError("Le produit n'existe pas.")
-        if not client.exists(self.client_id):
-            raise ValueError("Le client n'existe pas.")
-        
-        with sqlite3.connect("app_database.db") as connection:
+        # Vérifie le client, réserve le stock et insère la commande dans une seule transaction
+        with transaction() as connection:
             cursor = connection.cursor()
-            cursor.execute("""
-                INSERT INTO commandes (client_id, produit_id, quantite)
-                VALUES (?, ?, ?)
+            cursor.execute("SELECT 1 FROM clients WHERE id = ?", (self.client_id,))
+            if cursor.fetchone() is None:
+                raise ValueError("Le client n'existe pas.")
+            reserve_stock(cursor, self.produit_id, self.quantite)
+            cursor.execute(f"""
+                INSERT INTO commandes (client_id, produit_id, quantite, created_at)
+                VALUES (?, ?, ?, {NOW})
             """, (self.client_id, self.produit_id, self.quantite))
-            connection.commit()
+            self.id = cursor.lastrowid
 
     def get_commandes(self):
-        with sqlite3.connect("app_database.db") as connection:
+        with get_connection() as connection:
             cursor = connection.cursor()
-            cursor.execute("SELECT * FROM commandes")
+            cursor.row_factory = row_factory(CommandeRow)
+            cursor.execute("SELECT id, client_id, produit_id, quantite FROM commandes")
             commandes = cursor.fetchall()
             return commandes
 
-    def get_commandes_with_details(self):
+    def get_commandes_with_details(self, after_id=None, limit=None, start=None, end=None, after_date=None):
+        # Commandes avec noms du client et du produit, page par page (curseur : id de la dernière
+        # commande lue). start / end : période de création [start, end[ en secondes Unix ; les
+        # pages suivent alors l'ordre de idx_commandes_created_at (created_at, id), sans tri,
+        # et le curseur devient (after_date, after_id) : date et id de la dernière commande lue,
+        # valable même si elle a été supprimée ou archivée entre deux pages
+        query = """
+            SELECT c.id, cl.nom, p.nom, c.quantite, strftime('%Y-%m-%d %H:%M', c.created_at, 'unixepoch', 'localtime'),
+                   c.entete_id, c.created_at
+            FROM commandes c
+            JOIN clients cl ON c.client_id = cl.id
+            JOIN produits p ON c.produit_id = p.id
+        """
+        conditions, params = [], []
+        period = start is not None or end is not None
+        if period and after_id is not None and after_date is not None and (start is None or after_date >= start):
+            conditions.append("(c.created_at, c.id) > (?, ?)")  # Curseur après le début de la période
+            params += [after_date, after_id]
+        elif start is not None:
+            conditions.append("c.created_at >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("c.created_at < ?")
+            params.append(end)
+        if not period and after_id is not None:
+            conditions.append("c.id > ?")
+            params.append(after_id)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY c.created_at, c.id" if period else " ORDER BY c.id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
         try:
-            with sqlite3.connect("app_database.db") as connection:
+            with get_connection() as connection:
                 cursor = connection.cursor()
-                cursor.execute("""
-                    SELECT c.id, cl.nom, p.nom, c.quantite
-                    FROM commandes c
-                    JOIN clients cl ON c.client_id = cl.id
-                    JOIN produits p ON c.produit_id = p.id
-                """)
+                cursor.row_factory = row_factory(CommandeDetailRow)
+                cursor.execute(query, params)
                 orders = cursor.fetchall()
                 return orders
         except sqlite3.Error as e:
@@ -264,8 +360,9 @@ class Commande:
 
     def get_order_by_id(self, order_id):
         try:
-            with sqlite3.connect("app_database.db") as connection:
+            with get_connection() as connection:
                 cursor = connection.cursor()
+                cursor.row_factory = row_factory(CommandeRow)
                 cursor.execute("""
                     SELECT id, client_id, produit_id, quantite
                     FROM commandes
@@ -278,24 +375,132 @@ class Commande:
             return None
 
     def update_commande(self, commande_id):
-        with sqlite3.connect("app_database.db") as connection:
+        # Applique la différence de quantité au stock et met à jour la commande, de façon atomique.
+        # Retourne le nombre d'autres lignes de la même commande (en-tête) dont le client a suivi
+        # (trigger trg_commandes_entete_client), 0 si le client n'a pas changé
+        with transaction() as connection:
             cursor = connection.cursor()
+            cursor.execute("SELECT client_id, produit_id, quantite, entete_id FROM commandes WHERE id = ?", (commande_id,))
+            current = cursor.fetchone()
+            if current is None:
+                raise ValueError("La commande n'existe pas.")
+            cursor.execute("SELECT 1 FROM clients WHERE id = ?", (self.client_id,))
+            if cursor.fetchone() is None:
+                raise ValueError("Le client n'existe pas.")
+            old_client_id, old_produit_id, old_quantite, self.entete_id = current
+            if old_produit_id == self.produit_id:
+                reserve_stock(cursor, self.produit_id, self.quantite - old_quantite)
+            else:
+                # Changement de produit : on rend l'ancienne quantité puis on réserve la nouvelle
+                release_stock(cursor, old_produit_id, old_quantite)
+                reserve_stock(cursor, self.produit_id, self.quantite)
             cursor.execute("""
                 UPDATE commandes
                 SET client_id = ?, produit_id = ?, quantite = ?
                 WHERE id = ?
             """, (self.client_id, self.produit_id, self.quantite, commande_id))
-            connection.commit()
+            if self.entete_id is None or old_client_id == self.client_id:
+                return 0
+            cursor.execute("SELECT COUNT(*) FROM commandes WHERE entete_id = ? AND id != ?", (self.entete_id, commande_id))
+            return cursor.fetchone()[0]
 
     def delete_commande(self, commande_id):
-        try:
-            with sqlite3.connect("app_database.db") as connection:
-                cursor = connection.cursor()
-                cursor.execute("DELETE FROM commandes WHERE id = ?", (commande_id,))
-                connection.commit()
-        except sqlite3.Error as e:
-            print(f"Erreur lors de la suppression de la commande : {str(e)}")
+        # Supprime la commande et remet sa quantité en stock dans la même transaction
+        with transaction() as connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT produit_id, quantite FROM commandes WHERE id = ?", (commande_id,))
+            order = cursor.fetchone()
+            if order is None:
+                raise ValueError("La commande n'existe pas.")
+            release_stock(cursor, order[0], order[1])
+            cursor.execute("DELETE FROM commandes WHERE id = ?", (commande_id,))
+
+#--------------------Class EnteteCommande--------------------#
+# Commande de plusieurs lignes passée en un seul envoi : un en-tête (entetes_commande) et une
+# ligne de `commandes` par produit. Les lignes se modifient et se suppriment ensuite comme
+# les commandes d'une seule ligne (Commande) ; le client reste commun à l'en-tête et à toutes
+# ses lignes (trigger de la migration 11). /commandes affiche le n° de l'en-tête de chaque ligne.
+
+class EnteteCommande:
+    def __init__(self, client_id=0, lignes=()):
+        self.client_id = client_id
+        self.lignes = list(lignes)  # [(produit_id, quantite), ...]
+        self.id = None
+
+    def add_commande(self):
+        # Tout ou rien, dans une seule transaction : client vérifié par clé primaire, tous les
+        # produits lus en une requête IN (...) par paquet, stock réservé et lignes insérées
+        # en un executemany chacun, quel que soit le nombre de lignes
+        quantites = {}
+        for produit_id, quantite in self.lignes:
+            quantites[produit_id] = quantites.get(produit_id, 0) + quantite  # Même produit sur plusieurs lignes
+        if not quantites:
+            raise ValueError("La commande ne contient aucune ligne.")
+        produit_ids = sorted(quantites)
+        with transaction() as connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1 FROM clients WHERE id = ?", (self.client_id,))
+            if cursor.fetchone() is None:
+                raise ValueError("Le client n'existe pas.")
+            stocks = {}
+            for start in range(0, len(produit_ids), MAX_IN_PARAMS):
+                chunk = produit_ids[start:start + MAX_IN_PARAMS]
+                cursor.execute(f"SELECT id, stock FROM produits WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+                stocks.update(cursor.fetchall())
+            missing = [produit_id for produit_id in produit_ids if produit_id not in stocks]
+            if missing:
+                raise ValueError(f"Produit(s) inexistant(s) : {', '.join(map(str, missing))}.")
+            short = [produit_id for produit_id in produit_ids if stocks[produit_id] < quantites[produit_id]]
+            if short:
+                raise ValueError(f"Stock insuffisant pour le(s) produit(s) : {', '.join(map(str, short))}.")
+            # Stocks lus sous le verrou d'écriture (BEGIN IMMEDIATE) : ils ne peuvent pas avoir changé
+            cursor.executemany("UPDATE produits SET stock = stock - ? WHERE id = ?",
+                               [(quantite, produit_id) for produit_id, quantite in quantites.items()])
+            cursor.execute("INSERT INTO entetes_commande (client_id) VALUES (?)", (self.client_id,))
+            self.id = cursor.lastrowid
+            cursor.executemany(f"INSERT INTO commandes (client_id, produit_id, quantite, entete_id, created_at) VALUES (?, ?, ?, ?, {NOW})",
+                               [(self.client_id, produit_id, quantite, self.id) for produit_id, quantite in quantites.items()])
+
+
+#--------------------Gestion atomique du stock--------------------#
+# À appeler uniquement dans une transaction ouverte par `transaction()`.
+
+def reserve_stock(cursor, produit_id, quantite):
+    # Décrémente le stock seulement s'il est suffisant (quantite négative = remise en stock)
+    cursor.execute("""
+        UPDATE produits SET stock = stock - ?
+        WHERE id = ? AND stock >= ?
+    """, (quantite, produit_id, quantite))
+    if cursor.rowcount == 0:
+        cursor.execute("SELECT 1 FROM produits WHERE id = ?", (produit_id,))
+        if cursor.fetchone() is None:
+            raise ValueError("Le produit n'existe pas.")
+        raise ValueError("Stock insuffisant pour ce produit.")
+
+
+def release_stock(cursor, produit_id, quantite):
+    # Remet une quantité en stock (le produit a pu être supprimé entre-temps)
+    cursor.execute("UPDATE produits SET stock = stock + ? WHERE id = ?", (quantite, produit_id))
+
+
+#--------------------Recherche plein texte--------------------#
+
+def fts_query(texte):
+    # Transforme la saisie en requête FTS5 : chaque mot devient un préfixe entre guillemets
+    # ("pom"* trouve pomme, pommes...), tous les mots doivent être présents.
+    # Les guillemets et opérateurs tapés par l'utilisateur n'ont donc aucun effet.
+    mots = re.findall(r"\w+", texte or "")
+    if not mots:
+        return None
+    return " ".join(f'"{mot}"*' for mot in mots)
+
 
+#--------------------Saisie assistée--------------------#
 
-commande = Commande()
-commande.create_table_commande()
\ No newline at end of file
+def name_suggestions(table, prefix, limit, connection=None):
+    # Recherche par début de nom (clients ou produits) : parcours de l'index idx_<table>_nom
+    # (insensible à la casse), au plus `limit` paires (id, nom)
+    prefix = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')  # Caractères spéciaux de LIKE
+    return (connection or get_connection()).execute(
+        f"SELECT id, nom FROM {table} WHERE nom LIKE ? ESCAPE '\\' ORDER BY nom COLLATE NOCASE, id LIMIT ?",
+        (prefix + '%', limit)).fetchall()
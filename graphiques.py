@@ -0,0 +1,173 @@
+import multiprocessing
+import threading
+from functools import partial
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import analyse_ventes
+import graphiques_rendu
+import statistiques
+from database import get_connection
+
+#--------------------Graphiques des produits--------------------#
+# Les données sont lues dans le thread de la requête (tables de synthèse, rapides) ;
+# le rendu matplotlib part dans un pool de processus borné. Chaque image est mise
+# en cache avec la version des tables qu'elle lit (voir chart_version) : tant qu'une
+# nouvelle image est en cours de rendu, les requêtes reçoivent immédiatement la
+# dernière image valide.
+
+RENDER_WORKERS = 2  # Nombre de processus de rendu
+SALES_TOP = 10  # Barres des classements de ventes
+
+
+# Données du graphique circulaire : nombre de produits par type
+def load_pie_chart(connection):
+    return statistiques.products_by_type(connection)
+
+# Données du graphique en barres : niveaux de stock les plus fréquents
+def load_category_bar_chart(connection):
+    return statistiques.top_stock_levels(3, connection)
+
+# Données de l'histogramme : nombre de produits par tranche de prix
+def load_price_histogram(connection):
+    return statistiques.price_buckets(connection)
+
+# Données des graphiques de ventes (analyse_ventes) : [(libellé, chiffre d'affaires), ...]
+def load_sales_by_type(connection):
+    return [(row['type_produit'], row['chiffre_affaires']) for row in analyse_ventes.revenue_by_type(connection)]
+
+def load_top_clients_revenue(connection):
+    return [(row['nom'], row['chiffre_affaires']) for row in analyse_ventes.top_clients(SALES_TOP, connection)]
+
+def load_top_products_revenue(connection):
+    return [(row['nom'], row['chiffre_affaires']) for row in analyse_ventes.top_products(SALES_TOP, connection)]
+
+
+PRODUCT_TABLES = ('produits',)
+STOCK_TABLES = ('produits', 'produits_stock')  # Compteur du stock à part (migration 12)
+SALES_TABLES = ('commandes', 'produits', 'clients')
+
+# nom -> (lecture des données, fonction de rendu exécutée dans le pool, tables lues)
+CHARTS = {
+    'product_share': (load_pie_chart, graphiques_rendu.render_pie_chart, PRODUCT_TABLES),
+    'category_bar_chart': (load_category_bar_chart, graphiques_rendu.render_category_bar_chart, STOCK_TABLES),
+    'price_histogram': (load_price_histogram, partial(graphiques_rendu.render_price_histogram, width=statistiques.PRICE_BUCKET), PRODUCT_TABLES),
+    'sales_by_type': (load_sales_by_type, partial(graphiques_rendu.render_ranking,
+                                                  title="Chiffre d'affaires par type de produit"), SALES_TABLES),
+    'top_clients_revenue': (load_top_clients_revenue, partial(graphiques_rendu.render_ranking,
+                                                              title="Meilleurs clients (chiffre d'affaires)"), SALES_TABLES),
+    'top_products_revenue': (load_top_products_revenue, partial(graphiques_rendu.render_ranking,
+                                                                title="Produits les plus vendus (chiffre d'affaires)"), SALES_TABLES),
+}
+
+
+def chart_version(name, connection=None):
+    # Somme des versions des tables lues par le graphique : elle croît à chaque écriture
+    # dans l'une d'elles (versions incrémentées par trigger), comme une version unique
+    tables = CHARTS[name][2]
+    connection = connection or get_connection()
+    row = connection.execute(
+        f"SELECT COALESCE(SUM(version), 0) FROM table_versions WHERE name IN ({', '.join('?' * len(tables))})",
+        tables).fetchone()
+    return row[0]
+
+
+#--------------------Cache des images--------------------#
+
+def _relay(rendering, future):
+    # Recopie l'issue d'un rendu (pool de processus) dans le future publié par ChartCache
+    if rendering.cancelled():
+        future.cancel()
+    elif rendering.exception() is not None:
+        future.set_exception(rendering.exception())
+    else:
+        future.set_result(rendering.result())
+
+
+class ChartCache:
+    def __init__(self, workers=RENDER_WORKERS):
+        self._workers = workers
+        self._executor = None  # Créé au premier rendu
+        self._entries = {}  # nom -> (version, png)
+        self._pending = {}  # nom -> (version, future) : au plus un rendu en cours par graphique
+        self._lock = threading.Lock()  # Jamais tenu pendant une lecture SQL ni un rendu
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # 'spawn' : pas de fork d'un processus multi-threadé (verrous hérités)
+                self._executor = ProcessPoolExecutor(max_workers=self._workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def _start(self, name, version, future, connection):
+        # Lit les données et lance le rendu, hors de self._lock : `future`, déjà publié dans
+        # self._pending (les autres demandes du même graphique l'attendent), en reçoit l'issue
+        future.add_done_callback(lambda f: self._store(name, version, f))
+        load, render, _ = CHARTS[name]
+        try:
+            rendering = self._get_executor().submit(render, load(connection))
+        except Exception as error:
+            future.set_exception(error)  # Lecture en erreur, pool cassé ou arrêté
+            return
+        rendering.add_done_callback(lambda f: _relay(f, future))
+
+    def _store(self, name, version, future):
+        # Appelé quand un rendu se termine : garde l'image si elle est plus récente
+        if future.cancelled():
+            return  # Pool arrêté (shutdown) avant le rendu
+        error = future.exception()
+        if error is not None:
+            if isinstance(error, BrokenProcessPool):
+                with self._lock:
+                    self._executor = None  # Un processus est mort : le pool sera recréé au prochain rendu
+            return  # On garde la dernière image valide
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry[0] < version:
+                self._entries[name] = (version, future.result())  # Remplacement atomique
+
+    def get(self, name, version=None):
+        # Retourne (version, png) : l'image à jour, ou la dernière image valide
+        # pendant qu'un nouveau rendu est en file. `version` : chart_version(name)
+        # si l'appelant l'a déjà lue
+        connection = get_connection()
+        if version is None:
+            version = chart_version(name, connection)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry and entry[0] >= version:
+                return entry
+            # Fusion des demandes : un seul rendu en cours par graphique
+            pending = self._pending.get(name)
+            start = pending is None or pending[1].done()
+            if start:
+                pending = self._pending[name] = (version, Future())
+        pending_version, future = pending
+        if start:
+            self._start(name, version, future, connection)
+        if entry:
+            return entry
+        # Aucune image encore : on attend le premier rendu
+        try:
+            png = future.result()
+        except BrokenProcessPool:
+            # Pool indisponible : rendu dans le thread de la requête (fonctions sans état partagé)
+            load, render, _ = CHARTS[name]
+            return version, render(load(connection))
+        with self._lock:
+            return self._entries.get(name) or (pending_version, png)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def shutdown(self):
+        # Les rendus encore en file sont annulés (_store les ignore)
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+chart_cache = ChartCache()
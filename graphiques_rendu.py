@@ -0,0 +1,75 @@
+import io
+
+#--------------------Rendu des graphiques (processus de rendu)--------------------#
+# Fonctions pures : données en entrée, PNG en sortie. Elles utilisent l'API objet
+# (Figure) et non l'état global de pyplot, et n'importent ni Flask ni la base,
+# pour rester légères à charger dans les processus du pool.
+# matplotlib (plusieurs centaines de ms) n'est importé qu'au premier rendu : importer
+# ce module, et donc l'application, ne le charge pas.
+
+
+def _figure(**kwargs):
+    from matplotlib.figure import Figure
+    return Figure(**kwargs)
+
+
+# Graphique circulaire : rows = [(type_produit, nombre), ...]
+def render_pie_chart(rows):
+    types = [row[0] for row in rows]
+    counts = [row[1] for row in rows]
+
+    figure = _figure(figsize=(8, 6))  # Taille du graphique
+    axes = figure.subplots()
+    axes.pie(counts, labels=types, autopct='%1.1f%%', startangle=90)
+    axes.axis('equal')  # Assurer que le graphique est un cercle
+    axes.set_title('Répartition des Produits par Type')
+    return _to_png(figure)
+
+# Graphique en barres : rows = [(stock, nombre de produits), ...]
+def render_category_bar_chart(rows):
+    categories = [row[0] for row in rows]
+    counts = [row[1] for row in rows]
+
+    figure = _figure()
+    axes = figure.subplots()
+    axes.bar(categories, counts)
+    axes.set_xlabel('Catégorie')
+    axes.set_ylabel('Nombre de Produits')
+    axes.set_title('Top 5 des Catégories par Nombre de Produits')
+    return _to_png(figure)
+
+# Histogramme : buckets = [(borne basse de la tranche, nombre de produits), ...], tranches de largeur `width`
+def render_price_histogram(buckets, width):
+    edges = [bucket[0] for bucket in buckets]
+    counts = [bucket[1] for bucket in buckets]
+
+    figure = _figure()
+    axes = figure.subplots()
+    axes.bar(edges, counts, width=width, align='edge')
+    axes.set_xlabel('Prix')
+    axes.set_ylabel('Fréquence')
+    axes.set_title('Répartition des Prix des Produits')
+    return _to_png(figure)
+
+# Barres horizontales triées : rows = [(libellé, valeur), ...], la plus grande valeur en haut
+def render_ranking(rows, title):
+    labels = [str(row[0]) for row in rows]
+    values = [row[1] for row in rows]
+
+    figure = _figure(figsize=(8, max(3, 0.45 * len(rows) + 1.5)))
+    axes = figure.subplots()
+    axes.barh(labels, values)
+    axes.invert_yaxis()
+    axes.set_xlabel("Chiffre d'affaires")
+    axes.set_title(title)
+    figure.tight_layout()
+    return _to_png(figure)
+
+
+def _to_png(figure):
+    # Chaque figure a son propre canevas Agg : aucun état partagé entre rendus
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    FigureCanvasAgg(figure)
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format='png', transparent=True)
+    return buffer.getvalue()
@@ -0,0 +1,236 @@
+import csv
+import io
+import json
+import re
+import time
+
+from werkzeug.datastructures import MultiDict
+
+from database import get_connection, transaction
+from forms import AddProductForm, AddClientForm, AddOrderForm
+from gestion_produit import MAX_IN_PARAMS, NOW, reserve_stock
+
+#--------------------Import en masse (CSV / JSON)--------------------#
+
+CHUNK_SIZE = 1000  # Lignes insérées par transaction (executemany)
+TARGET_ROWS_PER_SECOND = 10000  # Objectif de débit mesuré par benchmarks/bench_import.py
+
+ENTITIES = ('produits', 'clients', 'commandes')
+
+
+FORMS = {
+    'produits': AddProductForm,
+    'clients': AddClientForm,
+    'commandes': AddOrderForm,  # Client vérifié par lot, produit par la réservation de stock
+}
+
+
+#--------------------Lecture en flux--------------------#
+
+def iter_csv(stream):
+    # Produit (numéro de ligne, dictionnaire) pour chaque ligne d'un CSV avec en-tête
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def iter_ndjson(stream):
+    # Un objet JSON par ligne ; les lignes vides sont ignorées
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, e  # Ligne rejetée, la lecture continue
+
+
+# Délimiteur ou blanc : le jeton qui le précède est complet, la suite du fichier n'y changera rien
+_TOKEN_END = re.compile(r'[\s,:\[\]{}"]')
+
+
+def _truncated(error, buffer):
+    # Vrai si l'erreur peut venir d'un élément coupé à la fin du tampon : chaîne non fermée,
+    # ou jeton inachevé (tru, 1e+, \u12) sans délimiteur après lui
+    if error.msg.startswith('Unterminated string'):
+        return True
+    return not _TOKEN_END.search(buffer, error.pos + 1)
+
+
+def iter_json_array(stream, read_size=65536):
+    # Lit un tableau JSON élément par élément, sans charger tout le fichier
+    decoder = json.JSONDecoder()
+    buffer = stream.read(read_size).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError("Le fichier JSON doit contenir un tableau d'objets.")
+    buffer = buffer[1:]
+    index = 0
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        while not buffer:
+            chunk = stream.read(read_size)
+            if not chunk:
+                raise ValueError("Tableau JSON incomplet.")
+            buffer = chunk.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            obj, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError as e:
+            if not _truncated(e, buffer):
+                raise  # Erreur au milieu du tampon : inutile de lire le reste du fichier
+            chunk = stream.read(read_size)
+            if not chunk:
+                raise
+            buffer += chunk  # Élément coupé entre deux lectures : on complète le tampon
+            continue
+        index += 1
+        yield index, obj
+        buffer = buffer[end:]
+
+
+READERS = {
+    'csv': iter_csv,
+    'ndjson': iter_ndjson,
+    'jsonl': iter_ndjson,
+    'json': iter_json_array,
+}
+
+
+def detect_format(filename, default='csv'):
+    # Déduit le format de l'extension du fichier
+    extension = filename.rsplit('.', 1)[-1].lower() if filename and '.' in filename else default
+    return extension if extension in READERS else default
+
+
+#--------------------Validation--------------------#
+
+class RowValidator:
+    # Valide les lignes avec le formulaire de l'entité. Le formulaire est construit
+    # une seule fois puis réalimenté à chaque ligne : la liaison des champs coûte
+    # plus cher que la validation elle-même.
+    def __init__(self, entity):
+        self.entity = entity
+        self.form = FORMS[entity](formdata=None, meta={'csrf': False})
+
+    def validate(self, row):
+        # Retourne (valeurs à insérer, None) ou (None, erreurs par champ)
+        if isinstance(row, ValueError):
+            return None, {'ligne': [f"JSON invalide : {row}"]}
+        if not isinstance(row, dict):
+            return None, {'ligne': ["Objet attendu."]}
+        form = self.form
+        form.process(MultiDict((key, '' if value is None else str(value)) for key, value in row.items() if key))
+        if not form.validate():
+            return None, form.errors
+        if self.entity == 'produits':
+            return (form.nom.data, round(float(form.prix.data), 2), form.description.data,
+                    form.stock.data, form.type_produit.data), None
+        if self.entity == 'clients':
+            return (form.nom.data, form.email.data, form.adresse.data), None
+        return (form.client_id.data, form.produit_id.data, form.quantite.data), None
+
+
+#--------------------Insertion par paquets--------------------#
+
+def _insert_produits(connection, rows):
+    connection.executemany("""
+        INSERT INTO produits (nom, prix, description, stock, type_produit)
+        VALUES (?, ?, ?, ?, ?)
+    """, [values for _, values in rows])
+    return len(rows), []
+
+
+def _insert_clients(connection, rows):
+    connection.executemany("""
+        INSERT INTO clients (nom, email, adresse)
+        VALUES (?, ?, ?)
+    """, [values for _, values in rows])
+    return len(rows), []
+
+
+def _insert_commandes(connection, rows):
+    # Existence des clients en une requête, puis réservation du stock ligne par ligne
+    cursor = connection.cursor()
+    client_ids = sorted({values[0] for _, values in rows})
+    known_clients = set()
+    for start in range(0, len(client_ids), MAX_IN_PARAMS):
+        chunk = client_ids[start:start + MAX_IN_PARAMS]
+        cursor.execute(f"SELECT id FROM clients WHERE id IN ({', '.join('?' * len(chunk))})", chunk)
+        known_clients.update(row[0] for row in cursor.fetchall())
+    accepted, rejected = [], []
+    for line_number, (client_id, produit_id, quantite) in rows:
+        if client_id not in known_clients:
+            rejected.append((line_number, {'client_id': ["Le client sélectionné n'existe pas."]}))
+            continue
+        try:
+            reserve_stock(cursor, produit_id, quantite)
+        except ValueError as e:
+            rejected.append((line_number, {'produit_id': [str(e)]}))
+            continue
+        accepted.append((client_id, produit_id, quantite))
+    cursor.executemany(f"""
+        INSERT INTO commandes (client_id, produit_id, quantite, created_at)
+        VALUES (?, ?, ?, {NOW})
+    """, accepted)
+    return len(accepted), rejected
+
+
+INSERTERS = {
+    'produits': _insert_produits,
+    'clients': _insert_clients,
+    'commandes': _insert_commandes,
+}
+
+
+def import_stream(entity, stream, fmt='csv', chunk_size=CHUNK_SIZE):
+    # Importe un flux texte ; retourne un rapport (insérées, rejetées avec numéro de ligne, débit)
+    if entity not in ENTITIES:
+        raise ValueError(f"Entité inconnue : {entity}")
+    insert = INSERTERS[entity]
+    validator = RowValidator(entity)
+    connection = get_connection()
+    report = {'entite': entity, 'format': fmt, 'lues': 0, 'inserees': 0, 'rejetees': []}
+    start = time.perf_counter()
+
+    def flush(rows):
+        with transaction(connection):
+            inserted, rejected = insert(connection, rows)
+        report['inserees'] += inserted
+        report['rejetees'].extend({'ligne': line, 'erreurs': errors} for line, errors in rejected)
+
+    pending = []
+    try:
+        for line_number, row in READERS[fmt](stream):
+            report['lues'] += 1
+            values, errors = validator.validate(row)
+            if errors:
+                report['rejetees'].append({'ligne': line_number, 'erreurs': errors})
+                continue
+            pending.append((line_number, values))
+            if len(pending) >= chunk_size:
+                flush(pending)
+                pending = []
+    except (ValueError, csv.Error) as e:
+        report['erreur'] = f"Lecture interrompue après {report['lues']} ligne(s) : {e}"
+    if pending:
+        flush(pending)
+
+    report['rejetees'].sort(key=lambda rejected: rejected['ligne'])
+    duration = time.perf_counter() - start
+    report['duree_s'] = round(duration, 3)
+    report['lignes_par_seconde'] = round(report['lues'] / duration) if duration else None
+    return report
+
+
+def import_file(entity, path, fmt=None, chunk_size=CHUNK_SIZE):
+    # Variante fichier de import_stream (commande CLI)
+    fmt = fmt or detect_format(path)
+    with open(path, encoding='utf-8-sig', newline='') as stream:
+        return import_stream(entity, stream, fmt, chunk_size)
+
+
+def open_upload(file_storage):
+    # Enveloppe un fichier envoyé (binaire) en flux texte sans le charger en mémoire
+    return io.TextIOWrapper(file_storage.stream, encoding='utf-8-sig', newline='')
@@ -0,0 +1,149 @@
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+
+from flask import g, request, session
+
+#--------------------Journal des actions (JSON lines)--------------------#
+# Les requêtes ne font que déposer l'enregistrement dans une file en mémoire ;
+# un thread d'écriture (QueueListener) le formate en JSON, l'écrit sur disque,
+# fait tourner le fichier et compresse les anciens en gzip. Si la file est pleine
+# (disque lent), l'enregistrement est abandonné et compté : la requête n'attend jamais.
+
+LOG_FILE = 'user_actions.log'
+MAX_BYTES = 10 * 1024 * 1024  # Rotation par taille (10 Mio), si LOG_ROTATE_WHEN n'est pas défini
+ROTATE_WHEN = None  # Rotation par durée : 'midnight', 'H', ... (voir TimedRotatingFileHandler)
+BACKUP_COUNT = 10  # Nombre d'anciens fichiers compressés conservés
+QUEUE_SIZE = 10000  # Enregistrements en attente d'écriture au maximum
+
+logger = logging.getLogger('user_actions')
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    # Une ligne JSON par enregistrement ; les champs structurés sont passés par extra={'fields': {...}}
+    def format(self, record):
+        data = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'message': record.getMessage(),
+        }
+        data.update(getattr(record, 'fields', {}))
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    # File bornée et jamais bloquante : un enregistrement qui ne tient pas est abandonné
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class FlushingQueueListener(QueueListener):
+    # À l'arrêt, attend une place dans la file pleine plutôt que d'échouer : tout est écrit avant de quitter
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+def _gzip_namer(name):
+    return name + '.gz'
+
+
+def _gzip_rotator(source, dest):
+    # Exécuté dans le thread d'écriture, pas dans celui de la requête
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def _file_handler(path, max_bytes, when, backup_count):
+    if when:
+        handler = TimedRotatingFileHandler(path, when=when, backupCount=backup_count, encoding='utf-8', utc=True)
+    else:
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    handler.namer = _gzip_namer
+    handler.rotator = _gzip_rotator
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+
+def setup(path=LOG_FILE, max_bytes=MAX_BYTES, when=ROTATE_WHEN, backup_count=BACKUP_COUNT, queue_size=QUEUE_SIZE):
+    # Branche le logger 'user_actions' sur la file et démarre le thread d'écriture (une fois par processus)
+    global _listener
+    if _listener is not None:
+        return
+    log_queue = queue.Queue(queue_size)
+    _listener = FlushingQueueListener(log_queue, _file_handler(path, max_bytes, when, backup_count))
+    _listener.start()
+    logger.addHandler(DroppingQueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False  # Les logs de werkzeug restent sur la console, hors du fichier
+    atexit.register(shutdown)
+
+
+def shutdown():
+    # Vide la file puis arrête le thread d'écriture
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+
+
+def dropped():
+    # Nombre d'enregistrements abandonnés faute de place dans la file
+    return sum(getattr(handler, 'dropped', 0) for handler in logger.handlers)
+
+
+def current_user_id():
+    user = session.get('user')
+    return user['username'] if user else request.cookies.get('user_id')
+
+
+def log_event(event, message, **fields):
+    logger.info(message, extra={'fields': {'event': event, **fields}})
+
+
+#--------------------Journal des requêtes--------------------#
+
+def _start_timer():
+    g.request_start = time.perf_counter()
+
+
+def _log_request(response):
+    start = g.pop('request_start', None)
+    if start is None or request.endpoint == 'static':
+        return response
+    log_event('request', f"{request.method} {request.path} {response.status_code}",
+              user_id=current_user_id(),
+              method=request.method,
+              route=request.url_rule.rule if request.url_rule else None,
+              path=request.path,
+              status=response.status_code,
+              duration_ms=round((time.perf_counter() - start) * 1000, 3))
+    return response
+
+
+def init_app(app):
+    setup(path=app.config.get('LOG_FILE', LOG_FILE),
+          max_bytes=app.config.get('LOG_MAX_BYTES', MAX_BYTES),
+          when=app.config.get('LOG_ROTATE_WHEN', ROTATE_WHEN),
+          backup_count=app.config.get('LOG_BACKUP_COUNT', BACKUP_COUNT),
+          queue_size=app.config.get('LOG_QUEUE_SIZE', QUEUE_SIZE))
+    app.before_request(_start_timer)
+    app.after_request(_log_request)
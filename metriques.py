@@ -0,0 +1,159 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+
+from flask import Response, current_app, g, request
+
+import database
+
+#--------------------Métriques des routes (format texte Prometheus)--------------------#
+# Pour chaque endpoint Flask : nombre de requêtes par méthode et statut, histogramme
+# des durées (p50/p95/p99 estimés à partir des tranches) et, via l'instrumentation
+# de database.py, nombre de requêtes SQL, lignes lues et temps passé en base.
+# Les compteurs sont propres à chaque processus.
+
+# Bornes hautes des tranches de l'histogramme des durées, en secondes
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Dernière case : au-delà de la plus grande borne
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += 1
+        self.sum += value
+
+    def quantile(self, q):
+        # Interpolation linéaire dans la tranche qui contient le rang voulu (comme histogram_quantile)
+        if not self.total:
+            return None
+        rank = q * self.total
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]  # Au-delà de la dernière borne : on ne peut pas faire mieux
+                low = self.buckets[i - 1] if i else 0.0
+                return low + (self.buckets[i] - low) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self.latency = Histogram()
+        self.requests = defaultdict(int)  # (méthode, statut) -> nombre
+        self.db_queries = 0
+        self.db_rows = 0
+        self.db_seconds = 0.0
+
+
+class Registry:
+    def __init__(self):
+        self._endpoints = defaultdict(EndpointMetrics)
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, method, status, duration, query_stats):
+        with self._lock:
+            metrics = self._endpoints[endpoint]
+            metrics.latency.observe(duration)
+            metrics.requests[(method, status)] += 1
+            if query_stats is not None:
+                metrics.db_queries += query_stats.queries
+                metrics.db_rows += query_stats.rows
+                metrics.db_seconds += query_stats.duration
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+    def render(self):
+        # Exposition au format texte Prometheus 0.0.4
+        lines = []
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+
+            lines += ["# HELP app_requests_total Requêtes HTTP traitées.",
+                      "# TYPE app_requests_total counter"]
+            for endpoint, metrics in endpoints:
+                for (method, status), count in sorted(metrics.requests.items()):
+                    lines.append(f'app_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}')
+
+            lines += ["# HELP app_request_duration_seconds Durée de traitement des requêtes.",
+                      "# TYPE app_request_duration_seconds histogram"]
+            for endpoint, metrics in endpoints:
+                histogram, cumulative = metrics.latency, 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'app_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+                lines.append(f'app_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {histogram.total}')
+                lines.append(f'app_request_duration_seconds_sum{{endpoint="{endpoint}"}} {histogram.sum:.6f}')
+                lines.append(f'app_request_duration_seconds_count{{endpoint="{endpoint}"}} {histogram.total}')
+
+            lines += ["# HELP app_request_duration_quantile_seconds Quantiles estimés à partir de l'histogramme.",
+                      "# TYPE app_request_duration_quantile_seconds gauge"]
+            for endpoint, metrics in endpoints:
+                for q in QUANTILES:
+                    lines.append(f'app_request_duration_quantile_seconds{{endpoint="{endpoint}",quantile="{q}"}} '
+                                 f'{metrics.latency.quantile(q):.6f}')
+
+            for name, attribute, kind, help_text in (
+                    ('app_db_queries_total', 'db_queries', 'counter', "Requêtes SQL exécutées."),
+                    ('app_db_rows_fetched_total', 'db_rows', 'counter', "Lignes lues en base."),
+                    ('app_db_duration_seconds_total', 'db_seconds', 'counter', "Temps passé dans SQLite.")):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                for endpoint, metrics in endpoints:
+                    value = getattr(metrics, attribute)
+                    lines.append(f'{name}{{endpoint="{endpoint}"}} {value:.6f}' if isinstance(value, float)
+                                 else f'{name}{{endpoint="{endpoint}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+#--------------------Intégration Flask--------------------#
+
+def _before_request():
+    g.metrics_start = time.perf_counter()
+    # SERVER_TIMING : en-tête Server-Timing sur toutes les réponses ; sinon seulement avec ?server_timing=1
+    g.server_timing = current_app.config.get('SERVER_TIMING', False) or request.args.get('server_timing') == '1'
+    database.start_query_stats()
+
+
+def _after_request(response):
+    start = g.pop('metrics_start', None)
+    query_stats = database.stop_query_stats()
+    if start is None:
+        return response
+    duration = time.perf_counter() - start
+    registry.observe(request.endpoint or 'inconnu', request.method, response.status_code, duration, query_stats)
+    if g.get('server_timing', False) and query_stats is not None:
+        # Visible dans l'onglet réseau du navigateur
+        response.headers.add('Server-Timing',
+                             f'db;dur={query_stats.duration * 1000:.3f};desc="{query_stats.queries} queries, {query_stats.rows} rows", '
+                             f'app;dur={duration * 1000:.3f}')
+    return response
+
+
+def _teardown_request(exception=None):
+    # Une requête terminée par une exception ne passe pas par after_request
+    database.stop_query_stats()
+
+
+def metrics():
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule('/metrics', 'metrics', metrics)
@@ -0,0 +1,404 @@
+from collections import namedtuple
+
+import archivage
+import statistiques
+from database import get_connection, rollback_only, start_query_stats, stop_query_stats
+from gestion_produit import Client, Commande, EnteteCommande, Produit, name_suggestions
+from statistiques import PRICE_BUCKET, SUMMARIES
+
+#--------------------Migrations du schéma--------------------#
+
+
+def _summary_triggers(table, summary, key, expression, watched, counters):
+    # Triggers qui maintiennent une table de synthèse à partir de `table`.
+    # expression : clé calculée à partir de la ligne ({} = NEW ou OLD)
+    # counters : colonnes de la synthèse -> valeur ajoutée par ligne ({} = NEW ou OLD)
+    new_key, old_key = expression.format('NEW'), expression.format('OLD')
+    columns = ", ".join(counters)
+    add = (f"INSERT INTO {summary} ({key}, {columns}) "
+           f"VALUES ({new_key}, {', '.join(value.format('NEW') for value in counters.values())}) "
+           f"ON CONFLICT({key}) DO UPDATE SET "
+           + ", ".join(f"{column} = {column} + excluded.{column}" for column in counters) + ";")
+    remove = (f"UPDATE {summary} SET "
+              + ", ".join(f"{column} = {column} - {value.format('OLD')}" for column, value in counters.items())
+              + f" WHERE {key} = {old_key};"
+              f" DELETE FROM {summary} WHERE {key} = {old_key} AND {next(iter(counters))} <= 0;")
+    changed = " OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in watched)
+    name = f"trg_{summary}"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {name}_insert AFTER INSERT ON {table} BEGIN {add} END",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_delete AFTER DELETE ON {table} BEGIN {remove} END",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_update AFTER UPDATE OF {', '.join(watched)} ON {table} "
+        f"WHEN {changed} BEGIN {remove} {add} END",
+    ]
+
+
+# Chaque migration est une liste d'instructions SQL ; sa position dans la liste
+# donne son numéro de version, enregistré dans PRAGMA user_version.
+MIGRATIONS = [
+    # 1 : tables de base (identiques aux anciennes méthodes create_table_*)
+    [
+        """
+        CREATE TABLE IF NOT EXISTS produits (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nom TEXT NOT NULL,
+            prix REAL NOT NULL,
+            description TEXT NOT NULL,
+            stock INTEGER NOT NULL,
+            type_produit TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS clients (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nom TEXT NOT NULL,
+            email TEXT NOT NULL,
+            adresse TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS commandes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            client_id INTEGER NOT NULL,
+            produit_id INTEGER NOT NULL,
+            quantite INTEGER NOT NULL,
+            FOREIGN KEY (client_id) REFERENCES clients (id),
+            FOREIGN KEY (produit_id) REFERENCES produits (id)
+        )
+        """,
+    ],
+    # 2 : index secondaires pour les filtres, GROUP BY et jointures
+    [
+        "CREATE INDEX IF NOT EXISTS idx_produits_type ON produits (type_produit)",
+        "CREATE INDEX IF NOT EXISTS idx_produits_stock ON produits (stock)",
+        "CREATE INDEX IF NOT EXISTS idx_produits_prix ON produits (prix)",
+        "CREATE INDEX IF NOT EXISTS idx_commandes_client ON commandes (client_id)",
+        "CREATE INDEX IF NOT EXISTS idx_commandes_produit ON commandes (produit_id)",
+    ],
+    # 3 : compteur de modifications par table, incrémenté par trigger à chaque écriture
+    # (visible par tous les processus, contrairement à un compteur en mémoire)
+    [
+        """
+        CREATE TABLE IF NOT EXISTS table_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "INSERT OR IGNORE INTO table_versions (name) VALUES ('produits'), ('clients'), ('commandes')",
+    ] + [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_version AFTER {event} ON {table}
+        BEGIN
+            UPDATE table_versions SET version = version + 1 WHERE name = '{table}';
+        END
+        """
+        for table in ('produits', 'clients', 'commandes')
+        for event in ('INSERT', 'UPDATE', 'DELETE')
+    ],
+    # 4 : tables de synthèse pour les graphiques et l'analyse, tenues à jour par triggers
+    [
+        "CREATE TABLE IF NOT EXISTS stats_produits_type (type_produit TEXT PRIMARY KEY, nb INTEGER NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS stats_produits_stock (stock INTEGER PRIMARY KEY, nb INTEGER NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS stats_produits_prix (tranche INTEGER PRIMARY KEY, nb INTEGER NOT NULL)",
+        """
+        CREATE TABLE IF NOT EXISTS stats_commandes_client (
+            client_id INTEGER PRIMARY KEY, nb_commandes INTEGER NOT NULL, quantite INTEGER NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS stats_commandes_produit (
+            produit_id INTEGER PRIMARY KEY, nb_commandes INTEGER NOT NULL, quantite INTEGER NOT NULL
+        )
+        """,
+    ]
+    + _summary_triggers('produits', 'stats_produits_type', 'type_produit', '{}.type_produit', ['type_produit'], {'nb': '1'})
+    + _summary_triggers('produits', 'stats_produits_stock', 'stock', '{}.stock', ['stock'], {'nb': '1'})
+    + _summary_triggers('produits', 'stats_produits_prix', 'tranche', f'CAST({{}}.prix / {PRICE_BUCKET} AS INTEGER)',
+                        ['prix'], {'nb': '1'})
+    + _summary_triggers('commandes', 'stats_commandes_client', 'client_id', '{}.client_id', ['client_id', 'quantite'],
+                        {'nb_commandes': '1', 'quantite': '{}.quantite'})
+    + _summary_triggers('commandes', 'stats_commandes_produit', 'produit_id', '{}.produit_id', ['produit_id', 'quantite'],
+                        {'nb_commandes': '1', 'quantite': '{}.quantite'})
+    + [f"INSERT INTO {summary} {query}" for summary, (_, query) in SUMMARIES.items()],
+    # 5 : recherche plein texte sur le nom et la description des produits (FTS5, contenu externe :
+    # le texte n'est pas dupliqué, l'index est tenu à jour par triggers)
+    [
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS produits_fts USING fts5(
+            nom, description,
+            content='produits', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+        """,
+        # Classement BM25 utilisé par ORDER BY rank : le nom pèse plus que la description
+        "INSERT INTO produits_fts (produits_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0)')",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_produits_fts_insert AFTER INSERT ON produits BEGIN
+            INSERT INTO produits_fts (rowid, nom, description) VALUES (NEW.id, NEW.nom, NEW.description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_produits_fts_delete AFTER DELETE ON produits BEGIN
+            INSERT INTO produits_fts (produits_fts, rowid, nom, description) VALUES ('delete', OLD.id, OLD.nom, OLD.description);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_produits_fts_update AFTER UPDATE OF nom, description ON produits
+        WHEN OLD.nom IS NOT NEW.nom OR OLD.description IS NOT NEW.description BEGIN
+            INSERT INTO produits_fts (produits_fts, rowid, nom, description) VALUES ('delete', OLD.id, OLD.nom, OLD.description);
+            INSERT INTO produits_fts (rowid, nom, description) VALUES (NEW.id, NEW.nom, NEW.description);
+        END
+        """,
+        "INSERT INTO produits_fts (produits_fts) VALUES ('rebuild')",
+    ],
+    # 6 : date de la dernière modification de chaque table (secondes Unix), tenue par les mêmes
+    # triggers que le compteur : en-tête Last-Modified des pages en cache HTTP
+    [
+        "ALTER TABLE table_versions ADD COLUMN modified_at INTEGER NOT NULL DEFAULT 0",
+        "UPDATE table_versions SET modified_at = CAST(strftime('%s', 'now') AS INTEGER)",
+    ] + [
+        f"DROP TRIGGER IF EXISTS trg_{table}_{event.lower()}_version"
+        for table in ('produits', 'clients', 'commandes')
+        for event in ('INSERT', 'UPDATE', 'DELETE')
+    ] + [
+        f"""
+        CREATE TRIGGER trg_{table}_{event.lower()}_version AFTER {event} ON {table}
+        BEGIN
+            UPDATE table_versions SET version = version + 1, modified_at = CAST(strftime('%s', 'now') AS INTEGER)
+            WHERE name = '{table}';
+        END
+        """
+        for table in ('produits', 'clients', 'commandes')
+        for event in ('INSERT', 'UPDATE', 'DELETE')
+    ],
+    # 7 : recherche par début de nom (suggestions des formulaires de commande) : nom LIKE 'pré%'
+    # insensible à la casse devient un parcours d'intervalle de ces index, déjà trié par nom
+    [
+        "CREATE INDEX IF NOT EXISTS idx_clients_nom ON clients (nom COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_produits_nom ON produits (nom COLLATE NOCASE)",
+    ],
+    # 8 : commandes de plusieurs lignes : un en-tête par commande passée, chaque ligne de
+    # `commandes` (un produit, une quantité) y est rattachée ; les commandes d'une seule ligne
+    # déjà présentes n'ont pas d'en-tête. Un en-tête sans ligne restante est supprimé.
+    [
+        """
+        CREATE TABLE IF NOT EXISTS entetes_commande (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            client_id INTEGER NOT NULL,
+            FOREIGN KEY (client_id) REFERENCES clients (id)
+        )
+        """,
+        "ALTER TABLE commandes ADD COLUMN entete_id INTEGER REFERENCES entetes_commande (id)",
+        "CREATE INDEX IF NOT EXISTS idx_commandes_entete ON commandes (entete_id)",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_commandes_entete_delete AFTER DELETE ON commandes
+        WHEN OLD.entete_id IS NOT NULL BEGIN
+            DELETE FROM entetes_commande WHERE id = OLD.entete_id
+            AND NOT EXISTS (SELECT 1 FROM commandes WHERE entete_id = OLD.entete_id);
+        END
+        """,
+    ],
+    # 9 : journal des commandes modifiées ou supprimées, pour l'analyse des ventes qui garde les
+    # commandes en mémoire : elle relit ces lignes seulement (les nouvelles se repèrent à l'id).
+    # Le journal ne garde que les 10 000 dernières entrées ; un lecteur plus en retard recharge tout.
+    [
+        """
+        CREATE TABLE IF NOT EXISTS commandes_journal (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            commande_id INTEGER NOT NULL
+        )
+        """,
+    ] + [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_commandes_journal_{event.lower()} AFTER {event} ON commandes BEGIN
+            INSERT INTO commandes_journal (commande_id) VALUES (OLD.id);
+        END
+        """
+        for event in ('UPDATE', 'DELETE')
+    ] + [
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_commandes_journal_purge AFTER INSERT ON commandes_journal BEGIN
+            DELETE FROM commandes_journal WHERE seq <= NEW.seq - 10000;
+        END
+        """,
+    ],
+    # 10 : date de création des commandes (secondes Unix), pour les filtres par période et
+    # l'archivage (archivage.py). ALTER TABLE n'accepte pas de défaut calculé : les insertions
+    # de l'application donnent la date, un trigger la pose pour les autres. Les commandes déjà
+    # présentes prennent la date de la migration. Le journal ne note plus que les changements
+    # lus par l'analyse des ventes (client, produit, quantité).
+    [
+        "ALTER TABLE commandes ADD COLUMN created_at INTEGER",
+        "DROP TRIGGER IF EXISTS trg_commandes_journal_update",
+        """
+        CREATE TRIGGER trg_commandes_journal_update AFTER UPDATE OF client_id, produit_id, quantite ON commandes BEGIN
+            INSERT INTO commandes_journal (commande_id) VALUES (OLD.id);
+        END
+        """,
+        "UPDATE commandes SET created_at = CAST(strftime('%s', 'now') AS INTEGER)",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_commandes_created_at AFTER INSERT ON commandes
+        WHEN NEW.created_at IS NULL BEGIN
+            UPDATE commandes SET created_at = CAST(strftime('%s', 'now') AS INTEGER) WHERE id = NEW.id;
+        END
+        """,
+        # Période seule (archivage, dans l'ordre de création) ou période puis id (pages de /commandes)
+        "CREATE INDEX IF NOT EXISTS idx_commandes_created_at ON commandes (created_at, id)",
+    ],
+    # 11 : une commande de plusieurs lignes n'a qu'un client : changer le client d'une de ses
+    # lignes (formulaire, API) le change pour l'en-tête et pour toutes ses autres lignes
+    [
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_commandes_entete_client AFTER UPDATE OF client_id ON commandes
+        WHEN NEW.entete_id IS NOT NULL AND NEW.client_id IS NOT OLD.client_id BEGIN
+            UPDATE entetes_commande SET client_id = NEW.client_id WHERE id = NEW.entete_id;
+            UPDATE commandes SET client_id = NEW.client_id
+            WHERE entete_id = NEW.entete_id AND client_id IS NOT NEW.client_id;
+        END
+        """,
+    ],
+    # 12 : le stock a son propre compteur (produits_stock) : une commande, qui ne modifie que le
+    # stock, ne périme plus ce qui n'affiche pas le stock (tableau de bord, analyse des ventes,
+    # graphiques des types et des prix). Les pages qui l'affichent lisent les deux compteurs.
+    [
+        "INSERT OR IGNORE INTO table_versions (name, modified_at) "
+        "VALUES ('produits_stock', CAST(strftime('%s', 'now') AS INTEGER))",
+        "DROP TRIGGER IF EXISTS trg_produits_update_version",
+        """
+        CREATE TRIGGER trg_produits_update_version AFTER UPDATE OF nom, prix, description, type_produit ON produits
+        BEGIN
+            UPDATE table_versions SET version = version + 1, modified_at = CAST(strftime('%s', 'now') AS INTEGER)
+            WHERE name = 'produits';
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_produits_stock_version AFTER UPDATE OF stock ON produits
+        BEGIN
+            UPDATE table_versions SET version = version + 1, modified_at = CAST(strftime('%s', 'now') AS INTEGER)
+            WHERE name = 'produits_stock';
+        END
+        """,
+    ],
+]
+
+
+def schema_version(connection=None):
+    # Retourne la version actuelle du schéma
+    connection = connection or get_connection()
+    return connection.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(connection=None):
+    # Applique les migrations manquantes, chacune dans sa propre transaction
+    connection = connection or get_connection()
+    applied = []
+    for version, statements in enumerate(MIGRATIONS, start=1):
+        if schema_version(connection) >= version:
+            continue
+        connection.execute("BEGIN IMMEDIATE")  # Verrou d'écriture : un seul processus migre à la fois
+        try:
+            # Relecture sous verrou : un autre processus a pu migrer entre-temps
+            if schema_version(connection) >= version:
+                connection.rollback()
+                continue
+            for statement in statements:
+                connection.execute(statement)
+            connection.execute(f"PRAGMA user_version = {version}")
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        applied.append(version)
+    if applied:
+        connection.execute("ANALYZE")  # Met à jour les statistiques utilisées par le planificateur
+        connection.commit()
+    return applied
+
+
+#--------------------Vérification des plans de requêtes--------------------#
+
+# Chemins de lecture et d'écriture des routes : (route, appel, balayage accepté). Chaque appel
+# passe par le même code que la route (gestion_produit, statistiques, archivage) et les
+# requêtes réellement exécutées sont relevées (start_query_stats(trace=True)) : la liste ne
+# peut pas s'écarter du SQL des routes. Les écritures sont annulées (rollback_only).
+# Un balayage est accepté seulement quand il est borné (LIMIT sur la clé primaire, table de synthèse).
+PAGE = 51  # page_size par défaut + 1
+QUERY_PLANS = [
+    ('/dashboard', lambda ids: Produit().get_first_products(5), True),
+    ('/list', lambda ids: Produit().get_products(limit=PAGE), True),
+    ('/list?after', lambda ids: Produit().get_products(after_id=ids.produit, limit=PAGE), False),
+    ('/list?type_produit', lambda ids: Produit().get_products(limit=PAGE, type_produit='Boissons'), False),
+    ('/list?type_produit&after', lambda ids: Produit().get_products(ids.produit, PAGE, 'Boissons'), False),
+    ('/list?q', lambda ids: Produit().search_products('pom', offset=PAGE - 1, limit=PAGE), False),
+    ('/list?q&type_produit', lambda ids: Produit().search_products('pom', 'Boissons', offset=PAGE - 1, limit=PAGE), False),
+    ('/update/<id>', lambda ids: Produit().get_product_by_id(ids.produit), False),
+    ('/list_clients', lambda ids: Client().get_clients(limit=PAGE), True),
+    ('/list_clients?after', lambda ids: Client().get_clients(after_id=ids.client, limit=PAGE), False),
+    ('/edit_client/<id>', lambda ids: Client().get_client_by_id(ids.client), False),
+    ('/commandes', lambda ids: Commande().get_commandes_with_details(limit=PAGE), True),
+    ('/commandes', lambda ids: (Client().has_clients(), Produit().has_products()), True),
+    ('/commandes?after', lambda ids: Commande().get_commandes_with_details(after_id=ids.commande, limit=PAGE), False),
+    ('/commandes?du&au', lambda ids: Commande().get_commandes_with_details(limit=PAGE, start=0, end=86400), False),
+    ('/commandes?du&au&after', lambda ids: Commande().get_commandes_with_details(ids.commande, PAGE, 0, 86400, 0), False),
+    ('/add_order', lambda ids: EnteteCommande(ids.client, [(ids.produit, 1)]).add_commande(), False),
+    ('/edit_order/<id>', lambda ids: Commande().get_order_by_id(ids.commande), False),
+    ('/edit_order/<id>', lambda ids: Commande(ids.client, ids.produit, 1).update_commande(ids.commande), False),
+    ('/delete_order/<id>', lambda ids: Commande().delete_commande(ids.commande), False),
+    ('/api/v1/clients/suggestions', lambda ids: name_suggestions('clients', 'dup', 10), False),
+    ('/api/v1/produits/suggestions', lambda ids: name_suggestions('produits', 'pom', 10), False),
+    ('archive-orders', lambda ids: get_connection().execute(archivage.BATCH, (0, archivage.BATCH_SIZE)).fetchall(), False),
+    # Tables de synthèse : une ligne par catégorie, le balayage est borné par leur taille
+    ('/graph', lambda ids: statistiques.products_by_type(), True),
+    ('/graph', lambda ids: statistiques.top_stock_levels(3), True),
+    ('/graph', lambda ids: statistiques.price_buckets(), True),
+]
+
+SampleIds = namedtuple('SampleIds', "commande, client, produit")
+
+
+def _sample_ids(connection):
+    # Enregistrements existants sur lesquels exécuter les chemins d'écriture (1 si la table est
+    # vide : l'appel s'arrête sur ValueError, les requêtes exécutées jusque-là sont vérifiées)
+    row = connection.execute("""
+        SELECT (SELECT MIN(id) FROM commandes), (SELECT MIN(id) FROM clients),
+               (SELECT MIN(id) FROM produits WHERE stock > 0)
+    """).fetchone()
+    return SampleIds(*(value or 1 for value in row))
+
+
+def traced_queries(call, ids):
+    # Requêtes de lecture et d'écriture exécutées par `call`, dans l'ordre, sans doublons
+    start_query_stats(trace=True)
+    try:
+        with rollback_only():
+            call(ids)
+    except ValueError:
+        pass  # Commande ou stock absent de la base vérifiée
+    finally:
+        stats = stop_query_stats()
+    queries = {}
+    for sql, params in stats.executed:
+        if sql.split(None, 1)[0].upper() in ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH'):
+            queries.setdefault(sql, params)
+    return queries.items()
+
+
+def explain(sql, params=(), connection=None):
+    # Retourne les lignes de EXPLAIN QUERY PLAN d'une requête
+    connection = connection or get_connection()
+    return [row[3] for row in connection.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def check_query_plans():
+    # Vérifie que chaque requête des routes passe par un index
+    connection = get_connection()
+    ids = _sample_ids(connection)
+    results = []
+    for route, call, bounded in QUERY_PLANS:
+        for sql, params in traced_queries(call, ids):
+            sql = " ".join(sql.split())  # Une ligne par requête dans le rapport
+            plan = explain(sql, params, connection)
+            full_scans = [line for line in plan if line.startswith("SCAN") and "INDEX" not in line]
+            results.append((route, sql, plan, bounded or not full_scans))
+    return results
@@ -0,0 +1,99 @@
+from database import get_connection, transaction
+
+#--------------------Tables de synthèse--------------------#
+# Les tables stats_* sont tenues à jour par des triggers (migration 4) : lire un
+# agrégat coûte O(nombre de catégories) au lieu de O(nombre de lignes).
+
+PRICE_BUCKET = 5  # Largeur d'une tranche de l'histogramme des prix ($CAD)
+
+# Table de synthèse -> (colonne clé, requête de recalcul complet)
+SUMMARIES = {
+    'stats_produits_type': ('type_produit', """
+        SELECT type_produit, COUNT(*) FROM produits GROUP BY type_produit
+    """),
+    'stats_produits_stock': ('stock', """
+        SELECT stock, COUNT(*) FROM produits GROUP BY stock
+    """),
+    'stats_produits_prix': ('tranche', f"""
+        SELECT CAST(prix / {PRICE_BUCKET} AS INTEGER), COUNT(*) FROM produits GROUP BY 1
+    """),
+    'stats_commandes_client': ('client_id', """
+        SELECT client_id, COUNT(*), SUM(quantite) FROM commandes GROUP BY client_id
+    """),
+    'stats_commandes_produit': ('produit_id', """
+        SELECT produit_id, COUNT(*), SUM(quantite) FROM commandes GROUP BY produit_id
+    """),
+}
+
+
+def _read(connection, table):
+    key = SUMMARIES[table][0]
+    return {row[0]: tuple(row[1:]) for row in connection.execute(f"SELECT * FROM {table} ORDER BY {key}")}
+
+
+def _recompute(connection, table):
+    return {row[0]: tuple(row[1:]) for row in connection.execute(SUMMARIES[table][1])}
+
+
+def check_summaries(connection=None):
+    # Compare chaque table de synthèse à un recalcul complet ; retourne les écarts par table
+    connection = connection or get_connection()
+    differences = {}
+    for table in SUMMARIES:
+        stored, expected = _read(connection, table), _recompute(connection, table)
+        diff = [(key, stored.get(key), expected.get(key))
+                for key in sorted(set(stored) | set(expected), key=str)
+                if stored.get(key) != expected.get(key)]
+        if diff:
+            differences[table] = diff
+    return differences
+
+
+def rebuild_summaries(connection=None):
+    # Recalcule entièrement les tables de synthèse, dans une seule transaction
+    connection = connection or get_connection()
+    with transaction(connection):
+        for table, (_, query) in SUMMARIES.items():
+            connection.execute(f"DELETE FROM {table}")
+            connection.execute(f"INSERT INTO {table} {query}")
+
+
+#--------------------Lectures--------------------#
+
+def products_by_type(connection=None):
+    # [(type_produit, nombre de produits), ...]
+    connection = connection or get_connection()
+    return connection.execute("SELECT type_produit, nb FROM stats_produits_type ORDER BY type_produit").fetchall()
+
+
+def top_stock_levels(limit=3, connection=None):
+    # Niveaux de stock les plus fréquents : [(stock, nombre de produits), ...]
+    connection = connection or get_connection()
+    return connection.execute("SELECT stock, nb FROM stats_produits_stock ORDER BY nb DESC LIMIT ?", (limit,)).fetchall()
+
+
+def price_buckets(connection=None):
+    # Histogramme des prix : [(borne basse de la tranche, nombre de produits), ...]
+    connection = connection or get_connection()
+    return [(tranche * PRICE_BUCKET, nb) for tranche, nb in
+            connection.execute("SELECT tranche, nb FROM stats_produits_prix ORDER BY tranche")]
+
+
+def order_totals_by_client(limit=None, connection=None):
+    # [(client_id, nom, nombre de commandes, quantité totale), ...] par quantité décroissante
+    connection = connection or get_connection()
+    return connection.execute("""
+        SELECT s.client_id, cl.nom, s.nb_commandes, s.quantite
+        FROM stats_commandes_client s LEFT JOIN clients cl ON cl.id = s.client_id
+        ORDER BY s.quantite DESC LIMIT ?
+    """, (-1 if limit is None else limit,)).fetchall()
+
+
+def order_totals_by_product(limit=None, connection=None):
+    # [(produit_id, nom, nombre de commandes, quantité totale), ...] par quantité décroissante
+    connection = connection or get_connection()
+    return connection.execute("""
+        SELECT s.produit_id, p.nom, s.nb_commandes, s.quantite
+        FROM stats_commandes_produit s LEFT JOIN produits p ON p.id = s.produit_id
+        ORDER BY s.quantite DESC LIMIT ?
+    """, (-1 if limit is None else limit,)).fetchall()
@@ -0,0 +1,46 @@
+# Tests : python -m pytest -q tests (depuis la racine du dépôt)
+
+import os
+import shutil
+
+import jinja2
+import pytest
+
+import app as application
+import database
+import journalisation
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    # Application de test sur une copie de app_database.db : la base du dépôt n'est jamais modifiée
+    original = database.DATABASE
+    monkeypatch.chdir(tmp_path)  # Journal et fichiers de l'application hors du dépôt
+    path = tmp_path / 'app_database.db'
+    shutil.copy(os.path.join(ROOT, 'app_database.db'), path)
+    database.configure(str(path))
+    journalisation.shutdown()  # Le journal démarré par l'import de app.py écrirait dans le dépôt
+    flask_app = application.create_app({
+        'TESTING': True,
+        'WTF_CSRF_ENABLED': False,
+        'QUERY_BUDGET': 'raise',
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'LOG_FILE': str(tmp_path / 'user_actions.log'),
+    })
+    flask_app.jinja_loader = jinja2.FileSystemLoader(ROOT)  # Gabarits à la racine du dépôt
+    with flask_app.app_context():
+        application.init_db()
+    yield flask_app
+    journalisation.shutdown()
+    database.configure(original)  # Ferme les connexions ouvertes sur la copie
+
+
+@pytest.fixture
+def client(app):
+    # Client connecté (les pages demandent un utilisateur en session)
+    test_client = app.test_client()
+    with test_client.session_transaction() as session:
+        session['user'] = {'username': 'test'}
+    return test_client
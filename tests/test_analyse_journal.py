@@ -0,0 +1,51 @@
+import logging
+
+import pytest
+
+import analyse_journal
+import journalisation
+
+# Les fichiers tournés par les deux gestionnaires de journalisation.py (par taille, ou par
+# période avec LOG_ROTATE_WHEN) sont tous lus, du plus ancien au plus récent
+
+
+def _write(handler, first, count):
+    for number in range(first, first + count):
+        record = logging.LogRecord('user_actions', logging.INFO, __file__, 0, f"GET /list/{number} 200", None, None)
+        record.fields = {'event': 'request', 'method': 'GET', 'route': '/list', 'path': f'/list/{number}', 'status': 200}
+        handler.emit(record)
+
+
+@pytest.mark.parametrize('when', [None, 'S', 'H', 'MIDNIGHT'])
+def test_rotated_files_are_read(tmp_path, when):
+    path = str(tmp_path / 'user_actions.log')
+    handler = journalisation._file_handler(path, 10 * 1024 * 1024, when, 10)
+    for period in range(3):
+        _write(handler, period * 10, 10)
+        if when:
+            handler.rolloverAt = 1760779100 + (period + 1) * handler.interval  # Une période par fichier
+        handler.doRollover()  # Fichier tourné puis compressé (.gz)
+    _write(handler, 30, 5)
+    handler.close()
+
+    files = analyse_journal.expand_paths([path])
+    assert len(files) == 4 and files[-1] == path
+    assert all(name.endswith('.gz') for name in files[:-1])
+    order = [analyse_journal.LogStats() for _ in files]
+    for stats, name in zip(order, files):
+        analyse_journal.analyze_file(name, stats)
+    assert [stats.lines for stats in order] == [10, 10, 10, 5]
+
+    state = str(tmp_path / 'etat.json')
+    assert analyse_journal.analyze([path], state).routes['GET /list'] == 35
+    assert analyse_journal.analyze([path], state).routes['GET /list'] == 35  # Rien de nouveau
+
+
+def test_unrelated_files_are_ignored(tmp_path):
+    path = tmp_path / 'user_actions.log'
+    for name in ('user_actions.log', 'user_actions.log.2.gz', 'user_actions.log.10', 'user_actions.log.2026-10-17',
+                 'user_actions.log.2026-10-18_09-38-20.gz', 'user_actions.log.tmp', 'user_actions.log.1.bak'):
+        (tmp_path / name).write_text('')
+    names = [name.rsplit('/', 1)[-1] for name in analyse_journal.expand_paths([str(path)])]
+    assert names == ['user_actions.log.10', 'user_actions.log.2.gz', 'user_actions.log.2026-10-17',
+                     'user_actions.log.2026-10-18_09-38-20.gz', 'user_actions.log']
@@ -0,0 +1,30 @@
+import database
+from cache import catalogue_cache
+
+
+def _suggestions(client, q):
+    # (noms proposés, nombre de requêtes SQL d'après l'en-tête Server-Timing)
+    response = client.get('/api/v1/produits/suggestions', query_string={'q': q, 'server_timing': 1})
+    assert response.status_code == 200
+    timing = response.headers['Server-Timing']
+    queries = int(timing.split('desc="', 1)[1].split(' queries', 1)[0])
+    return [row['nom'] for row in response.get_json()['donnees']], queries
+
+
+def test_suggestions_hit_costs_only_the_etag_query(client):
+    catalogue_cache.invalidate()
+    names, queries = _suggestions(client, 'Ea')
+    assert names and queries == 2
+    hits = catalogue_cache.stats()['hits']
+    assert _suggestions(client, 'Ea') == (names, 1)  # Version lue pour l'ETag, réutilisée par le cache
+    assert catalogue_cache.stats()['hits'] == hits + 1
+
+
+def test_suggestions_follow_writes_from_other_workers(client):
+    catalogue_cache.invalidate()
+    assert 'Eau de test' not in _suggestions(client, 'Eau')[0]
+    # Écriture hors de l'application (autre worker) : seule la version de la table a changé
+    with database.transaction() as connection:
+        connection.execute("INSERT INTO produits (nom, prix, description, stock, type_produit) "
+                           "VALUES ('Eau de test', 1, 'd', 1, 'Boissons')")
+    assert 'Eau de test' in _suggestions(client, 'Eau')[0]
@@ -0,0 +1,46 @@
+import re
+
+import database
+from gestion_produit import Commande
+
+# Pages d'une période (/commandes?du&au) : curseur <created_at>:<id> de la dernière commande
+# affichée, qui reste valable quand cette commande est supprimée ou archivée entre deux pages
+
+
+VISIBLE = "SELECT c.id FROM commandes c JOIN clients cl ON c.client_id = cl.id JOIN produits p ON c.produit_id = p.id"
+
+
+def _dates_out_of_id_order():
+    # Dix commandes affichées, datées dans un ordre sans rapport avec celui des ids (dont des dates égales)
+    connection = database.get_connection()
+    with database.transaction(connection):
+        connection.executemany("INSERT INTO commandes (client_id, produit_id, quantite, created_at) VALUES (12, 19, 1, 0)",
+                               [()] * 7)
+        ids = [row[0] for row in connection.execute(VISIBLE + " ORDER BY c.id")]
+        for index, commande_id in enumerate(ids):
+            connection.execute("UPDATE commandes SET created_at = ? WHERE id = ?",
+                               (1700000000 + (index * 5) % 7 * 60, commande_id))
+    return [row[0] for row in connection.execute(VISIBLE + " ORDER BY c.created_at, c.id")]
+
+
+def test_period_cursor_survives_deleted_row(app):
+    with app.app_context():
+        expected = _dates_out_of_id_order()
+        first = Commande().get_commandes_with_details(limit=3, start=0, end=2 ** 40)
+        cursor = first[-1]
+        Commande().delete_commande(cursor.id)
+        rest = Commande().get_commandes_with_details(cursor.id, 100, 0, 2 ** 40, after_date=cursor.created_at)
+    assert len(expected) == 10
+    assert [order.id for order in first + rest] == expected
+
+
+def test_period_next_link(app, client):
+    with app.app_context():
+        expected = _dates_out_of_id_order()
+    seen, url = [], '/commandes?du=2000-01-01&au=2100-01-01&page_size=2'
+    while url:
+        html = client.get(url).get_data(as_text=True)
+        seen += [int(order_id) for order_id in re.findall(r'/edit_order/(\d+)', html)]
+        link = re.search(r'href="(/commandes\?after=\d+(?::|%3A)\d+[^"]*)"', html)
+        url = link and link[1].replace('&amp;', '&')
+    assert seen == expected
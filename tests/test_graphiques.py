@@ -0,0 +1,35 @@
+from concurrent.futures import Future
+
+import graphiques
+
+# Cache des images : les données sont lues hors du verrou du cache, et un rendu annulé
+# par shutdown() (cancel_futures) ne lève pas d'erreur dans le callback
+
+
+def test_load_outside_lock(app, monkeypatch):
+    cache = graphiques.ChartCache(workers=1)
+    locked = []
+
+    def load(connection):
+        locked.append(cache._lock.locked())
+        return [1, 2, 3]
+
+    monkeypatch.setitem(graphiques.CHARTS, 'essai', (load, bytes, ('produits',)))
+    try:
+        with app.app_context():
+            assert cache.get('essai', version=1) == (1, b'\x01\x02\x03')
+            assert cache.get('essai', version=1) == (1, b'\x01\x02\x03')  # En cache : pas de nouvelle lecture
+    finally:
+        cache.shutdown()
+    assert locked == [False]
+
+
+def test_cancelled_render_is_ignored():
+    cache = graphiques.ChartCache()
+    cache._entries['essai'] = (0, b'ancienne')
+    rendering, future = Future(), Future()
+    rendering.cancel()  # Comme shutdown(cancel_futures=True) pour un rendu encore en file
+    graphiques._relay(rendering, future)
+    assert future.cancelled()
+    cache._store('essai', 1, future)  # Sans CancelledError : la dernière image valide reste
+    assert cache._entries['essai'] == (0, b'ancienne')
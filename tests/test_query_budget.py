@@ -0,0 +1,86 @@
+import pytest
+
+import database
+from garde_requetes import QueryBudgetExceeded
+
+# Les routes les plus appelées passent sous QUERY_BUDGET = 'raise' : une requête SQL de plus que
+# le budget déclaré par @query_budget, ou une requête répétée (N+1), fait échouer le test
+
+
+def _ok(response, status=200):
+    assert response.status_code == status, response.get_data(as_text=True)[:500]
+    return response
+
+
+def test_list(client):
+    _ok(client.get('/list'))
+    _ok(client.get('/list?page_size=5'))
+    _ok(client.get('/list?q=eau'))
+
+
+def test_list_not_modified(client):
+    etag = _ok(client.get('/list')).headers['ETag']
+    _ok(client.get('/list', headers={'If-None-Match': etag}), 304)
+
+
+def test_commandes(client):
+    _ok(client.get('/commandes'))
+    _ok(client.get('/commandes?page_size=2'))
+    _ok(client.get('/commandes?du=2000-01-01&au=2100-01-01'))
+
+
+def test_add_order(client):
+    _ok(client.get('/add_order'))
+    lines = {'client_id': '9'}
+    for index, produit_id in enumerate((12, 13, 14)):
+        lines[f'lignes-{index}-produit_id'] = str(produit_id)
+        lines[f'lignes-{index}-quantite'] = '1'
+    _ok(client.post('/add_order', data=lines), 302)
+    _ok(client.post('/add_order', data={'client_id': '9', 'lignes-0-produit_id': '12', 'lignes-0-quantite': '0'}))
+
+
+@pytest.mark.parametrize('url', [
+    '/api/v1/produits',
+    '/api/v1/produits?limit=5&after=12',
+    '/api/v1/produits?ids=12,13,14',
+    '/api/v1/clients?fields=id,nom&format=lignes',
+    '/api/v1/commandes',
+    '/api/v1/produits/12',
+    '/api/v1/produits/suggestions?q=e',
+])
+def test_api_reads(client, url):
+    _ok(client.get(url))
+
+
+def test_api_writes(client):
+    created = _ok(client.post('/api/v1/commandes', json=[
+        {'client_id': 9, 'produit_id': produit_id, 'quantite': 1} for produit_id in (12, 13, 14)]), 201)
+    ids = [row['id'] for row in created.get_json()['donnees']]
+    _ok(client.patch('/api/v1/commandes', json=[{'id': commande_id, 'quantite': 2} for commande_id in ids]))
+    _ok(client.patch('/api/v1/produits', json=[{'id': 12, 'stock': 0}]))
+
+
+# Pour chaque route, la requête qui atteint son budget : une requête de plus le dépasse
+ORDER = {'client_id': '9', 'lignes-0-produit_id': '12', 'lignes-0-quantite': '1'}
+IDS = ','.join(str(record_id) for record_id in range(1, 502))  # Deux paquets IN (MAX_IN_PARAMS = 500)
+
+
+@pytest.mark.parametrize('method, url, kwargs', [
+    ('get', '/list', {}),
+    ('get', '/list?q=eau', {}),
+    ('get', '/commandes', {}),
+    ('post', '/add_order', {'data': ORDER}),
+    ('get', f'/api/v1/produits?ids={IDS}', {}),
+])
+def test_extra_query_raises(app, client, method, url, kwargs):
+    extra = []
+
+    @app.before_request  # Avant la première requête : Flask refuse les hooks ajoutés ensuite
+    def extra_query():
+        if extra:
+            database.get_connection().execute("SELECT COUNT(*) FROM produits").fetchone()
+
+    _ok(getattr(client, method)(url, **kwargs), 302 if method == 'post' else 200)
+    extra.append(True)
+    with pytest.raises(QueryBudgetExceeded):
+        getattr(client, method)(url, **kwargs)
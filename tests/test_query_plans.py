@@ -0,0 +1,29 @@
+import database
+import migrations
+from gestion_produit import PRODUIT_COLUMNS
+
+# flask check-query-plans exécute le code des routes et vérifie le plan des requêtes relevées ;
+# les chemins d'écriture sont annulés (rollback_only) et ne modifient pas la base
+
+
+def _state(connection):
+    return connection.execute("""
+        SELECT (SELECT COUNT(*) FROM commandes), (SELECT COUNT(*) FROM entetes_commande),
+               (SELECT SUM(stock) FROM produits), (SELECT SUM(version) FROM table_versions)
+    """).fetchone()
+
+
+def test_query_plans(app):
+    with app.app_context():
+        connection = database.get_connection()
+        before = _state(connection)
+        results = migrations.check_query_plans()
+        assert _state(connection) == before
+    assert [(route, sql) for route, sql, _, ok in results if not ok] == []
+    routes = {route for route, _, _, _ in results}
+    assert routes == {route for route, _, _ in migrations.QUERY_PLANS}  # Chaque entrée a exécuté au moins une requête
+    executed = {(route, sql.split(' FROM ')[0]) for route, sql, _, _ in results}
+    assert ('/update/<id>', 'SELECT ' + PRODUIT_COLUMNS) in executed
+    assert any(route == '/list?q' and sql.endswith('LIMIT ? OFFSET ?') for route, sql, _, _ in results)
+    assert ('/delete_order/<id>', 'DELETE') in executed
+